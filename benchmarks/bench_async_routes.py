@@ -0,0 +1,69 @@
+"""
+GET /tasks latency while lint jobs are in flight.
+
+Fires --lint-jobs concurrent POST /tasks/{id}/manual_quality_checker requests
+(each with distinct code so the result cache cannot answer them) and samples
+GET /tasks latency at the same time, then compares with an idle baseline.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_async_routes --lint-jobs 50
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import summarize, use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+
+from server.main import app, lifespan  # noqa: E402
+
+
+async def sample_listing(client, samples, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/tasks")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def lint(client, index):
+    code = [f"def function_{index}(value):", f"    return value * {index}", ""]
+    response = await client.post("/tasks/1/manual_quality_checker", json={"lines": code})
+    response.raise_for_status()
+
+
+async def main(lint_jobs, idle_seconds):
+    transport = httpx.ASGITransport(app=app)
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await lint(client, -1)  # warm the lint processes
+
+            idle, stop = [], asyncio.Event()
+            sampler = asyncio.create_task(sample_listing(client, idle, stop))
+            await asyncio.sleep(idle_seconds)
+            stop.set()
+            await sampler
+
+            loaded, stop = [], asyncio.Event()
+            sampler = asyncio.create_task(sample_listing(client, loaded, stop))
+            started = time.perf_counter()
+            await asyncio.gather(*(lint(client, i) for i in range(lint_jobs)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await sampler
+
+    summarize("idle", idle)
+    summarize(f"{lint_jobs} lints", loaded)
+    print(f"{lint_jobs} lint jobs finished in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lint-jobs", type=int, default=50)
+    parser.add_argument("--idle-seconds", type=float, default=2.0)
+    opts = parser.parse_args()
+    asyncio.run(main(opts.lint_jobs, opts.idle_seconds))
@@ -0,0 +1,158 @@
+"""
+Re-grading a cohort: POST /tasks/{id}/batch_grade vs one /grade plus one
+/manual_quality_checker call per submission.
+
+Gives a task --cases test cases, builds --submissions submissions of which
+a --duplicates fraction repeat an earlier one (as cohorts do: untouched
+starter code, copied solutions), and grades them in-process (httpx ASGI
+transport, lifespan included):
+
+* single-shot: both calls per submission, --concurrency submissions at a time
+* batch json: one batch_grade call with a JSON list
+* batch zstd: the same as zstd-compressed JSONL
+
+The result cache is cleared before every round, so lints are not carried
+over from the previous one. The ASGI transport hands over a streamed
+response only once it is complete, so only total times are measured here. Then every batch record is checked against the
+single-shot result of its submission, timings and resource usage aside,
+and the script exits with status 1 on any mismatch.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_batch_grade --submissions 500 --duplicates 0.3 --output batch.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from benchmarks.common import add_synthetic_cases, report, stats, use_temp_database, write_report
+
+use_temp_database()
+
+import httpx  # noqa: E402
+import zstandard as zstd  # noqa: E402
+
+from server.agentic.batch_grader import BATCH_GRADE_CONCURRENCY  # noqa: E402
+from server.agentic.result_cache import get_result_cache  # noqa: E402
+from server.main import app, lifespan  # noqa: E402
+
+TASK_ID = 1
+
+# The synthetic cases feed two numbers and expect their sum
+VARIANTS = [
+    "first = int(input())\nsecond = int(input())\nprint(first + second)",
+    "def add(a, b):\n    return a + b\n\n\nprint(add(int(input()), int(input())))",
+    "a=int(input())\nb=int(input())\nprint(a*b)",
+    "import sys\nvalues = [int(line) for line in sys.stdin]\nprint(sum(values))",
+    "print(int(input()) + int(input())",
+]
+
+
+def make_submissions(count, duplicates, seed=0):
+    rng = random.Random(seed)
+    submissions = []
+    for index in range(count):
+        if submissions and rng.random() < duplicates:
+            code = rng.choice(submissions)["code"]
+        else:
+            code = f"{rng.choice(VARIANTS)}\n# student {index}"
+        submissions.append({"id": f"student-{index}", "code": code})
+    return submissions
+
+
+def comparable(record):
+    """A grade or lint result without run timings and resource usage."""
+    grade = dict(record["result"])
+    grade.pop("usage", None)
+    grade["cases"] = [{k: v for k, v in case.items() if k not in ("time_ms", "cpu_ms")} for case in grade["cases"]]
+    return {"result": grade, "lint": record["lint"]}
+
+
+async def single_shot(client, submissions, concurrency):
+    gate = asyncio.Semaphore(concurrency)
+    samples, results = [], {}
+
+    async def one(submission):
+        body = {"lines": submission["code"].splitlines()}
+        async with gate:
+            started = time.perf_counter()
+            grade, lint = await asyncio.gather(
+                client.post(f"/tasks/{TASK_ID}/grade", json=body),
+                client.post(f"/tasks/{TASK_ID}/manual_quality_checker", json=body),
+            )
+            samples.append(time.perf_counter() - started)
+        results[submission["id"]] = {"result": grade.json()["result"], "lint": lint.json()["result"]}
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(submission) for submission in submissions))
+    result = stats(samples, time.perf_counter() - started)
+    return result, results
+
+
+async def batch(client, content, headers):
+    """One batch_grade call; (stats entry, records by submission id)."""
+    started = time.perf_counter()
+    records, summary = {}, None
+    async with client.stream("POST", f"/tasks/{TASK_ID}/batch_grade", content=content, headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("done"):
+                summary = record
+                continue
+            records[record["id"]] = record
+    elapsed = time.perf_counter() - started
+    result = stats([elapsed], elapsed, errors=summary["errors"])
+    result.update(unique=summary["unique"], throughput_per_s=round(summary["submissions"] / elapsed, 1))
+    return result, records
+
+
+async def main(opts):
+    add_synthetic_cases([TASK_ID], opts.cases)
+    submissions = make_submissions(opts.submissions, opts.duplicates)
+    as_json = json.dumps(submissions).encode("utf-8")
+    as_zstd = zstd.ZstdCompressor().compress("\n".join(json.dumps(s) for s in submissions).encode("utf-8"))
+    print(f"{len(submissions)} submissions, {len({s['code'] for s in submissions})} distinct,"
+          f" {opts.cases} cases; JSON {len(as_json)} bytes, zstd JSONL {len(as_zstd)} bytes")
+
+    results = {}
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            # Warm the sandbox and lint pools, then start every round from an empty cache
+            await single_shot(client, make_submissions(4, 0, seed=1), opts.concurrency)
+            get_result_cache().clear()
+            results["single-shot"], expected = await single_shot(client, submissions, opts.concurrency)
+            get_result_cache().clear()
+            results["batch json"], by_json = await batch(client, as_json, {"Content-Type": "application/json"})
+            get_result_cache().clear()
+            results["batch zstd"], by_zstd = await batch(client, as_zstd, {"Content-Type": "application/zstd"})
+
+    mismatches = [
+        f"{name}: {sid}"
+        for name, records in (("batch json", by_json), ("batch zstd", by_zstd))
+        for sid, record in expected.items()
+        if sid not in records or comparable(records[sid]) != comparable(record)
+    ]
+    for name, result in results.items():
+        report(name, result)
+    print(f"{len(mismatches)} batch result(s) differ from single-shot grading")
+    for mismatch in mismatches[:10]:
+        print(f"  {mismatch}")
+    write_report(opts.output, "batch_grade", vars(opts), results)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="fraction repeating an earlier submission")
+    parser.add_argument("--cases", type=int, default=10, help="test cases of the task")
+    parser.add_argument("--concurrency", type=int, default=BATCH_GRADE_CONCURRENCY,
+                        help="submissions in flight for single-shot grading")
+    parser.add_argument("--output", help="write the JSON report here")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,92 @@
+"""
+Requests per second for the task listing routes: in-memory catalog vs ORM.
+
+The "orm" rows run the previous implementation of GET /tasks, /tasks/{id}
+and /tasks/topic/{topic} (query + ORM objects + response_model validation);
+the "catalog" rows hit the real app, which serves pre-serialized JSON, and
+"catalog 304" revalidates with If-None-Match. Each scenario sends --requests
+requests from --concurrency concurrent clients through the ASGI app in-process.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_catalog --requests 2000
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from benchmarks.common import summarize, use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from server.backend.routers.routes import TaskOut  # noqa: E402
+from server.database import db_models as models  # noqa: E402
+from server.database.db import get_db  # noqa: E402
+from server.main import app, lifespan  # noqa: E402
+
+orm_app = FastAPI()
+
+
+@orm_app.get("/tasks", response_model=List[TaskOut])
+def orm_list_tasks(db: Session = Depends(get_db)):
+    return db.query(models.Task).all()
+
+
+@orm_app.get("/tasks/{task_id}", response_model=TaskOut)
+def orm_get_task(task_id: int, db: Session = Depends(get_db)):
+    task = db.get(models.Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+@orm_app.get("/tasks/topic/{topic}", response_model=List[TaskOut])
+def orm_get_tasks_by_topic(topic: str, db: Session = Depends(get_db)):
+    return db.query(models.Task).filter(models.Task.topic == topic).all()
+
+
+async def load(name, client, path, requests, concurrency, headers=None, status=200):
+    samples, remaining = [], iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            assert response.status_code == status, (path, response.status_code)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    summarize(name, samples)
+    print(f"{'':<12} {requests / elapsed:8.0f} req/s")
+
+
+async def main(requests, concurrency):
+    async with lifespan(app):
+        catalog = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+        orm = httpx.AsyncClient(transport=httpx.ASGITransport(app=orm_app), base_url="http://bench")
+        async with catalog, orm:
+            listing = await catalog.get("/tasks")
+            topic = listing.json()[0]["topic"]
+            etag = listing.headers["etag"]
+
+            for label, path in (("GET /tasks", "/tasks"), ("GET /tasks/1", "/tasks/1"),
+                                ("GET /tasks/topic", f"/tasks/topic/{topic}")):
+                print(f"── {label}")
+                await load("orm", orm, path, requests, concurrency)
+                await load("catalog", catalog, path, requests, concurrency)
+            print("── GET /tasks with If-None-Match")
+            await load("catalog 304", catalog, "/tasks", requests, concurrency, {"If-None-Match": etag}, 304)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    opts = parser.parse_args()
+    asyncio.run(main(opts.requests, opts.concurrency))
@@ -0,0 +1,134 @@
+"""
+Seeding throughput of scripts/fill_db.py on a synthetic task pack.
+
+Writes --tasks synthetic tasks (each with --cases test cases of two inputs
+and one output) as a JSON array and as JSONL, then loads them into fresh
+databases, each run in its own process so peak memory is comparable:
+
+* legacy: the previous loader (json.load, one execute per task row, tasks only)
+* json / jsonl: the streaming loader, all four tables, batched upserts
+* jsonl rerun: the same pack again on the filled database (pure upserts),
+  checking that the row counts do not change
+
+Usage (from the repository root):
+    python -m benchmarks.bench_fill_db --tasks 100000
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import orjson
+
+from benchmarks.common import synthetic_tasks
+
+TABLES = ("tasks", "input_output", "input", "output")
+
+
+def write_packs(directory, tasks, cases):
+    io_id = 0
+    json_path, jsonl_path = os.path.join(directory, "pack.json"), os.path.join(directory, "pack.jsonl")
+    with open(json_path, "wb") as json_file, open(jsonl_path, "wb") as jsonl_file:
+        json_file.write(b"[\n")
+        for index, task in enumerate(synthetic_tasks(tasks)):
+            task["test_cases"] = []
+            for _ in range(cases):
+                io_id += 1
+                task["test_cases"].append({
+                    "id": io_id,
+                    "inputs": [{"id": 2 * io_id + k, "input": str(io_id + k), "input_type": "int"} for k in range(2)],
+                    "outputs": [{"id": io_id, "output": str(2 * io_id + 1), "output_type": "int"}],
+                })
+            body = orjson.dumps(task)
+            json_file.write((b",\n" if index else b"") + body)
+            jsonl_file.write(body + b"\n")
+        json_file.write(b"\n]\n")
+    return json_path, jsonl_path
+
+
+def create_database(path):
+    from sqlalchemy import create_engine
+    from server.database import db_models as models
+
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+def legacy_load(db_path, pack):
+    """The loader as it was: whole file in memory, one statement per task row."""
+    with open(pack, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    cursor = conn.cursor()
+    for row in data:
+        cursor.execute(
+            "INSERT INTO tasks (id, name, description, topic, correct_code, messed_code) VALUES (?, ?, ?, ?, ?, ?)",
+            (row["id"], row["name"], row["description"], row["topic"], row["correct_code"], row["messed_code"]),
+        )
+    conn.commit()
+    conn.close()
+    return {"tasks": len(data)}
+
+
+def child(mode, db_path, pack, batch_size):
+    started = time.perf_counter()
+    if mode == "legacy":
+        totals = legacy_load(db_path, pack)
+    else:
+        from server.scripts import fill_db
+
+        totals = fill_db.add_data_to_db("tasks", pack, batch_size)
+    elapsed = time.perf_counter() - started
+    with sqlite3.connect(db_path) as conn:
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLES}
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"rows": sum(totals.values()), "elapsed": elapsed, "counts": counts, "peak_mib": peak_mib}))
+
+
+def run(mode, db_path, pack, batch_size):
+    env = dict(os.environ, DATABASE_PATH=db_path, JSON_FILE_PATH=pack)
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_fill_db", "--child", mode, db_path, pack, "--batch-size", str(batch_size)],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    print(f"  {mode:<12} {stats['rows']:>10,} rows  {stats['elapsed']:7.2f} s  "
+          f"{stats['rows'] / stats['elapsed']:>10,.0f} rows/s  peak {stats['peak_mib']:6.0f} MiB")
+    return stats
+
+
+def main(tasks, cases, batch_size):
+    directory = tempfile.mkdtemp(prefix="refactoai-fill-")
+    json_path, jsonl_path = write_packs(directory, tasks, cases)
+    print(f"{tasks:,} tasks × {cases} cases; pack.json {os.path.getsize(json_path) / 2**20:.0f} MiB, "
+          f"batch size {batch_size}")
+
+    for mode, pack, name in (("legacy", json_path, "legacy.db"), ("json", json_path, "json.db"),
+                             ("jsonl", jsonl_path, "jsonl.db")):
+        db_path = os.path.join(directory, name)
+        create_database(db_path)
+        counts = run(mode, db_path, pack, batch_size)["counts"]
+
+    rerun = run("jsonl rerun", db_path, jsonl_path, batch_size)["counts"]
+    assert rerun == counts, (counts, rerun)
+    print(f"  rerun left the row counts unchanged: {counts}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--cases", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "DB", "PACK"), help=argparse.SUPPRESS)
+    opts = parser.parse_args()
+    if opts.child:
+        child(*opts.child, opts.batch_size)
+    else:
+        main(opts.tasks, opts.cases, opts.batch_size)
@@ -0,0 +1,70 @@
+"""
+Grading latency: stored outputs vs differential grading against correct_code,
+with the reference outputs cold (cleared cache) and warm.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_grader --cases 20 --iterations 50
+"""
+import argparse
+import time
+
+from benchmarks.common import summarize
+from server.agentic.grader import TestCase, TestCaseGrader
+from server.agentic.result_cache import get_result_cache
+
+REFERENCE_CODE = """
+n = int(input())
+sieve = bytearray([1]) * (n + 1)
+for i in range(2, int(n ** 0.5) + 1):
+    if sieve[i]:
+        sieve[i * i::i] = bytearray(len(sieve[i * i::i]))
+print(sum(i for i in range(2, n + 1) if sieve[i]))
+"""
+
+SUBMISSION = """
+limit = int(input())
+composite = set()
+total = 0
+for p in range(2, limit + 1):
+    if p not in composite:
+        total += p
+        composite.update(range(p * p, limit + 1, p))
+print(total)
+"""
+
+
+def make_cases(count):
+    cases = [TestCase(id=i, inputs=[str(20000 + 1000 * i)]) for i in range(count)]
+    outputs, _ = TestCaseGrader.reference_outputs(1, REFERENCE_CODE, cases)
+    for case, output in zip(cases, outputs):
+        case.outputs = [output.strip()]
+    return cases
+
+
+def bench(iterations, grade, clear=False):
+    samples = []
+    for _ in range(iterations):
+        if clear:
+            get_result_cache().clear()
+        started = time.perf_counter()
+        result = grade()
+        samples.append(time.perf_counter() - started)
+        assert result.passed == result.total, result.to_dict()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=50)
+    opts = parser.parse_args()
+
+    cases = make_cases(opts.cases)
+    summarize("stored outputs", bench(opts.iterations, lambda: TestCaseGrader.grade(SUBMISSION, cases)))
+    reference = lambda: TestCaseGrader.grade_against_reference(SUBMISSION, 1, REFERENCE_CODE, cases)
+    summarize("reference cold", bench(opts.iterations, reference, clear=True))
+    summarize("reference warm", bench(opts.iterations, reference))
+
+
+if __name__ == "__main__":
+    main()
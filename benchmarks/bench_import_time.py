@@ -0,0 +1,106 @@
+"""
+Cold start of a worker: `import server.main` and the first request, each in
+a fresh interpreter, checked against a budget.
+
+Every run starts `python -X importtime -c "import server.main"` on a
+temporary database and sums the self times it reports; the top packages by
+self time come from the median run. A second set of runs times import,
+lifespan start-up and a first GET /tasks through TestClient (the heavy
+warm-ups run in the background and are not waited for).
+
+It exits with status 1 when the median import exceeds --budget-ms or when
+importing server.main loads any of the modules that must stay lazy
+(LangChain, OpenAI, pylint); tests/test_import_time.py runs the same checks
+in the test suite. The results go to a JSON report for benchmarks.compare.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_import_time --runs 5 --budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from benchmarks.common import ROOT, report, stats, use_temp_database, write_report
+
+# Loaded on first use (lint engine, LLM clients); never by importing the app
+LAZY_MODULES = ("openai", "langchain_openai", "langchain_core", "pylint", "astroid")
+
+FIRST_REQUEST = """
+import time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+from server.main import app
+imported = time.perf_counter()
+with TestClient(app) as client:
+    client.get("/tasks", params={"limit": 1}).raise_for_status()
+    print(imported - started, time.perf_counter() - started)
+"""
+
+
+def _python(args, env):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def import_profile(env):
+    """(total seconds, self seconds per top-level package, modules) of one `import server.main`."""
+    result = _python(["-X", "importtime", "-c", "import server.main"], env)
+    packages, modules, total = Counter(), set(), 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules.add(name)
+        packages[name.split(".")[0]] += int(self_us) / 1e6
+        total += int(self_us)
+    return total / 1e6, packages, modules
+
+
+def first_request(env):
+    """(import seconds, seconds to the first response) in a fresh interpreter."""
+    imported, answered = _python(["-c", FIRST_REQUEST], env).stdout.split()[-2:]
+    return float(imported), float(answered)
+
+
+def main(opts):
+    use_temp_database()
+    env = {**os.environ, "LLM_BACKEND": "fake", "PYTHONPATH": str(ROOT)}
+
+    profiles = sorted((import_profile(env) for _ in range(opts.runs)), key=lambda profile: profile[0])
+    total, packages, modules = profiles[len(profiles) // 2]
+    print(f"Top packages by self time (median run, {total * 1000:.0f} ms in all):")
+    for package, seconds in packages.most_common(opts.top):
+        print(f"  {package:<28} {seconds * 1000:8.1f} ms")
+
+    starts = [first_request(env) for _ in range(opts.runs)]
+    results = {
+        "import server.main": stats([profile[0] for profile in profiles]),
+        "first request": stats([answered for _, answered in starts]),
+    }
+    print()
+    for name, result in results.items():
+        report(name, result)
+    write_report(opts.output, "import_time", vars(opts), results)
+
+    failures = []
+    median_ms = statistics.median(profile[0] for profile in profiles) * 1000
+    if median_ms > opts.budget_ms:
+        failures.append(f"import took {median_ms:.0f} ms, budget {opts.budget_ms:.0f} ms")
+    loaded = sorted(name for name in modules if name.split(".")[0] in LAZY_MODULES and "." not in name)
+    if loaded:
+        failures.append(f"importing server.main loaded {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="allowed median import time")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--output", help="write the JSON report here")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Task listing cost as the catalog grows.
+
+Grows a temporary database to each --sizes total and measures, per size:
+the previous full listing (all ORM objects incl. the code columns, then
+TaskOut), the catalog-served full listing, and keyset pages of --limit tasks
+at the start and the end of the catalog (id + name only, and all fields).
+Latency is the median of --repeat calls; memory is the tracemalloc peak of
+one call.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_large_catalog --sizes 1000 10000 50000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.common import add_synthetic_tasks, use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+
+from server.backend.catalog import CATALOG_FIELDS  # noqa: E402
+from server.backend.routers.routes import TaskOut, _load_page  # noqa: E402
+from server.database import db_models as models  # noqa: E402
+from server.database.db import SessionLocal  # noqa: E402
+from server.main import app, lifespan  # noqa: E402
+
+
+def orm_full_listing():
+    with SessionLocal() as db:
+        return [TaskOut.model_validate(task).model_dump() for task in db.query(models.Task).all()]
+
+
+def measure(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings) * 1000, peak / 2**20
+
+
+def report(name, ms, mib):
+    print(f"  {name:<26} {ms:9.2f} ms  {mib:9.2f} MiB peak")
+
+
+async def main(sizes, limit, repeat):
+    transport = httpx.ASGITransport(app=app)
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            with SessionLocal() as db:
+                count = db.query(models.Task).count()
+            for size in sizes:
+                if size > count:
+                    add_synthetic_tasks(size - count, start_id=count + 1)
+                    count = size
+                print(f"── {count} tasks")
+                report("orm full listing (old)", *measure(orm_full_listing, repeat))
+
+                await client.get("/tasks")  # catalog reload after growth
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    (await client.get("/tasks")).raise_for_status()
+                    timings.append(time.perf_counter() - started)
+                print(f"  {'catalog full listing':<26} {statistics.median(timings) * 1000:9.2f} ms")
+
+                slim = ["id", "name"]
+                for label, cursor in (("first", None), ("last", count - limit - 1)):
+                    for fields in (slim, list(CATALOG_FIELDS)):
+                        page = {"fields": fields, "limit": limit, "cursor": cursor}
+                        name = f"page {label} ({'id,name' if fields is slim else 'all fields'})"
+                        report(name, *measure(lambda: _load_page(page), repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    opts = parser.parse_args()
+    asyncio.run(main(sorted(opts.sizes), opts.limit, opts.repeat))
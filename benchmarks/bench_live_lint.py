@@ -0,0 +1,107 @@
+"""
+Lint-on-keystroke latency: POST /tasks/{id}/manual_quality_checker (whole
+file every time) vs POST /tasks/{id}/lint/live (incremental session).
+
+Types --keystrokes characters into a string inside one function of an
+exercise-sized file (the first task's messed_code) and of a generated file
+with --functions functions, one request per keystroke, waiting for each
+answer (with the session's debounce turned off, to time the linting
+itself). Then replays the same keystrokes --burst-ms apart without waiting,
+as a fast typist would, and counts how many were superseded.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_live_lint --keystrokes 40 --functions 40
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import summarize, use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+
+from server.agentic import lint_session  # noqa: E402
+from server.main import app, lifespan  # noqa: E402
+
+FUNCTION = """
+def helper_{i}(values, limit={i}):
+    total = 0
+    for value in values:
+        if value > limit:
+            total += value
+    return total
+"""
+TYPED = "the quick brown fox jumps over the lazy dog " * 4
+
+
+def generated_file(functions):
+    return "import os\nimport sys\n" + "".join(FUNCTION.format(i=i) for i in range(functions)) + \
+        "\nprint(helper_1([1, 2, 3]))\n"
+
+
+def keystrokes(source, count):
+    """Sources with one more character typed into a string in the middle function."""
+    lines = source.splitlines()
+    defs = [i for i, line in enumerate(lines) if line.startswith("def ")]
+    at = defs[len(defs) // 2] + 1
+    for typed in range(count + 1):
+        edited = lines[:at] + [f'    message = "{TYPED[:typed]}"'] + lines[at:]
+        yield edited
+
+
+async def one_by_one(client, path, edits, headers=None):
+    samples = []
+    for version, lines in enumerate(edits):
+        started = time.perf_counter()
+        response = await client.post(path, json={"lines": lines, "version": version}, headers=headers)
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return samples[1:]  # the first edit is a full lint either way
+
+
+async def burst(client, path, edits, gap, session):
+    async def send(version, lines):
+        await asyncio.sleep(version * gap)
+        response = await client.post(path, json={"lines": lines, "version": version},
+                                     headers={"X-Session-Id": session})
+        return response.json()["result"]
+
+    results = await asyncio.gather(*(send(version, lines) for version, lines in enumerate(edits)))
+    return sum(result["superseded"] for result in results), len(results)
+
+
+async def main(count, functions, burst_ms):
+    transport = httpx.ASGITransport(app=app)
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            task = (await client.get("/tasks/1")).json()
+            sources = {
+                "exercise": task.get("messed_code") or generated_file(2),
+                f"{functions} functions": generated_file(functions),
+            }
+            # warm both lint processes
+            await asyncio.gather(*(client.post("/tasks/1/manual_quality_checker", json={"lines": [f"x = {i}"]})
+                                   for i in range(4)))
+            for name, source in sources.items():
+                edits = list(keystrokes(source, count))
+                print(f"── {name} ({source.count(chr(10)) + 1} lines)")
+                summarize("full", await one_by_one(client, "/tasks/1/manual_quality_checker", edits))
+                headers = {"X-Session-Id": f"bench-{name}"}
+                debounce, lint_session.LINT_SESSION_DEBOUNCE_SECONDS = lint_session.LINT_SESSION_DEBOUNCE_SECONDS, 0
+                summarize("session", await one_by_one(client, "/tasks/1/lint/live", edits, headers))
+                lint_session.LINT_SESSION_DEBOUNCE_SECONDS = debounce
+                superseded, sent = await burst(client, "/tasks/1/lint/live", edits, burst_ms / 1000,
+                                               f"burst-{name}")
+                print(f"burst        {sent} edits {burst_ms:g} ms apart: {superseded} superseded, "
+                      f"{sent - superseded} linted (debounce {debounce * 1000:g} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keystrokes", type=int, default=40)
+    parser.add_argument("--functions", type=int, default=40)
+    parser.add_argument("--burst-ms", type=float, default=20)
+    opts = parser.parse_args()
+    asyncio.run(main(opts.keystrokes, opts.functions, opts.burst_ms))
@@ -0,0 +1,76 @@
+"""
+Chat/review latency under concurrent load with the offline fake LLM backend.
+
+Sends --requests POST /chat calls (--concurrency at a time) and, with
+--stream, the same number of streamed AI reviews, through the app in-process.
+Every call goes through the shared client registry, so the numbers show the
+"llm" concurrency cap (LLM_CONCURRENCY) and the fake model's simulated latency
+(FAKE_LLM_LATENCY_SECONDS) rather than any network.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_llm_clients --requests 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import summarize, use_temp_database
+
+os.environ["LLM_BACKEND"] = "fake"
+use_temp_database()
+
+import httpx  # noqa: E402
+
+from server.agentic.concurrency import RESOURCE_LIMITS  # noqa: E402
+from server.main import app, lifespan  # noqa: E402
+
+
+async def chat(client, samples, index):
+    started = time.perf_counter()
+    response = await client.post("/chat", json={"content": f"question {index}"})
+    response.raise_for_status()
+    samples.append(time.perf_counter() - started)
+
+
+async def review_stream(client, samples, index):
+    started = time.perf_counter()
+    code = {"lines": [f"value = {index}", "print(value)"]}  # distinct code: no cache hits
+    async with client.stream("POST", "/tasks/1/ai_checker/stream", json=code) as response:
+        response.raise_for_status()
+        async for _ in response.aiter_bytes():
+            pass
+    samples.append(time.perf_counter() - started)
+
+
+async def load(name, call, client, requests, concurrency):
+    samples, gate = [], asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        async with gate:
+            await call(client, samples, index)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    summarize(name, samples)
+    print(f"{'':<12} {requests / elapsed:8.1f} req/s over {elapsed:.2f} s")
+
+
+async def main(requests, concurrency, stream):
+    print(f"LLM_CONCURRENCY={RESOURCE_LIMITS['llm']} concurrency={concurrency}")
+    transport = httpx.ASGITransport(app=app)
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await load("chat", chat, client, requests, concurrency)
+            if stream:
+                await load("review sse", review_stream, client, requests, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--stream", action="store_true", help="also benchmark streamed AI reviews")
+    opts = parser.parse_args()
+    asyncio.run(main(opts.requests, opts.concurrency, opts.stream))
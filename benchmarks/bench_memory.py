@@ -0,0 +1,72 @@
+"""
+Prompt tokens per AI-review request over a long session.
+
+Replays --turns review requests (cycling through the tasks in tasks.json) in
+one session and counts the tokens of the messages that would be sent, with
+the old unbounded history and with the bounded ConversationMemory. No model
+is called; replies are a fixed review object.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_memory --turns 30
+"""
+import argparse
+import json
+import os
+
+from benchmarks.common import TASKS_JSON
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-no-network")  # clients are built, never called
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from server.agentic.main import Assistant_agent  # noqa: E402
+from server.agentic.memory import count_message_tokens, load_encoder  # noqa: E402
+
+REPLY = json.dumps({
+    "answer": "Good start; the main improvement is to separate construction from use.",
+    "hints": [
+        "Review the Factory Method pattern and where object creation should live.",
+        "Rename single-letter variables and split the long function (pylint R0914).",
+        "Add type hints and a short docstring to each public class.",
+    ],
+    "score": 62,
+})
+
+
+def main(turns):
+    tasks = json.loads(TASKS_JSON.read_text(encoding="utf-8"))
+    agent = Assistant_agent(session_id="bench-memory")
+    agent.clear_history()
+    unbounded = []
+
+    print("tokenizer:", "o200k_base" if load_encoder() else "~4 chars/token estimate")
+    print(f"{'turn':>4} {'unbounded':>10} {'bounded':>8}")
+    totals = [0, 0]
+    for turn in range(turns):
+        task = tasks[turn % len(tasks)]
+        problem = f"{task['name']}\n{task['description']}"
+        prefix = Assistant_agent.task_prefix(problem, task["correct_code"])
+        payload = agent._review_payload("Your code has been rated at 6.20/10", task["messed_code"])
+
+        system = agent._review_messages(prefix, payload)[0]
+        before = count_message_tokens([system, *unbounded, HumanMessage(content=payload)])
+        after = count_message_tokens(agent._review_messages(prefix, payload))
+        totals[0] += before
+        totals[1] += after
+        if turn < 5 or (turn + 1) % 5 == 0:
+            print(f"{turn + 1:>4} {before:>10} {after:>8}")
+
+        unbounded += [HumanMessage(content=payload), AIMessage(content=REPLY)]
+        agent.memory.add_turn(payload, REPLY, {
+            "reference_solution": task["correct_code"],
+            "user_code": task["messed_code"],
+        })
+
+    print(f"total prompt tokens over {turns} turns: unbounded={totals[0]} bounded={totals[1]} "
+          f"({100 * (1 - totals[1] / totals[0]):.0f}% fewer)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=30)
+    main(parser.parse_args().turns)
@@ -0,0 +1,56 @@
+"""
+Latency of ScriptRunner: spawn-per-call vs the pre-warmed worker pool.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_runner --iterations 200
+"""
+import argparse
+import time
+
+from benchmarks.common import summarize
+from server.agentic.tools import ScriptRunner
+from server.agentic.worker_pool import WorkerPool
+
+SAMPLE_CODE = """
+def calculate_sum(value_a, value_b):
+    return value_a + value_b
+
+print(calculate_sum(int(input()), 5))
+"""
+
+
+def bench_spawn(iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        ScriptRunner.spawn_python_code(SAMPLE_CODE, [], "10\n", 10)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_pool(iterations, size):
+    pool = WorkerPool(size=size).start()
+    pool.run("pass", [], None)  # wait for the interpreters to come up
+    samples = []
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            pool.run(SAMPLE_CODE, [], "10\n")
+            samples.append(time.perf_counter() - started)
+    finally:
+        pool.shutdown()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=2)
+    opts = parser.parse_args()
+
+    summarize("spawn", bench_spawn(opts.iterations))
+    summarize("pool", bench_pool(opts.iterations, opts.pool_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Task search latency: FTS5 (GET /tasks/search) vs LIKE scans.
+
+Adds --tasks synthetic tasks to a temporary database whose tasks_fts index
+and triggers are already in place (so the seed time includes keeping the
+index in step), times a full rebuild, then runs each query --repeat times
+through search_tasks() and through an equivalent LIKE query (every word
+must appear in name, topic or description), and finally through the HTTP
+route in-process.
+
+FTS5 ranks every match before paging, so its cost follows the number of
+matching tasks; LIKE returns the first page in id order (unranked) and is
+cheap only when matches are dense. The synthetic catalog repeats a few
+task templates, so common words match a large share of it; the "54321"
+query (a synthetic task name) shows a selective search.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_search --tasks 100000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import add_synthetic_tasks, summarize, use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from server.database.db import ReadSessionLocal, engine  # noqa: E402
+from server.database.task_search import fts_query, rebuild_search_index, search_tasks  # noqa: E402
+from server.main import app  # noqa: E402  (tasks_fts comes from use_temp_database's ensure_schema)
+
+QUERIES = ["adapter", "cart tax", "temp conv", "strat patt disc", "logging interface", "54321", "zyzzyva"]
+
+
+def like_search(db, q, limit=20):
+    words = q.split()
+    where = " AND ".join(
+        f"(name LIKE :w{i} OR topic LIKE :w{i} OR description LIKE :w{i})" for i in range(len(words))
+    )
+    params = {f"w{i}": f"%{word}%" for i, word in enumerate(words)}
+    return db.execute(text(f"SELECT id FROM tasks WHERE {where} ORDER BY id LIMIT {limit + 1}"), params).all()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def http_load(queries, repeat):
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(repeat):
+            for q in queries:
+                started = time.perf_counter()
+                response = await client.get("/tasks/search", params={"q": q})
+                response.raise_for_status()
+                samples.append(time.perf_counter() - started)
+    summarize("http", samples)
+
+
+def main(tasks, repeat):
+    started = time.perf_counter()
+    add_synthetic_tasks(tasks, start_id=100)
+    print(f"seeded {tasks:,} tasks (FTS triggers on) in {time.perf_counter() - started:.2f} s")
+    started = time.perf_counter()
+    rebuild_search_index(engine)
+    print(f"rebuilt tasks_fts in {time.perf_counter() - started:.2f} s")
+
+    with ReadSessionLocal() as db:
+        for q in QUERIES:
+            matches = db.execute(text("SELECT COUNT(*) FROM tasks_fts WHERE tasks_fts MATCH :q"),
+                                 {"q": fts_query(q)}).scalar()
+            print(f"── {q!r} ({matches:,} matching tasks)")
+            summarize("fts5", timed(lambda q=q: search_tasks(db, q), repeat))
+            summarize("like", timed(lambda q=q: like_search(db, q), max(1, repeat // 10)))
+    print("── GET /tasks/search, all queries")
+    asyncio.run(http_load(QUERIES, repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    opts = parser.parse_args()
+    main(opts.tasks, opts.repeat)
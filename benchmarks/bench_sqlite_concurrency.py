@@ -0,0 +1,105 @@
+"""
+Mixed read/write SQLite load under each storage profile.
+
+For every profile in --profiles a fresh process seeds a temporary database
+and runs --readers threads paging through tasks (ReadSessionLocal) alongside
+--writers threads inserting input_output rows (SessionLocal) for --seconds.
+Reports operations per second, latency percentiles and how many operations
+failed (e.g. "database is locked").
+
+Usage (from the repository root):
+    python -m benchmarks.bench_sqlite_concurrency --readers 8 --writers 4
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import percentile
+
+
+def run_profile(readers, writers, seconds):
+    """Child process: DB_STORAGE_PROFILE is already set in the environment."""
+    from benchmarks.common import add_synthetic_tasks, use_temp_database
+
+    use_temp_database()
+    add_synthetic_tasks(5000, start_id=100)
+
+    from server.backend.catalog import task_page
+    from server.database import db_models as models
+    from server.database.db import ReadSessionLocal, SessionLocal
+
+    results = {"read": [], "write": [], "read_errors": 0, "write_errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def read_loop():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with ReadSessionLocal() as db:
+                    task_page(db, limit=50, cursor=random.randint(0, 5000))
+            except Exception:  # pylint: disable=broad-exception-caught
+                with lock:
+                    results["read_errors"] += 1
+                continue
+            with lock:
+                results["read"].append(time.perf_counter() - started)
+
+    def write_loop():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with SessionLocal() as db:
+                    db.add(models.InputOutput(task_id=random.randint(1, 21)))
+                    db.commit()
+            except Exception:  # pylint: disable=broad-exception-caught
+                with lock:
+                    results["write_errors"] += 1
+                continue
+            with lock:
+                results["write"].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=read_loop) for _ in range(readers)]
+    threads += [threading.Thread(target=write_loop) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(json.dumps(results))
+
+
+def main(profiles, readers, writers, seconds):
+    print(f"{readers} readers + {writers} writers for {seconds:.0f} s each")
+    for profile in profiles:
+        env = dict(os.environ, DB_STORAGE_PROFILE=profile)
+        env.pop("DATABASE_PATH", None)
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_sqlite_concurrency", "--child",
+             "--readers", str(readers), "--writers", str(writers), "--seconds", str(seconds)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        results = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"── {profile}")
+        for kind in ("read", "write"):
+            ms = [s * 1000 for s in results[kind]] or [float("nan")]
+            print(f"  {kind:<6} {len(results[kind]) / seconds:8.0f} ops/s  p50={percentile(ms, 50):7.2f} ms  "
+                  f"p99={percentile(ms, 99):8.2f} ms  errors={results[f'{kind}_errors']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", nargs="+", default=["legacy", "production", "durable"])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    opts = parser.parse_args()
+    if opts.child:
+        run_profile(opts.readers, opts.writers, opts.seconds)
+    else:
+        main(opts.profiles, opts.readers, opts.writers, opts.seconds)
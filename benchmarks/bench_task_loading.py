@@ -0,0 +1,127 @@
+"""
+Query counts and timings for loading tasks with their test suites, plus the
+effect of the task/test-case indexes.
+
+Seeds --tasks synthetic tasks, each with --cases InputOutput rows holding two
+inputs and one output, then:
+
+* loads --sample tasks by walking the lazy relationships (1 + N + 2N queries
+  per task) and with server.database.loaders (4 queries in total), asserting
+  both counts;
+* drops the model indexes, times the topic filter and a per-task case lookup
+  and shows their query plans, then re-adds the indexes through
+  upgrade_schema() (the same migration an old database gets) and repeats.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_task_loading --tasks 20000 --cases 10
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import add_synthetic_cases, add_synthetic_tasks, use_temp_database
+
+use_temp_database()
+
+from sqlalchemy import event, select, text  # noqa: E402
+
+from server.database import db_models as models  # noqa: E402
+from server.database.db import SessionLocal, engine  # noqa: E402
+from server.database.loaders import load_task_with_cases, load_tasks_with_cases  # noqa: E402
+from server.database.migrations import upgrade_schema  # noqa: E402
+
+INDEXES = [index.name for table in models.Base.metadata.sorted_tables for index in table.indexes]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, _conn, _cursor, statement, *_):
+        if not statement.startswith("BEGIN"):  # the writer engine's BEGIN IMMEDIATE
+            self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+def seed(tasks, cases):
+    add_synthetic_tasks(tasks, start_id=1000)
+    add_synthetic_cases(range(1000, 1000 + tasks), cases)
+
+
+def walk(task):
+    return sum(len(case.inputs) + len(case.outputs) for case in task.input_outputs)
+
+
+def timed(label, fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    print(f"  {label:<26} {(time.perf_counter() - started) / repeat * 1000:8.3f} ms")
+
+
+def plans(conn, topic, task_id, repeat):
+    topic_query = select(models.Task.id).where(models.Task.topic == topic)
+    cases_query = select(models.InputOutput.id).where(models.InputOutput.task_id == task_id)
+    for label, query in (("tasks by topic", topic_query), ("cases of one task", cases_query)):
+        compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+        plan = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        timed(label, lambda q=query: conn.execute(q).all(), repeat)
+        print(f"  {'':<26} plan: {' / '.join(row[-1] for row in plan)}")
+
+
+def main(tasks, cases, sample, repeat):
+    seed(tasks, cases)
+    counter = QueryCounter()
+    ids = random.Random(0).sample(range(1000, 1000 + tasks), sample)
+
+    print(f"── loading {sample} tasks × {cases} cases")
+    with SessionLocal() as db, counter:
+        started = time.perf_counter()
+        rows = sum(walk(db.get(models.Task, task_id)) for task_id in ids)
+        elapsed = time.perf_counter() - started
+    assert counter.count == sample * (1 + 1 + 2 * cases), counter.count
+    print(f"  {'lazy relationships':<26} {elapsed * 1000:8.1f} ms  {counter.count:5d} queries  {rows} rows")
+
+    with SessionLocal() as db, counter:
+        started = time.perf_counter()
+        rows = sum(walk(task) for task in load_tasks_with_cases(db, ids))
+        elapsed = time.perf_counter() - started
+    assert counter.count == 4, counter.count
+    print(f"  {'load_tasks_with_cases':<26} {elapsed * 1000:8.1f} ms  {counter.count:5d} queries  {rows} rows")
+
+    with SessionLocal() as db, counter:
+        task = load_task_with_cases(db, ids[0])
+        walk(task)
+    assert counter.count == 4, counter.count
+    print(f"  {'load_task_with_cases':<26} {'':>8}     {counter.count:5d} queries")
+
+    topic = task.topic
+    with engine.begin() as conn:
+        for name in INDEXES:
+            conn.execute(text(f"DROP INDEX {name}"))
+    print("── without indexes")
+    with engine.connect() as conn:
+        plans(conn, topic, ids[0], repeat)
+
+    upgrade_schema(engine)
+    engine.dispose()  # fresh connections: cached statements keep their old plans
+    print(f"── after upgrade_schema ({', '.join(INDEXES)})")
+    with engine.connect() as conn:
+        plans(conn, topic, ids[0], repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--cases", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    opts = parser.parse_args()
+    main(opts.tasks, opts.cases, opts.sample, opts.repeat)
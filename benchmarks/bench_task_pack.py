@@ -0,0 +1,98 @@
+"""
+Binary task pack vs JSON/SQLite for seeding and single-task reads.
+
+Seeds a temporary database with --tasks synthetic tasks (each with --cases
+test cases) from a JSONL pack via scripts/fill_db.py, then measures:
+
+* export_pack() time and pack size next to the JSONL pack
+* import_pack() into a fresh database next to fill_db.py on the JSONL pack
+* opening the pack (mmap + header), and the cold decode of every task
+* random single-task reads with the full suite: TaskPack.task() vs the
+  selectinload loader and vs the grader's test-case query
+
+Usage (from the repository root):
+    python -m benchmarks.bench_task_pack --tasks 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import summarize, use_temp_database
+
+use_temp_database()
+
+from benchmarks.bench_fill_db import create_database, write_packs  # noqa: E402
+from server.agentic.grader import load_test_cases  # noqa: E402
+from server.database.db import ReadSessionLocal, SessionLocal  # noqa: E402
+from server.database.loaders import load_task_with_cases  # noqa: E402
+from server.database.task_pack import TaskPack, export_pack, import_pack, task_record  # noqa: E402
+from server.scripts import fill_db  # noqa: E402
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"  {label:<28} {time.perf_counter() - started:8.2f} s")
+    return result
+
+
+def lookups(name, fn, ids):
+    samples = []
+    for task_id in ids:
+        started = time.perf_counter()
+        fn(task_id)
+        samples.append(time.perf_counter() - started)
+    summarize(name, samples)
+
+
+def main(tasks, cases, reads):
+    directory = tempfile.mkdtemp(prefix="refactoai-pack-")
+    _, jsonl_path = write_packs(directory, tasks, cases)
+    pack_path = os.path.join(directory, "tasks.pack")
+    print(f"{tasks:,} tasks × {cases} cases")
+
+    print("── seeding")
+    timed("fill_db.py (JSONL)", lambda: fill_db.add_data_to_db("tasks", jsonl_path, 1000))
+    with SessionLocal() as db:
+        timed("export_pack", lambda: export_pack(db, pack_path))
+    print(f"  {'size':<28} {os.path.getsize(pack_path) / 2**20:8.1f} MiB pack vs "
+          f"{os.path.getsize(jsonl_path) / 2**20:.1f} MiB JSONL")
+
+    fresh = os.path.join(directory, "fresh.db")
+    create_database(fresh)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    engine = create_engine(f"sqlite:///{fresh}")
+    with Session(engine) as db:
+        timed("import_pack (fresh db)", lambda: import_pack(TaskPack(pack_path), db))
+    engine.dispose()
+
+    print("── reading")
+    pack = timed("open pack", lambda: TaskPack(pack_path))
+    timed("decode every task", lambda: sum(1 for _ in pack))
+
+    ids = random.Random(0).choices(range(1, tasks + 1), k=reads)
+    with ReadSessionLocal() as db:
+        for task_id in ids[:50]:
+            assert pack.task(task_id) == task_record(load_task_with_cases(db, task_id))
+            db.expunge_all()
+
+        def orm(task_id):
+            task_record(load_task_with_cases(db, task_id))
+            db.expunge_all()
+
+        lookups("pack", pack.task, ids)
+        lookups("selectinload", orm, ids)
+        lookups("grader query", lambda task_id: load_test_cases(db, task_id), ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--cases", type=int, default=3)
+    parser.add_argument("--reads", type=int, default=5000)
+    opts = parser.parse_args()
+    main(opts.tasks, opts.cases, opts.reads)
@@ -0,0 +1,199 @@
+"""
+Throughput of the lint and run endpoints with 1..N uvicorn workers.
+
+For each --workers count, starts `python -m server.serve` on a free port
+(temporary database, offline fake LLM, a fresh SHARED_STATE_PATH), waits
+until it answers and warms it up, then drives each endpoint closed-loop for
+--duration seconds: --clients client processes each keep --concurrency
+requests in flight. Every submission is distinct, so the shared result
+cache cannot answer it. Reports throughput and latency per endpoint and
+worker count, and the speed-up over the first count.
+
+With more than one worker it also checks that a session follows its user:
+--turns AI reviews sent one after another with the same X-Session-Id land
+on whichever worker is free, and the shared store must end up holding the
+last MEMORY_KEEP_TURNS of them, in order.
+
+Throughput can only scale with the cores the server gets; the client
+processes compete for the same cores when run on the server host.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_workers --workers 1 2 4 --duration 10 --output workers.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import ROOT, TASKS_JSON, report, stats, use_temp_database, write_report
+
+ENDPOINTS = {
+    "lint": "/tasks/{task_id}/manual_quality_checker",
+    "run": "/tasks/{task_id}/run",
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, env):
+    """Start `server.serve` and return (process, base url) once it answers."""
+    import httpx
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "server.serve", "--workers", str(workers), "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server.serve exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/tasks", params={"limit": 1}).status_code == 200:
+                return process, url
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("server.serve did not answer within 120 s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def _drive(url, path, task_ids, code, tag, concurrency, duration):
+    import httpx
+
+    samples, errors, sent = [], 0, 0
+    deadline = time.perf_counter() + duration
+
+    async def loop(client, worker):
+        nonlocal errors, sent
+        while time.perf_counter() < deadline:
+            sent += 1
+            body = {"lines": (code + f"\n# {tag}-{worker}-{sent}").splitlines()}
+            started = time.perf_counter()
+            try:
+                response = await client.post(path.format(task_id=task_ids[sent % len(task_ids)]), json=body)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                samples.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        await asyncio.gather(*(loop(client, worker) for worker in range(concurrency)))
+    return samples, errors
+
+
+def _client(args):
+    return asyncio.run(_drive(*args))
+
+
+def drive(url, endpoint, task_ids, code, clients, concurrency, duration):
+    """Closed-loop load from `clients` processes; returns a stats() entry."""
+    tag = uuid.uuid4().hex[:8]
+    jobs = [(url, ENDPOINTS[endpoint], task_ids, code, f"{tag}-{i}", concurrency, duration) for i in range(clients)]
+    started = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        results = pool.map(_client, jobs)
+    elapsed = time.perf_counter() - started
+    samples = [sample for client_samples, _ in results for sample in client_samples]
+    return stats(samples, elapsed, sum(errors for _, errors in results))
+
+
+def check_session(url, shared_state_path, task_id, code, turns):
+    """Send `turns` reviews in one session; True if the store kept the last ones in order."""
+    import httpx
+    import xxhash
+
+    from server.agentic.memory import MEMORY_KEEP_TURNS
+    from server.agentic.shared_state import SharedStore
+
+    session_id = uuid.uuid4().hex
+    digests = []
+    with httpx.Client(base_url=url, timeout=60, headers={"X-Session-Id": session_id}) as client:
+        for turn in range(turns):
+            submission = f"{code}\n# turn {turn} of {session_id}"
+            digests.append(xxhash.xxh3_64_hexdigest(submission.encode("utf-8")))
+            client.post(f"/tasks/{task_id}/ai_checker", json={"lines": submission.splitlines()}).raise_for_status()
+    state = SharedStore(shared_state_path).load_session(session_id) or {"turns": [], "summary": []}
+    expected = digests[-MEMORY_KEEP_TURNS:]
+    kept = [user for user, _ in state["turns"]]
+    in_order = len(kept) == len(expected) and all(digest in user for digest, user in zip(expected, kept))
+    print(f"  session: {len(kept)} verbatim turns + {len(state['summary'])} summary lines after {turns} reviews;"
+          f" last {len(expected)} in order: {in_order}")
+    return in_order
+
+
+def main(opts):
+    use_temp_database()
+    directory = tempfile.mkdtemp(prefix="refactoai-workers-")
+    tasks = json.loads(TASKS_JSON.read_text(encoding="utf-8"))
+    task_ids = [task["id"] for task in tasks]
+    code = tasks[0]["messed_code"]
+
+    results, sessions_ok = {}, True
+    for workers in opts.workers:
+        shared_state_path = os.path.join(directory, f"shared-{workers}.db")
+        env = {**os.environ, "LLM_BACKEND": "fake", "SHARED_STATE_PATH": shared_state_path,
+               "FAKE_LLM_LATENCY_SECONDS": "0.01", "PYTHONPATH": str(ROOT)}
+        process, url = start_server(workers, env)
+        try:
+            print(f"── {workers} worker(s)")
+            for endpoint in opts.endpoints:
+                drive(url, endpoint, task_ids, code, opts.clients, opts.concurrency, opts.warmup)
+            for endpoint in opts.endpoints:
+                result = results[f"{endpoint} x{workers}"] = drive(
+                    url, endpoint, task_ids, code, opts.clients, opts.concurrency, opts.duration)
+                result["workers"] = workers
+                report(f"{endpoint} x{workers}", result)
+            if workers > 1:
+                sessions_ok &= check_session(url, shared_state_path, task_ids[0], code, opts.turns)
+        finally:
+            stop_server(process)
+
+    print("\nSpeed-up over the first worker count:")
+    for endpoint in opts.endpoints:
+        base = results[f"{endpoint} x{opts.workers[0]}"].get("throughput_per_s") or 0
+        for workers in opts.workers:
+            throughput = results[f"{endpoint} x{workers}"].get("throughput_per_s") or 0
+            print(f"  {endpoint:<6} x{workers:<3} {throughput:8.1f}/s  {throughput / base if base else 0:5.2f}x")
+    print(f"\ncores available: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+    write_report(opts.output, "workers", vars(opts), results)
+    return 0 if sessions_ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint and worker count")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unrecorded seconds per endpoint first")
+    parser.add_argument("--clients", type=int, default=2, help="client processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per client process")
+    parser.add_argument("--turns", type=int, default=8, help="reviews in the cross-worker session check")
+    parser.add_argument("--output", help="write the JSON report here")
+    sys.exit(main(parser.parse_args()))
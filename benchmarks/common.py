@@ -0,0 +1,143 @@
+"""Shared helpers for the benchmark scripts."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TASKS_JSON = ROOT / "server" / "tasks.json"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name, samples):
+    """Print p50/p99/mean of a list of durations given in seconds."""
+    ms = [s * 1000 for s in samples]
+    print(
+        f"{name:<12} n={len(ms):<5} p50={percentile(ms, 50):8.2f} ms  "
+        f"p99={percentile(ms, 99):8.2f} ms  mean={statistics.mean(ms):8.2f} ms"
+    )
+
+
+def stats(samples, elapsed=None, errors=0):
+    """
+    Result entry for a JSON report: count, p50/p95/p99/mean in ms of durations
+    given in seconds and, if `elapsed` (seconds) is given, throughput.
+    """
+    ms = [s * 1000 for s in samples]
+    result = {"n": len(ms), "errors": errors}
+    if ms:
+        result.update({f"p{pct}_ms": round(percentile(ms, pct), 3) for pct in (50, 95, 99)})
+        result["mean_ms"] = round(statistics.mean(ms), 3)
+    if elapsed:
+        result["throughput_per_s"] = round(len(ms) / elapsed, 2)
+    return result
+
+
+def report(name, result):
+    """Print one stats() entry."""
+    if not result["n"]:
+        print(f"{name:<30} n=0  errors={result['errors']}")
+        return
+    throughput = f"  {result['throughput_per_s']:9.1f}/s" if "throughput_per_s" in result else ""
+    print(f"{name:<30} n={result['n']:<6} p50={result['p50_ms']:8.2f} ms  p95={result['p95_ms']:8.2f} ms  "
+          f"p99={result['p99_ms']:8.2f} ms{throughput}  errors={result['errors']}")
+
+
+def environment():
+    """Where a report was produced, so two reports can be judged comparable."""
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                            capture_output=True, text=True, check=False).stdout.strip()
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def write_report(path, suite, params, results):
+    """Write a JSON report ({"suite", "environment", "params", "results"}) for compare.py."""
+    document = {"suite": suite, "environment": environment(), "params": params, "results": results}
+    if path:
+        Path(path).write_text(json.dumps(document, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {path}")
+    return document
+
+
+def synthetic_tasks(count, start_id=1):
+    """Yield `count` task rows shaped like the tasks.json entries, ids from start_id."""
+    templates = json.loads(TASKS_JSON.read_text(encoding="utf-8"))
+    for offset in range(count):
+        template = templates[offset % len(templates)]
+        task_id = start_id + offset
+        yield {
+            "id": task_id,
+            "name": f"{template['name']} #{task_id}"[:50],
+            "description": template["description"],
+            "topic": template["topic"],
+            "correct_code": template["correct_code"],
+            "messed_code": template["messed_code"],
+        }
+
+
+def add_synthetic_tasks(count, start_id):
+    """Append synthetic tasks to the DATABASE_PATH database."""
+    import sqlite3
+
+    with sqlite3.connect(os.environ["DATABASE_PATH"]) as conn:
+        conn.executemany(
+            "INSERT INTO tasks (id, name, description, topic, correct_code, messed_code)"
+            " VALUES (:id, :name, :description, :topic, :correct_code, :messed_code)",
+            synthetic_tasks(count, start_id),
+        )
+
+
+def add_synthetic_cases(task_ids, cases):
+    """Give each task `cases` InputOutput rows holding two inputs and one output."""
+    import sqlite3
+
+    with sqlite3.connect(os.environ["DATABASE_PATH"]) as conn:
+        (io_id,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM input_output").fetchone()
+        for task_id in task_ids:
+            for _ in range(cases):
+                io_id += 1
+                conn.execute("INSERT INTO input_output (id, task_id) VALUES (?, ?)", (io_id, task_id))
+                conn.executemany("INSERT INTO input (input_output_id, input, input_type) VALUES (?, ?, 'int')",
+                                 [(io_id, str(io_id)), (io_id, str(io_id + 1))])
+                conn.execute("INSERT INTO output (input_output_id, output, output_type) VALUES (?, ?, 'int')",
+                             (io_id, str(2 * io_id + 1)))
+
+
+def use_temp_database():
+    """
+    Point DATABASE_PATH at a throwaway SQLite file seeded from tasks.json.
+    Must run before anything imports server.database.db.
+    """
+    if os.getenv("DATABASE_PATH") or os.getenv("DATABASE_URL"):
+        return
+    path = os.path.join(tempfile.mkdtemp(prefix="refactoai-bench-"), "bench.db")
+    os.environ["DATABASE_PATH"] = path
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from server.database import db_models as models
+    from server.database.migrations import ensure_schema
+
+    engine = create_engine(f"sqlite:///{path}")
+    ensure_schema(engine)  # what the app's start-up would do, indexes and tasks_fts included
+    fields = ("id", "name", "description", "topic", "correct_code", "messed_code")
+    with Session(engine) as session:
+        for row in json.loads(TASKS_JSON.read_text(encoding="utf-8")):
+            session.add(models.Task(**{key: row[key] for key in fields}))
+        session.commit()
+    engine.dispose()
@@ -0,0 +1,92 @@
+"""
+Compare two JSON reports of benchmarks.micro or benchmarks.load.
+
+An entry regresses when one of its latency percentiles grew by more than
+--threshold percent and by at least --min-ms (so jitter on sub-millisecond
+paths is not flagged), when its throughput fell by more than --threshold
+percent, or when it had more errors. Entries present in only one report are
+listed but not judged. Exits with status 1 if anything regressed, so a CI
+job can gate on it.
+
+Differences in the environment (commit, Python, CPU count) are printed
+first: reports from different machines rarely compare well.
+
+Usage (from the repository root):
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+THROUGHPUT_KEYS = ("throughput_per_s", "rows_per_s")
+
+
+def _change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare_entry(old, new, threshold, min_ms):
+    """(cells for the table, reasons the entry regressed)."""
+    cells, reasons = [], []
+    for key in LATENCY_KEYS:
+        if key not in old or key not in new:
+            cells.append("")
+            continue
+        change = _change(old[key], new[key])
+        cells.append(f"{new[key]:9.2f} ({change:+6.1f}%)")
+        if change > threshold and new[key] - old[key] >= min_ms:
+            reasons.append(f"{key} {old[key]:.2f} -> {new[key]:.2f}")
+    for key in THROUGHPUT_KEYS:
+        if key in old and key in new:
+            change = _change(old[key], new[key])
+            cells.append(f"{new[key]:9.1f} ({change:+6.1f}%)")
+            if -change > threshold:
+                reasons.append(f"{key} {old[key]:.1f} -> {new[key]:.1f}")
+            break
+    else:
+        cells.append("")
+    if new.get("errors", 0) > old.get("errors", 0):
+        reasons.append(f"errors {old.get('errors', 0)} -> {new['errors']}")
+    return cells, reasons
+
+
+def compare(baseline, candidate, threshold, min_ms):
+    """Print the comparison; returns the names of the regressed entries."""
+    if baseline.get("suite") != candidate.get("suite"):
+        print(f"warning: comparing a {baseline.get('suite')!r} report with a {candidate.get('suite')!r} report")
+    old_env, new_env = baseline.get("environment", {}), candidate.get("environment", {})
+    for key in sorted(set(old_env) | set(new_env)):
+        if key != "timestamp" and old_env.get(key) != new_env.get(key):
+            print(f"{key}: {old_env.get(key)} -> {new_env.get(key)}")
+
+    old_results, new_results = baseline["results"], candidate["results"]
+    print(f"{'':<30} {'p50 ms':>19} {'p95 ms':>19} {'p99 ms':>19} {'throughput':>19}")
+    regressed = []
+    for name in list(old_results) + [name for name in new_results if name not in old_results]:
+        if name not in old_results or name not in new_results:
+            print(f"{name:<30} only in the {'baseline' if name in old_results else 'candidate'}")
+            continue
+        cells, reasons = compare_entry(old_results[name], new_results[name], threshold, min_ms)
+        print(f"{name:<30} " + " ".join(f"{cell:>19}" for cell in cells))
+        if reasons:
+            regressed.append(name)
+            print(f"{'':<30} REGRESSION: {'; '.join(reasons)}")
+    return regressed
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    parser.add_argument("--min-ms", type=float, default=0.05, help="ignore latency changes smaller than this")
+    opts = parser.parse_args()
+    regressions = compare(load_report(opts.baseline), load_report(opts.candidate), opts.threshold, opts.min_ms)
+    print(f"\n{len(regressions)} regression(s)" + (f": {', '.join(regressions)}" if regressions else ""))
+    sys.exit(1 if regressions else 0)
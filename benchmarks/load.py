@@ -0,0 +1,209 @@
+"""
+Open-loop load generator for the API, written as a JSON report.
+
+Each scenario sends requests at a fixed rate for --duration seconds on a
+schedule that never waits for responses: request i is due at start + i/rate
+however slow the server gets, and its latency counts from that due time.
+A server that falls behind therefore shows up as queueing in the
+percentiles, instead of being hidden by a client that slows down with it.
+At most --max-in-flight requests are outstanding at once.
+
+By default the app runs in-process (httpx ASGI transport, lifespan
+included) on a temporary database grown to --catalog-size tasks, with the
+offline fake LLM (LLM_BACKEND=fake, latency FAKE_LLM_LATENCY_SECONDS). The
+generator then shares the event loop with the app, so its own overhead is
+part of the numbers. With --url the requests go to a running server, which
+uses its own catalog and LLM backend.
+
+Scenarios, each NAME or NAME=RATE (requests per second, default --rate):
+    tasks       GET  /tasks?limit=20&cursor=...
+    task        GET  /tasks/{id}
+    run         POST /tasks/{id}/run
+    lint        POST /tasks/{id}/manual_quality_checker
+    ai_checker  POST /tasks/{id}/ai_checker
+    chat        POST /chat
+
+Submissions are messed_code from tasks.json; a --unique fraction of them get
+a distinct comment line, so the result cache cannot answer them. Scenarios
+run one after another, or all at once with --mix, each after --warmup
+unrecorded requests (the lint process pool, for one, starts on first use).
+
+Usage (from the repository root):
+    python -m benchmarks.load --duration 10 --scenarios tasks=200 task=200 run=20 lint=5 \\
+        ai_checker=20 chat=20 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from contextlib import AsyncExitStack
+
+from benchmarks.common import TASKS_JSON, report, stats, write_report
+
+SCENARIOS = ("tasks", "task", "run", "lint", "ai_checker", "chat")
+
+
+class Workload:
+    """Request factory shared by the scenarios."""
+
+    def __init__(self, task_ids, unique, seed=0):
+        self.task_ids = task_ids
+        self.unique = unique
+        self.rng = random.Random(seed)
+        self.submissions = [task["messed_code"] for task in json.loads(TASKS_JSON.read_text(encoding="utf-8"))]
+
+    def _submission(self, index):
+        code = self.rng.choice(self.submissions)
+        if self.rng.random() < self.unique:
+            code += f"\n# submission {index}"
+        return {"lines": code.splitlines()}
+
+    def request(self, scenario, index):
+        """(method, url, json body) of request number `index` of a scenario."""
+        task_id = self.rng.choice(self.task_ids)
+        if scenario == "tasks":
+            return "GET", f"/tasks?limit=20&cursor={task_id}", None
+        if scenario == "task":
+            return "GET", f"/tasks/{task_id}", None
+        if scenario == "run":
+            return "POST", f"/tasks/{task_id}/run", self._submission(index)
+        if scenario == "lint":
+            return "POST", f"/tasks/{task_id}/manual_quality_checker", self._submission(index)
+        if scenario == "ai_checker":
+            return "POST", f"/tasks/{task_id}/ai_checker", self._submission(index)
+        if scenario == "chat":
+            return "POST", "/chat", {"content": f"How would you refactor task {task_id}? ({index})"}
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+
+async def warm_up(client, workload, scenario, requests):
+    for index in range(1, requests + 1):
+        method, url, body = workload.request(scenario, -index)
+        await client.request(method, url, json=body)
+
+
+async def drive(client, workload, scenario, rate, duration, max_in_flight):
+    """Send `scenario` at `rate` requests/s for `duration` s; returns its stats() entry."""
+    gate = asyncio.Semaphore(max_in_flight)
+    samples, statuses, errors = [], Counter(), 0
+
+    async def one(index, due):
+        nonlocal errors
+        method, url, body = workload.request(scenario, index)
+        async with gate:
+            try:
+                response = await client.request(method, url, json=body)
+            except Exception:  # pylint: disable=broad-exception-caught
+                statuses["exception"] += 1
+                errors += 1
+                return
+        statuses[str(response.status_code)] += 1
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            samples.append(time.perf_counter() - due)
+
+    pending = []
+    started = time.perf_counter()
+    for index in range(max(1, round(rate * duration))):
+        due = started + index / rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        pending.append(asyncio.create_task(one(index, due)))
+    await asyncio.gather(*pending)
+    result = stats(samples, time.perf_counter() - started, errors)
+    result.update(target_rate=rate, statuses=dict(statuses))
+    return result
+
+
+async def fetch_task_ids(client):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 500, "fields": "id", **({"cursor": cursor} if cursor is not None else {})}
+        response = await client.get("/tasks", params=params)
+        response.raise_for_status()
+        page = response.json()
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def parse_scenarios(specs, default_rate):
+    rates = {}
+    for spec in specs:
+        name, _, rate = spec.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        rates[name] = float(rate) if rate else default_rate
+    return rates
+
+
+def in_process_app(catalog_size):
+    """The app on a temporary database of `catalog_size` tasks, with the fake LLM."""
+    from benchmarks.common import add_synthetic_tasks, use_temp_database
+
+    os.environ["LLM_BACKEND"] = "fake"
+    use_temp_database()
+    seeded = len(json.loads(TASKS_JSON.read_text(encoding="utf-8")))
+    if catalog_size > seeded:
+        add_synthetic_tasks(catalog_size - seeded, start_id=1000)
+
+    from server.main import app, lifespan
+
+    return app, lifespan
+
+
+async def main(opts):
+    import httpx
+
+    rates = parse_scenarios(opts.scenarios, opts.rate)
+    async with AsyncExitStack() as stack:
+        if opts.url:
+            client = httpx.AsyncClient(base_url=opts.url, timeout=opts.timeout,
+                                       limits=httpx.Limits(max_connections=opts.max_in_flight))
+        else:
+            app, lifespan = in_process_app(opts.catalog_size)
+            await stack.enter_async_context(lifespan(app))
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                       timeout=opts.timeout)
+        await stack.enter_async_context(client)
+
+        workload = Workload(await fetch_task_ids(client), opts.unique)
+        print(f"{len(workload.task_ids)} tasks; {opts.duration:g} s per scenario"
+              f"{' (mixed)' if opts.mix else ''}; unique submissions {opts.unique:.0%}")
+
+        for name in rates:
+            await warm_up(client, workload, name, opts.warmup)
+
+        def run(name):
+            return drive(client, workload, name, rates[name], opts.duration, opts.max_in_flight)
+
+        if opts.mix:
+            results = dict(zip(rates, await asyncio.gather(*(run(name) for name in rates))))
+        else:
+            results = {name: await run(name) for name in rates}
+
+    for name, result in results.items():
+        report(f"{name} @ {result['target_rate']:g}/s", result)
+    write_report(opts.output, "load", vars(opts), results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), metavar="NAME[=RATE]")
+    parser.add_argument("--rate", type=float, default=20.0, help="requests/s of scenarios without =RATE")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--catalog-size", type=int, default=1000, help="tasks in the in-process catalog")
+    parser.add_argument("--unique", type=float, default=1.0, help="fraction of submissions made distinct")
+    parser.add_argument("--warmup", type=int, default=3, help="unrecorded requests per scenario")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--mix", action="store_true", help="run all scenarios at the same time")
+    parser.add_argument("--url", help="load a running server instead of the in-process app")
+    parser.add_argument("--output", help="write the JSON report here")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,140 @@
+"""
+Micro-benchmarks of the tools behind the API, written as a JSON report.
+
+* run_python_code: ScriptRunner.run_python_code on the worker pool, with
+  distinct code on every call (cache misses) and one repeated submission
+  (cache hits)
+* check_code_with_pylint: CodeChecker.check_code_with_pylint on a task's
+  messed_code, likewise
+* load_task_with_cases / lazy relationships: one task and its --cases test
+  cases, out of --tasks synthetic tasks, fresh session per call
+* fill_db: seeding a fresh database from a JSONL pack of --pack-tasks tasks,
+  each of --fill-runs runs in its own process (as bench_fill_db does)
+
+Every benchmark runs --warmup unrecorded calls first. Compare two reports
+with benchmarks.compare.
+
+Usage (from the repository root):
+    python -m benchmarks.micro --iterations 200 --output micro.json
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import (
+    TASKS_JSON,
+    add_synthetic_cases,
+    add_synthetic_tasks,
+    report,
+    stats,
+    use_temp_database,
+    write_report,
+)
+
+use_temp_database()
+
+from benchmarks import bench_fill_db  # noqa: E402
+from server.agentic.tools import CodeChecker, ScriptRunner  # noqa: E402
+from server.agentic.worker_pool import shutdown_worker_pool  # noqa: E402
+from server.database import db_models as models  # noqa: E402
+from server.database.db import SessionLocal  # noqa: E402
+from server.database.loaders import load_task_with_cases  # noqa: E402
+
+RUN_CODE = """
+def calculate_sum(value_a, value_b):
+    return value_a + value_b
+
+print(calculate_sum(int(input()), {index}))
+"""
+
+
+def measure(call, iterations, warmup):
+    """stats() of `call(index)`; warm-up calls get negative indexes, so they never share a cache entry."""
+    for index in range(1, warmup + 1):
+        call(-index)
+    samples = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        call_started = time.perf_counter()
+        call(index)
+        samples.append(time.perf_counter() - call_started)
+    return stats(samples, time.perf_counter() - started)
+
+
+def bench_tools(iterations, warmup):
+    lint_code = json.loads(TASKS_JSON.read_text(encoding="utf-8"))[0]["messed_code"]
+    calls = {
+        "run_python_code": lambda i: ScriptRunner.run_python_code(RUN_CODE.format(index=i), inputs=["10"]),
+        "run_python_code cached": lambda i: ScriptRunner.run_python_code(RUN_CODE.format(index=0), inputs=["10"]),
+        "check_code_with_pylint": lambda i: CodeChecker.check_code_with_pylint(f"{lint_code}\n# {i}\n"),
+        "check_code_with_pylint cached": lambda i: CodeChecker.check_code_with_pylint(lint_code),
+    }
+    try:
+        return {name: measure(call, iterations, warmup) for name, call in calls.items()}
+    finally:
+        shutdown_worker_pool()
+
+
+def bench_orm(tasks, cases, iterations, warmup):
+    add_synthetic_tasks(tasks, start_id=1000)
+    add_synthetic_cases(range(1000, 1000 + tasks), cases)
+    ids = random.Random(0).choices(range(1000, 1000 + tasks), k=iterations + warmup)
+
+    def loader(index):
+        with SessionLocal() as db:
+            task = load_task_with_cases(db, ids[index])
+            return sum(len(case.inputs) + len(case.outputs) for case in task.input_outputs)
+
+    def lazy(index):
+        with SessionLocal() as db:
+            task = db.get(models.Task, ids[index])
+            return sum(len(case.inputs) + len(case.outputs) for case in task.input_outputs)
+
+    return {
+        "load_task_with_cases": measure(loader, iterations, warmup),
+        "lazy relationships": measure(lazy, iterations, warmup),
+    }
+
+
+def bench_fill(pack_tasks, cases, runs, batch_size):
+    directory = tempfile.mkdtemp(prefix="refactoai-fill-")
+    _, jsonl_path = bench_fill_db.write_packs(directory, pack_tasks, cases)
+    samples, rows = [], 0
+    for run in range(runs):
+        db_path = os.path.join(directory, f"fill-{run}.db")
+        bench_fill_db.create_database(db_path)
+        result = bench_fill_db.run("jsonl", db_path, jsonl_path, batch_size)
+        samples.append(result["elapsed"])
+        rows = result["rows"]
+    result = stats(samples)
+    result["rows"] = rows
+    result["rows_per_s"] = round(rows / min(samples))
+    return {"fill_db jsonl": result}
+
+
+def main(opts):
+    results = {}
+    results.update(bench_tools(opts.iterations, opts.warmup))
+    results.update(bench_orm(opts.tasks, opts.cases, opts.iterations, opts.warmup))
+    if opts.fill_runs:
+        results.update(bench_fill(opts.pack_tasks, opts.cases, opts.fill_runs, opts.batch_size))
+    print()
+    for name, result in results.items():
+        report(name, result)
+    write_report(opts.output, "micro", vars(opts), results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=5000, help="synthetic catalog size for the ORM benchmarks")
+    parser.add_argument("--cases", type=int, default=10, help="test cases per task")
+    parser.add_argument("--pack-tasks", type=int, default=20000, help="tasks in the fill_db pack")
+    parser.add_argument("--fill-runs", type=int, default=3, help="fill_db runs (0 skips it)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", help="write the JSON report here")
+    main(parser.parse_args())
@@ -0,0 +1,212 @@
+"""
+Batch grading: one task, many submissions (re-grading a cohort, CI).
+
+Submissions come as a JSON list or as JSONL, optionally zstd-compressed.
+Identical submissions (after line-ending normalization) are graded once and
+share the result. Up to BATCH_GRADE_CONCURRENCY distinct submissions are in
+flight at a time: each is graded by TestCaseGrader on the sandbox worker
+pool and linted by AsyncCodeChecker on the lint process pool, the same calls
+the single-shot /grade and /manual_quality_checker routes make, so the
+results match theirs. Results are yielded as they complete, not in input
+order; every one carries the submission's index.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import orjson
+import xxhash
+
+from server.agentic.concurrency import resource_slots
+from server.agentic.grader import TestCase, TestCaseGrader
+from server.agentic.result_cache import normalize_code
+from server.agentic.sandbox_worker import DEFAULT_FLOAT_TOLERANCE
+from server.agentic.tools import AsyncCodeChecker
+
+# Configuration (overridable through .env)
+BATCH_GRADE_CONCURRENCY = int(os.getenv("BATCH_GRADE_CONCURRENCY", "4"))  # distinct submissions in flight
+BATCH_GRADE_MAX_SUBMISSIONS = int(os.getenv("BATCH_GRADE_MAX_SUBMISSIONS", "10000"))
+BATCH_GRADE_MAX_BYTES = int(os.getenv("BATCH_GRADE_MAX_BYTES", str(64 * 1024 * 1024)))  # decompressed upload
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class BatchInputError(ValueError):
+    """The upload cannot be read as a batch of submissions."""
+
+
+@dataclass
+class Submission:
+    index: int
+    id: Optional[str]
+    code: str
+
+
+def submission_digest(code: str) -> str:
+    return xxhash.xxh3_128_hexdigest(normalize_code(code).encode("utf-8"))
+
+
+def _submission(index: int, item: Any) -> Submission:
+    if isinstance(item, str):
+        return Submission(index, None, item)
+    if not isinstance(item, dict):
+        raise BatchInputError(f"Submission {index}: expected an object or a string")
+    if isinstance(item.get("code"), str):
+        code = item["code"]
+    elif isinstance(item.get("lines"), list) and all(isinstance(line, str) for line in item["lines"]):
+        code = "\n".join(item["lines"])
+    else:
+        raise BatchInputError(f"Submission {index}: needs \"code\" (a string) or \"lines\" (a list of strings)")
+    sid = item.get("id")
+    return Submission(index, None if sid is None else str(sid), code)
+
+
+def decompress(body: bytes) -> bytes:
+    """Inflate a zstd upload, refusing more than BATCH_GRADE_MAX_BYTES of output."""
+    import zstandard as zstd
+
+    try:
+        with zstd.ZstdDecompressor().stream_reader(io.BytesIO(body)) as reader:
+            data = reader.read(BATCH_GRADE_MAX_BYTES + 1)
+    except zstd.ZstdError as e:
+        raise BatchInputError(f"Invalid zstd upload: {e}") from e
+    if len(data) > BATCH_GRADE_MAX_BYTES:
+        raise BatchInputError(f"Upload inflates to more than {BATCH_GRADE_MAX_BYTES} bytes")
+    return data
+
+
+def parse_submissions(body: bytes, jsonl: bool = False) -> List[Submission]:
+    """
+    Submissions from an upload: a JSON list (or {"submissions": [...]}) or,
+    with `jsonl`, one JSON value per line. zstd frames are recognized by
+    their magic number and inflated first. Each item is {"id"?, "code"} or
+    {"id"?, "lines"}, or a bare string of code.
+    """
+    if body.startswith(ZSTD_MAGIC):
+        body, jsonl = decompress(body), True
+    try:
+        if jsonl:
+            items = [orjson.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = orjson.loads(body)
+            if isinstance(items, dict):
+                items = items.get("submissions")
+    except orjson.JSONDecodeError as e:
+        raise BatchInputError(f"Invalid JSON: {e}") from e
+    if not isinstance(items, list):
+        raise BatchInputError("Expected a list of submissions")
+    if not items:
+        raise BatchInputError("No submissions")
+    if len(items) > BATCH_GRADE_MAX_SUBMISSIONS:
+        raise BatchInputError(f"At most {BATCH_GRADE_MAX_SUBMISSIONS} submissions per batch")
+    return [_submission(index, item) for index, item in enumerate(items)]
+
+
+class BatchGrader:
+    """
+    Grades a batch of submissions to one task.
+
+    Args:
+        task_id: The task (part of the lint cache key, as in single-shot lints).
+        cases: Its test cases.
+        correct_code: Its reference solution; required when `reference` is set.
+        reference: Grade against correct_code's outputs (differential grading).
+        lint: Also lint every submission.
+        stop_on_first_failure, compare, tolerance: As in TestCaseGrader.grade().
+        concurrency: Distinct submissions graded at the same time.
+    """
+
+    def __init__(self, task_id: int, cases: List[TestCase], correct_code: Optional[str] = None,
+                 reference: bool = False, lint: bool = True, stop_on_first_failure: bool = False,
+                 compare: str = "exact", tolerance: float = DEFAULT_FLOAT_TOLERANCE,
+                 concurrency: int = BATCH_GRADE_CONCURRENCY):
+        self.task_id = task_id
+        self.cases = cases
+        self.correct_code = correct_code
+        self.reference = reference
+        self.lint = lint
+        self.stop_on_first_failure = stop_on_first_failure
+        self.compare = compare
+        self.tolerance = tolerance
+        self.concurrency = max(1, concurrency)
+
+    def _grade_sync(self, code: str) -> Dict[str, Any]:
+        if self.reference:
+            result = TestCaseGrader.grade_against_reference(
+                code, self.task_id, self.correct_code, self.cases, self.stop_on_first_failure,
+                compare=self.compare, tolerance=self.tolerance,
+            )
+        else:
+            result = TestCaseGrader.grade(code, self.cases, self.stop_on_first_failure,
+                                          compare=self.compare, tolerance=self.tolerance)
+        return result.to_dict()
+
+    async def grade_one(self, code: str) -> Dict[str, Any]:
+        """Grade (and lint) one submission: {"result": grade, "lint": report}."""
+        async def grade():
+            # The sandbox pool blocks on a pipe; keep that wait off the event loop
+            async with resource_slots("run"):
+                return await asyncio.to_thread(self._grade_sync, code)
+
+        if not self.lint:
+            return {"result": await grade()}
+        result, report = await asyncio.gather(grade(), AsyncCodeChecker.lint_code(code, self.task_id))
+        return {"result": result, "lint": report.to_dict()}
+
+    async def stream(self, submissions: List[Submission]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield one record per submission as results complete, then a summary
+        record {"done": true, ...}. A submission whose grading raised gets an
+        "error" instead of a result; the others are not affected.
+        """
+        started = time.perf_counter()
+        groups: Dict[str, List[Submission]] = {}
+        for submission in submissions:
+            groups.setdefault(submission_digest(submission.code), []).append(submission)
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for digest, group in groups.items():
+            pending.put_nowait((digest, group))
+        done: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            while True:
+                try:
+                    digest, group = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    outcome = await self.grade_one(group[0].code)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    outcome = {"error": f"{type(e).__name__}: {e}"}
+                await done.put((digest, group, outcome))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(groups)))]
+        all_passed = errors = 0
+        try:
+            for _ in range(len(groups)):
+                digest, group, outcome = await done.get()
+                errors += len(group) if "error" in outcome else 0
+                all_passed += len(group) if outcome.get("result", {}).get("all_passed") else 0
+                for position, submission in enumerate(group):
+                    yield {"index": submission.index, "id": submission.id, "digest": digest,
+                           "duplicate_of": group[0].index if position else None, **outcome}
+        finally:
+            # Also runs when the client goes away mid-stream
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        yield {
+            "done": True,
+            "submissions": len(submissions),
+            "unique": len(groups),
+            "all_passed": all_passed,
+            "errors": errors,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
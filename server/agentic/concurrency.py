@@ -0,0 +1,146 @@
+"""
+Per-resource concurrency limits for the async tools.
+
+Each resource class (code runs, lint jobs, LLM calls) gets one bounded
+budget of slots so a burst of slow requests queues instead of exhausting
+threads, processes or upstream rate limits. The budget is shared by every
+caller in the process: coroutines on any event loop (``async with``) and
+blocking callers such as job workers and scripts (``with``) draw from the
+same slots, so LLM_CONCURRENCY caps upstream calls however they are made.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import os
+import threading
+from typing import Deque, Dict, Tuple, Union
+
+RESOURCE_LIMITS: Dict[str, int] = {
+    "run": int(os.getenv("RUN_CONCURRENCY", "8")),
+    "lint": int(os.getenv("LINT_CONCURRENCY", "2")),
+    "llm": int(os.getenv("LLM_CONCURRENCY", "16")),
+}
+
+
+class Slots:
+    """
+    A bounded semaphore usable from threads and from any number of event
+    loops. Waiters are served first come, first served; a released slot is
+    handed straight to the next one, so waiting coroutines never park a
+    thread. A coroutine cancelled while its slot is being handed over passes
+    the slot on.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._free = self.limit
+        self._lock = threading.Lock()
+        self._waiters: Deque[Union[threading.Event, Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = (
+            collections.deque()
+        )
+
+    def _try_acquire(self) -> bool:
+        if self._free and not self._waiters:
+            self._free -= 1
+            return True
+        return False
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._try_acquire():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire():
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            # Handed over already: release it here; while being handed over,
+            # _hand_over() finds the future cancelled and releases it
+            if not queued and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+                except RuntimeError:  # its event loop is closed
+                    continue
+            if self._free >= self.limit:
+                raise ValueError("Slots released too many times")
+            self._free += 1
+
+    def usage(self) -> Dict[str, int]:
+        with self._lock:
+            return {"limit": self.limit, "in_use": self.limit - self._free, "waiting": len(self._waiters)}
+
+    def __enter__(self) -> "Slots":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    async def __aenter__(self) -> "Slots":
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+_slots: Dict[str, Slots] = {}
+_slots_lock = threading.Lock()
+
+
+def resource_slots(resource: str) -> Slots:
+    """Return the slots guarding a resource class; ``async with`` them on any event loop."""
+    with _slots_lock:
+        if resource not in _slots:
+            _slots[resource] = Slots(RESOURCE_LIMITS[resource])
+        return _slots[resource]
+
+
+def thread_slots(resource: str) -> Slots:
+    """Return the same slots for blocking callers; ``with`` them from any thread."""
+    return resource_slots(resource)
+
+
+def slot_usage() -> Dict[str, Dict[str, int]]:
+    """
+    Slots in use and callers waiting per resource class, over every event
+    loop and thread; a snapshot for metrics, not for decisions.
+    """
+    with _slots_lock:
+        slots = dict(_slots)
+    return {resource: slots[resource].usage() if resource in slots else
+            {"limit": max(1, limit), "in_use": 0, "waiting": 0}
+            for resource, limit in RESOURCE_LIMITS.items()}
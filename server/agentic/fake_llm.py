@@ -0,0 +1,65 @@
+"""
+Offline stand-in for the OpenAI chat models (LLM_BACKEND=fake).
+
+Canned replies after a simulated delay, so the API can be load-tested
+without network access or an API key. Imported only when the fake backend
+is selected, as it pulls in LangChain's fake chat models.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from itertools import cycle
+from typing import Any, AsyncIterator
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+FAKE_REVIEW = json.dumps({
+    "answer": "Offline review: the structure works, but responsibilities could be separated more clearly.",
+    "hints": [
+        "Consider which design pattern the task is about and where it belongs in your code.",
+        "Check naming and function length against the Pylint report.",
+        "Add type hints and docstrings to the public classes.",
+    ],
+    "score": 70,
+})
+FAKE_CHAT = "Offline reply: break the problem into small functions and name each after what it does."
+
+
+class FakeChatModel(GenericFakeChatModel):
+    """Offline stand-in for ChatOpenAI: canned replies after a simulated delay."""
+
+    latency: float = 0.0
+    chunk_delay: float = 0.0
+
+    def _generate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._reply(*args, **kwargs)
+
+    async def _agenerate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._reply(*args, **kwargs)
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        # Word-sized chunks like GenericFakeChatModel, without blocking the loop
+        await asyncio.sleep(self.latency)
+        message = self._reply(*args, **kwargs).generations[0].message
+        for token in re.split(r"(\s)", message.content):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token, id=message.id))
+            await asyncio.sleep(self.chunk_delay)
+
+    def _reply(self, *args: Any, **kwargs: Any) -> ChatResult:
+        return super()._generate(*args, **kwargs)
+
+
+def fake_chat_model(json_mode: bool, latency: float, chunk_delay: float) -> FakeChatModel:
+    """A model answering every prompt with FAKE_REVIEW (json_mode) or FAKE_CHAT."""
+    return FakeChatModel(
+        messages=cycle([AIMessage(content=FAKE_REVIEW if json_mode else FAKE_CHAT)]),
+        latency=latency,
+        chunk_delay=chunk_delay,
+    )
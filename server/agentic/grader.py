@@ -0,0 +1,286 @@
+"""
+Test-case grader for task submissions.
+
+Loads every InputOutput case of a task in one query and runs them all in a
+single sandbox worker: the submission is compiled once and executed per case
+with a fresh namespace and its own stdin, instead of one interpreter per case.
+The worker enforces the timeout per case, so a case that hangs fails alone
+and the cases before it keep their results. With the worker pool disabled
+(RUNNER_POOL_SIZE=0) each job gets a one-shot worker instead.
+
+Differential grading checks a submission against the task's correct_code
+instead of the stored outputs. The reference output of every case is cached
+by task, reference code and stdin, so once a task's suite is warm grading
+only runs the submission.
+"""
+from __future__ import annotations
+
+import difflib
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from server.agentic.result_cache import get_result_cache, make_key
+from server.agentic.sandbox_worker import COMPARE_RULES, DEFAULT_FLOAT_TOLERANCE
+from server.agentic.tools import ScriptRunner
+from server.agentic.worker_pool import (
+    RUNNER_TIMEOUT_SECONDS,
+    WorkerCrashed,
+    get_worker_pool,
+    reply_usage,
+    worker_pool_enabled,
+)
+from server.database import db_models as models
+
+
+@dataclass
+class TestCase:
+    id: int
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+
+    @property
+    def stdin(self) -> Optional[str]:
+        return "\n".join(self.inputs) + "\n" if self.inputs else None
+
+    @property
+    def expected(self) -> str:
+        return "\n".join(self.outputs)
+
+
+@dataclass
+class CaseResult:
+    case_id: int
+    passed: bool
+    expected: str
+    actual: str
+    time_ms: float
+    diff: str = ""
+    error: str = ""
+    cpu_ms: float = 0.0
+    limit: Optional[str] = None  # sandbox limit the case ran into
+
+
+@dataclass
+class GradeResult:
+    cases: List[CaseResult] = field(default_factory=list)
+    total: int = 0
+    usage: Dict[str, Any] = field(default_factory=dict)
+    # Differential grading only: {"runs", "cached", "failed"} reference cases
+    reference: Optional[Dict[str, int]] = None
+
+    @property
+    def passed(self) -> int:
+        return sum(case.passed for case in self.cases)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "passed": self.passed,
+            "total": self.total,
+            "all_passed": self.total > 0 and self.passed == self.total,
+            "cases": [asdict(case) for case in self.cases],
+            "usage": self.usage,
+            "reference": self.reference,
+        }
+
+
+def load_test_cases(db: Session, task_id: int) -> List[TestCase]:
+    """Fetch all of a task's cases with their inputs and outputs in a single query."""
+    stmt = (
+        select(
+            models.InputOutput.id,
+            models.Input.id,
+            models.Input.input,
+            models.Output.id,
+            models.Output.output,
+        )
+        .outerjoin(models.Input, models.Input.input_output_id == models.InputOutput.id)
+        .outerjoin(models.Output, models.Output.input_output_id == models.InputOutput.id)
+        .where(models.InputOutput.task_id == task_id)
+        .order_by(models.InputOutput.id, models.Input.id, models.Output.id)
+    )
+
+    cases: Dict[int, TestCase] = {}
+    seen_inputs, seen_outputs = set(), set()
+    # The two outer joins multiply rows (inputs x outputs); keep each row once
+    for case_id, input_id, input_value, output_id, output_value in db.execute(stmt):
+        case = cases.setdefault(case_id, TestCase(id=case_id))
+        if input_id is not None and input_id not in seen_inputs:
+            seen_inputs.add(input_id)
+            case.inputs.append(input_value)
+        if output_id is not None and output_id not in seen_outputs:
+            seen_outputs.add(output_id)
+            case.outputs.append(output_value)
+    return list(cases.values())
+
+
+def pack_test_cases(record: Dict[str, Any]) -> List[TestCase]:
+    """The cases of a task-pack record (server.database.task_pack), in the same order."""
+    return [
+        TestCase(
+            id=case["id"],
+            inputs=[inp["input"] for inp in case["inputs"]],
+            outputs=[out["output"] for out in case["outputs"]],
+        )
+        for case in record["test_cases"]
+    ]
+
+
+def reference_key(task_id: int, correct_code: str, case: TestCase) -> str:
+    return make_key("reference", sys.version, correct_code, task_id, [case.stdin])
+
+
+def _job_timeout(case_timeout: float, cases: int) -> float:
+    # The worker stops every case at case_timeout; this only catches a worker that stops answering
+    return case_timeout * (cases + 1)
+
+
+def _submit(job: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    if worker_pool_enabled():
+        return get_worker_pool().submit(job, timeout)
+    return ScriptRunner.spawn_job(job, timeout)
+
+
+def _diff(expected: str, actual: str) -> str:
+    return "\n".join(difflib.unified_diff(
+        expected.splitlines(), actual.splitlines(), "expected", "actual", lineterm="",
+    ))
+
+
+class TestCaseGrader:
+    """Runs a submission against a list of TestCase objects."""
+
+    @staticmethod
+    def grade(
+        code_string: str,
+        cases: List[TestCase],
+        stop_on_first_failure: bool = False,
+        timeout: Optional[float] = None,
+        compare: str = "exact",
+        tolerance: float = DEFAULT_FLOAT_TOLERANCE,
+    ) -> GradeResult:
+        """
+        Grade a submission.
+
+        Args:
+            code_string: The submitted Python source.
+            cases: Test cases, usually from load_test_cases().
+            stop_on_first_failure: Skip the remaining cases after a failure.
+            timeout: Per-case wall-clock limit in seconds.
+            compare: How outputs are checked, one of COMPARE_RULES.
+            tolerance: Absolute and relative tolerance of the "float" rule.
+
+        Returns:
+            A GradeResult with one CaseResult per executed case.
+        """
+        if compare not in COMPARE_RULES:
+            raise ValueError(f"Unknown compare rule: {compare}")
+        result = GradeResult(total=len(cases))
+        if not cases:
+            return result
+
+        timeout = timeout or RUNNER_TIMEOUT_SECONDS
+        job = {
+            "code": code_string,
+            "cases": [{"stdin": case.stdin, "expected": case.expected} for case in cases],
+            "stop_on_failure": stop_on_first_failure,
+            "compare": {"rule": compare, "tolerance": tolerance},
+            "case_timeout": timeout,
+        }
+        try:
+            reply = _submit(job, _job_timeout(timeout, len(cases)))
+        except (TimeoutError, WorkerCrashed, OSError, ValueError) as e:
+            reply = {"ok": False, "stderr": f"Error: {str(e)}",
+                     "limit": "timeout" if isinstance(e, TimeoutError) else None}
+        result.usage = reply_usage(reply)
+
+        if not reply["ok"]:
+            # Compile error or a worker that crashed or hung: every case fails with the same message
+            error = reply["stderr"].strip()
+            for case in cases:
+                result.cases.append(CaseResult(case.id, False, case.expected, "", 0.0, error=error))
+                if stop_on_first_failure:
+                    break
+            return result
+
+        for case, outcome in zip(cases, reply["cases"]):
+            actual = outcome["stdout"].strip()
+            result.cases.append(CaseResult(
+                case_id=case.id,
+                passed=outcome["passed"],
+                expected=case.expected,
+                actual=actual,
+                time_ms=round(outcome["wall_time"] * 1000, 3),
+                diff="" if outcome["passed"] else _diff(case.expected, actual),
+                error=outcome["stderr"].strip(),
+                cpu_ms=round(outcome["cpu_time"] * 1000, 3),
+                limit=outcome["limit"],
+            ))
+        return result
+
+    @staticmethod
+    def reference_outputs(
+        task_id: int,
+        correct_code: str,
+        cases: List[TestCase],
+        timeout: Optional[float] = None,
+    ) -> Tuple[List[Optional[str]], int]:
+        """
+        The reference solution's stdout for every case, from the result cache
+        where possible; the missing cases are run together in one worker job.
+
+        Returns:
+            The outputs (None where the reference failed or hit a sandbox
+            limit; those are not cached) and how many cases were run.
+        """
+        cache = get_result_cache()
+        keys = [reference_key(task_id, correct_code, case) for case in cases]
+        outputs: List[Optional[str]] = [cache.get(key) for key in keys]
+        missing = [i for i, output in enumerate(outputs) if output is None]
+        if not missing:
+            return outputs, 0
+
+        timeout = timeout or RUNNER_TIMEOUT_SECONDS
+        job = {"code": correct_code, "cases": [{"stdin": cases[i].stdin} for i in missing], "case_timeout": timeout}
+        try:
+            reply = _submit(job, _job_timeout(timeout, len(missing)))
+        except (TimeoutError, WorkerCrashed, OSError, ValueError):
+            return outputs, len(missing)
+        if reply["ok"]:
+            for i, outcome in zip(missing, reply["cases"]):
+                if outcome["ok"] and not outcome["limit"]:
+                    outputs[i] = outcome["stdout"]
+                    cache.put(keys[i], outcome["stdout"])
+        return outputs, len(missing)
+
+    @staticmethod
+    def grade_against_reference(
+        code_string: str,
+        task_id: int,
+        correct_code: str,
+        cases: List[TestCase],
+        stop_on_first_failure: bool = False,
+        timeout: Optional[float] = None,
+        compare: str = "exact",
+        tolerance: float = DEFAULT_FLOAT_TOLERANCE,
+    ) -> GradeResult:
+        """
+        Grade a submission against the output of the task's correct_code on
+        each case's inputs (differential grading). A case whose reference run
+        failed falls back to its stored outputs. Arguments as in grade().
+        """
+        outputs, runs = TestCaseGrader.reference_outputs(task_id, correct_code, cases, timeout)
+        expected = [
+            TestCase(case.id, case.inputs, [output] if output is not None else case.outputs)
+            for case, output in zip(cases, outputs)
+        ]
+        result = TestCaseGrader.grade(code_string, expected, stop_on_first_failure, timeout, compare, tolerance)
+        result.reference = {
+            "runs": runs,
+            "cached": len(cases) - runs,
+            "failed": sum(output is None for output in outputs),
+        }
+        return result
@@ -0,0 +1,214 @@
+"""
+Resident Pylint engine.
+
+Running the ``pylint`` CLI per request re-imports pylint/astroid and reloads
+every checker. The engine below builds one PyLinter per process and lints
+source strings straight from memory, returning both structured messages and
+the familiar text report.
+
+Note: pylint has no public "lint this string" API, so ``lint`` drives the same
+private steps ``pylint --from-stdin`` uses (_astroid_module_checker and
+_check_file with get_ast(data=...)). Keep pylint pinned in requirements.txt.
+"""
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from server.agentic.concurrency import RESOURCE_LIMITS
+
+# Configuration (overridable through .env)
+LINT_NICENESS = int(os.getenv("LINT_NICENESS", "10"))  # added to the lint processes' nice value
+
+MODULE_NAME = "submission"
+FILE_PATH = "submission.py"
+SEPARATOR = "-" * 66
+
+
+@dataclass
+class LintMessage:
+    symbol: str
+    msg_id: str
+    category: str
+    line: int
+    column: int
+    message: str
+
+    def format(self) -> str:
+        return f"{FILE_PATH}:{self.line}:{self.column}: {self.msg_id}: {self.message} ({self.symbol})"
+
+
+@dataclass
+class LintResult:
+    messages: List[LintMessage] = field(default_factory=list)
+    score: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def report(self) -> str:
+        """Text report in the same layout as the pylint CLI."""
+        if self.error:
+            return self.error
+        lines = []
+        if self.messages:
+            lines.append(f"************* Module {MODULE_NAME}")
+            lines.extend(msg.format() for msg in self.messages)
+        if self.score is not None:
+            lines += ["", SEPARATOR, f"Your code has been rated at {self.score:.2f}/10"]
+        return "\n".join(lines).strip()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "report": self.report,
+            "score": self.score,
+            "error": self.error,
+            "messages": [asdict(msg) for msg in self.messages],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LintResult":
+        return cls(
+            messages=[LintMessage(**msg) for msg in data["messages"]],
+            score=data["score"],
+            error=data["error"],
+        )
+
+
+class LintEngine:
+    """A PyLinter with its checkers loaded once and reused for every lint."""
+
+    def __init__(self):
+        # Imported here so a missing pylint only fails when linting is used
+        from pylint.lint import PyLinter
+
+        self._lock = threading.Lock()
+        self._linter = PyLinter()
+        self._linter.load_default_plugins()
+        self._linter.set_option("persistent", False)
+        self._linter.initialize()
+
+    def lint(self, code_string: str) -> LintResult:
+        """
+        Lint a string of Python code in-process.
+
+        Args:
+            code_string: A string containing the Python code to check.
+
+        Returns:
+            A LintResult with the messages and the 0..10 score (None when the
+            code could not be parsed).
+        """
+        from pylint.reporters import CollectingReporter
+        from pylint.typing import FileItem
+        from pylint.utils import FileState, LinterStats
+
+        linter = self._linter
+        with self._lock:
+            reporter = CollectingReporter()
+            linter.set_reporter(reporter)
+            linter.stats = LinterStats()
+            # Drop pragma state left over from the previous submission
+            linter.file_state = FileState(MODULE_NAME, linter.msgs_store, is_base_filestate=True)
+            linter.open()
+            get_ast = functools.partial(linter.get_ast, data=code_string)
+            with linter._astroid_module_checker() as check_astroid_module:
+                linter._check_file(
+                    get_ast,
+                    check_astroid_module,
+                    FileItem(MODULE_NAME, FILE_PATH, MODULE_NAME),
+                )
+            score = linter.generate_reports()
+
+        messages = [
+            LintMessage(
+                symbol=msg.symbol,
+                msg_id=msg.msg_id,
+                category=msg.category,
+                line=msg.line,
+                column=msg.column,
+                message=msg.msg,
+            )
+            for msg in reporter.messages
+        ]
+        return LintResult(messages=messages, score=score)
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version() -> str:
+    """Pylint version string, read without importing pylint."""
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return f"pylint-{version('pylint')}"
+    except PackageNotFoundError:
+        return "pylint-missing"
+
+
+_engine: Optional[LintEngine] = None
+_engine_lock = threading.Lock()
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_lint_engine() -> LintEngine:
+    """Return this process' engine, building the linter on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = LintEngine()
+    return _engine
+
+
+def lint_source(code_string: str) -> Dict[str, Any]:
+    """Lint with this process' engine; picklable entry point for the process pool."""
+    return get_lint_engine().lint(code_string).to_dict()
+
+
+def _init_lint_process() -> None:
+    """
+    Lint process start-up: lower its CPU priority, then build the engine. A
+    burst of lints would otherwise take the cores from the event loop and
+    slow every other route down with it.
+    """
+    if LINT_NICENESS and hasattr(os, "nice"):
+        os.nice(LINT_NICENESS)
+    get_lint_engine()
+
+
+def get_lint_process_pool() -> ProcessPoolExecutor:
+    """
+    Return the pool of lint processes used by the async checker. Each process
+    builds its own resident engine on start-up, so lint jobs never compete
+    with the event loop for the GIL, and runs at LINT_NICENESS so they yield
+    the CPU to it.
+    """
+    global _process_pool
+    if _process_pool is None:
+        with _engine_lock:
+            if _process_pool is None:
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=max(1, RESOURCE_LIMITS["lint"]),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_lint_process,
+                )
+    return _process_pool
+
+
+def warm_lint_process_pool() -> None:
+    """Start every lint process (each importing pylint) before the first request needs one."""
+    pool = get_lint_process_pool()
+    for future in [pool.submit(os.getpid) for _ in range(max(1, RESOURCE_LIMITS["lint"]))]:
+        future.result()
+
+
+def shutdown_lint_process_pool() -> None:
+    global _process_pool
+    with _engine_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+            _process_pool = None
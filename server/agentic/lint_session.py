@@ -0,0 +1,353 @@
+"""
+Incremental lint sessions for live editor diagnostics.
+
+A session keeps the last source it linted and its messages. On each edit the
+source is split into its top-level functions. A function whose body text is
+unchanged is replaced by a stub: its header, verbatim, and a one-line body
+that still loads every name the real body loads, so unused-import and
+friends come out the same, and that leaves the function the way the body
+does (a value return, a bare one, none at all, a yield or a raise), so
+callers checked against it (assignment-from-no-return, assignment-from-none)
+do too. Pylint then only walks the bodies that changed.
+Messages inside stubbed functions are carried over from the previous lint,
+shifted to their new lines; everything else comes from the fresh lint.
+
+Anything outside function bodies (imports, classes, globals, a signature,
+a new or deleted function) can move messages anywhere, so such edits lint
+the whole file, as does every LINT_SESSION_FULL_EVERY-th edit: a changed
+body can affect messages in an unchanged one (e.g. a caller assigning a
+result that is now None), and the value a stub returns cannot be inferred,
+so only a full lint sees everything inference finds in callers.
+
+Edits are debounced per session; a request overtaken by a newer edit of the
+same session answers {"superseded": true} without linting. A newer edit
+also cancels the session's lint in flight, which then answers the same way
+instead of holding up the edit behind it.
+"""
+from __future__ import annotations
+
+import ast
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import xxhash
+
+from server.agentic.lint_engine import LintMessage, LintResult
+from server.agentic.tools import AsyncCodeChecker
+
+# Configuration (overridable through .env)
+LINT_SESSION_DEBOUNCE_SECONDS = float(os.getenv("LINT_SESSION_DEBOUNCE_SECONDS", "0.05"))
+LINT_SESSION_FULL_EVERY = int(os.getenv("LINT_SESSION_FULL_EVERY", "50"))
+LINT_MAX_SESSIONS = int(os.getenv("LINT_MAX_SESSIONS", "1000"))
+
+STUB_CALL = "__lint_stub__"
+
+
+def _hash(text: str) -> str:
+    return xxhash.xxh3_64_hexdigest(text.encode("utf-8"))
+
+
+@dataclass
+class FunctionScope:
+    """A top-level function whose body starts on a line of its own."""
+
+    name: str
+    start: int  # first line, decorators included (1-based)
+    body_start: int
+    end: int
+    body_hash: str
+    indent: int
+    node: ast.AST = field(repr=False, compare=False)
+
+    def shifted(self, line: int, old: "FunctionScope") -> int:
+        return line + self.start - old.start
+
+
+@dataclass
+class Snapshot:
+    """What a session remembers of its last lint."""
+
+    module_hash: str
+    scopes: List[FunctionScope]
+    messages: List[LintMessage]
+
+
+def _own_nodes(body: List[ast.stmt]):
+    """The nodes of a function body, without those of nested functions and classes."""
+    pending = list(body)
+    while pending:
+        n = pending.pop()
+        yield n
+        if not isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            pending.extend(ast.iter_child_nodes(n))
+
+
+def _raises_not_implemented(statement: ast.stmt) -> bool:
+    exc = getattr(statement, "exc", None)
+    if isinstance(exc, ast.Call):
+        exc = exc.func
+    return isinstance(exc, ast.Name) and exc.id == "NotImplementedError"
+
+
+def _exit_template(body: List[ast.stmt]) -> str:
+    """
+    How the stub leaves the function, in the terms Pylint's checks of callers
+    look at: a generator, an abstract or raise-only body, value returns, only
+    None returns, or no return at all.
+    """
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        body = body[1:]  # astroid keeps the docstring out of the body
+    own = list(_own_nodes(body))
+    if any(isinstance(n, (ast.Yield, ast.YieldFrom)) for n in own):
+        return "yield {}"
+    if body and isinstance(body[0], ast.Raise) and _raises_not_implemented(body[0]):
+        return "raise NotImplementedError({})"
+    if len(body) == 1 and isinstance(body[0], ast.Raise):
+        return "raise {}"
+    returns = [n for n in own if isinstance(n, ast.Return)]
+    if not returns:
+        return "{}"
+    if all(n.value is None or (isinstance(n.value, ast.Constant) and n.value.value is None) for n in returns):
+        return "{}; return"
+    return "return {}"
+
+
+def _stub(scope: FunctionScope) -> str:
+    """
+    The line replacing an unchanged body: it loads the arguments and the free
+    names the body loads, keeps its globals global and leaves the function
+    as the body does.
+    """
+    arguments = {arg.arg for arg in ast.walk(scope.node.args) if isinstance(arg, ast.arg)}
+    loaded, stored, declared = set(), set(), set()
+    for statement in scope.node.body:
+        for n in ast.walk(statement):
+            if isinstance(n, ast.Name):
+                (loaded if isinstance(n.ctx, ast.Load) else stored).add(n.id)
+            elif isinstance(n, ast.Global):
+                declared.update(n.names)
+    names = sorted(arguments | (loaded - stored) | declared)
+    prefix = f"global {', '.join(sorted(declared))}; " if declared else ""
+    call = f"{STUB_CALL}({', '.join(names)})"
+    return f"{' ' * scope.indent}{prefix}{_exit_template(scope.node.body).format(call)}"
+
+
+_SCOPES = (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def _count_statements(tree: ast.Module) -> int:
+    """Statements as Pylint counts them: docstrings are not part of astroid's bodies."""
+    count = 0
+    for n in ast.walk(tree):
+        if isinstance(n, (ast.stmt, ast.ExceptHandler)):
+            count += 1
+        if isinstance(n, _SCOPES) and n.body and isinstance(n.body[0], ast.Expr) \
+                and isinstance(n.body[0].value, ast.Constant) and isinstance(n.body[0].value.value, str):
+            count -= 1
+    return count
+
+
+def split_source(source: str) -> Tuple[str, List[FunctionScope], int]:
+    """
+    Parse `source` into the hash of everything outside function bodies, its
+    stubbable functions and its statement count (as Pylint counts them).
+
+    Raises:
+        SyntaxError: The source does not parse.
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    scopes = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        first = node.body[0]
+        # "def f(): return 1" has nothing to stub
+        if lines[first.lineno - 1][:first.col_offset].strip():
+            continue
+        scopes.append(FunctionScope(
+            name=node.name,
+            start=min([node.lineno] + [d.lineno for d in node.decorator_list]),
+            body_start=first.lineno,
+            end=node.end_lineno,
+            body_hash=_hash("\n".join(lines[first.lineno - 1:node.end_lineno])),
+            indent=first.col_offset,
+            node=node,
+        ))
+
+    in_body = set()
+    for scope in scopes:
+        in_body.update(range(scope.body_start, scope.end + 1))
+    module_text = "\n".join(line for number, line in enumerate(lines, 1) if number not in in_body)
+    return _hash(module_text), scopes, _count_statements(tree)
+
+
+def stub_source(source: str, scopes: List[FunctionScope], stubbed: List[int]) -> str:
+    """
+    `source` with the bodies of scopes[i] for i in `stubbed` replaced by their
+    stub. The other body lines become empty comments rather than blank lines,
+    so a stubbed last function does not turn into trailing newlines.
+    """
+    lines = source.splitlines()
+    for i in stubbed:
+        scope = scopes[i]
+        lines[scope.body_start - 1] = _stub(scope)
+        for number in range(scope.body_start + 1, scope.end + 1):
+            lines[number - 1] = " " * scope.indent + "#"
+    return "\n".join(lines) + "\n"
+
+
+def score(messages: List[LintMessage], statements: int) -> Optional[float]:
+    """Pylint's default evaluation: 10 - (5 * errors + others) / statements * 10."""
+    if not statements:
+        return None
+    counts = {category: 0 for category in ("fatal", "error", "warning", "refactor", "convention")}
+    for msg in messages:
+        if msg.category in counts:
+            counts[msg.category] += 1
+    if counts["fatal"]:
+        return 0.0
+    penalty = 5 * counts["error"] + counts["warning"] + counts["refactor"] + counts["convention"]
+    return max(0.0, 10.0 - penalty / statements * 10)
+
+
+def _ordered(messages: List[LintMessage]) -> List[LintMessage]:
+    return sorted(messages, key=lambda msg: (msg.line, msg.column, msg.msg_id))
+
+
+class LintSession:
+    """The last lint of one editor session, and the edits queued behind it."""
+
+    def __init__(self):
+        self.snapshot: Optional[Snapshot] = None
+        self.latest = 0  # ticket of the newest edit
+        self.incremental_lints = 0
+        self._lock = asyncio.Lock()
+        self._inflight: Optional[asyncio.Task] = None
+
+    async def lint(self, source: str) -> Dict[str, Any]:
+        """
+        Lint an edit once it has settled for LINT_SESSION_DEBOUNCE_SECONDS.
+
+        Returns:
+            {"superseded": True} if a newer edit arrived meanwhile; otherwise
+            the LintResult fields plus "mode" ("full", "incremental" or
+            "unchanged") and "relinted" (function bodies linted incrementally).
+        """
+        self.latest += 1
+        ticket = self.latest
+        if self._inflight is not None:
+            self._inflight.cancel()  # its result is out of date; free the lint slot for this edit
+        await asyncio.sleep(LINT_SESSION_DEBOUNCE_SECONDS)
+        async with self._lock:
+            if ticket != self.latest:
+                return {"superseded": True}
+            # _lint() leaves no snapshot until it completes, so a cancelled lint
+            # only makes the next one full
+            linting = self._inflight = asyncio.ensure_future(self._lint(source))
+            try:
+                result, mode, relinted = await linting
+            except asyncio.CancelledError:
+                if ticket == self.latest or asyncio.current_task().cancelling():
+                    raise
+                return {"superseded": True}
+            finally:
+                if self._inflight is linting:
+                    self._inflight = None
+        if ticket != self.latest:
+            return {"superseded": True}
+        return {"superseded": False, "mode": mode, "relinted": relinted, **result.to_dict()}
+
+    async def _lint(self, source: str) -> Tuple[LintResult, str, List[str]]:
+        previous, self.snapshot = self.snapshot, None
+        try:
+            module_hash, scopes, statements = split_source(source)
+        except (SyntaxError, ValueError):
+            # Pylint reports the syntax error itself
+            return await AsyncCodeChecker.lint_code(source), "full", []
+
+        full = (
+            previous is None
+            or previous.module_hash != module_hash
+            or self.incremental_lints + 1 >= LINT_SESSION_FULL_EVERY
+        )
+        if full:
+            result = await AsyncCodeChecker.lint_code(source)
+            if result.error is None:
+                messages = _ordered(result.messages)
+                self.snapshot = Snapshot(module_hash, scopes, messages)
+                self.incremental_lints = 0
+                result = LintResult(messages=messages, score=result.score)
+            return result, "full", []
+
+        unchanged = [i for i, (new, old) in enumerate(zip(scopes, previous.scopes))
+                     if new.body_hash == old.body_hash]
+        stubbed = set(unchanged)
+        if len(unchanged) == len(scopes):
+            self.snapshot = previous
+            return LintResult(messages=previous.messages, score=score(previous.messages, statements)), "unchanged", []
+
+        result = await AsyncCodeChecker.lint_code(stub_source(source, scopes, unchanged))
+        if result.error is not None:
+            return result, "incremental", []
+
+        stubbed_lines = set()
+        carried = []
+        for i in unchanged:
+            new, old = scopes[i], previous.scopes[i]
+            stubbed_lines.update(range(new.start, new.end + 1))
+            carried += [
+                LintMessage(**{**asdict(msg), "line": new.shifted(msg.line, old)})
+                for msg in previous.messages if old.start <= msg.line <= old.end
+            ]
+        fresh = [msg for msg in result.messages if msg.line not in stubbed_lines]
+        messages = _ordered(fresh + carried)
+
+        self.snapshot = Snapshot(module_hash, scopes, messages)
+        self.incremental_lints += 1
+        relinted = [scope.name for i, scope in enumerate(scopes) if i not in stubbed]
+        return LintResult(messages=messages, score=score(messages, statements)), "incremental", relinted
+
+
+class LintSessionStore:
+    """Session key -> LintSession, least recently used sessions evicted first."""
+
+    def __init__(self, max_sessions: int = LINT_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, LintSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> LintSession:
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = LintSession()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(key)
+            return session
+
+    def drop(self, key: str) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+_store: Optional[LintSessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_lint_sessions() -> LintSessionStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LintSessionStore()
+        return _store
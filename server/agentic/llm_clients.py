@@ -0,0 +1,185 @@
+"""
+App-lifetime registry of LLM clients.
+
+One registry is created in the FastAPI lifespan and shared by every
+Assistant_agent. It owns a single sync and a single async httpx client
+(HTTP/2, keep-alive), so TLS sessions and connections are reused across
+requests, and caches one chat model per (model, temperature, json mode).
+All calls made through it are capped by the "llm" concurrency limit and
+retried on rate limits / connection errors with jittered exponential backoff.
+
+LLM_BACKEND=fake swaps OpenAI for canned offline replies (see fake_llm.py)
+so the API can be load-tested without network access or an API key.
+
+httpx, openai and LangChain are imported on first use, not with this module:
+together they take about a second to import, which every worker start, test
+run and --reload would otherwise pay. preload() imports them ahead of time.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Tuple
+
+from tenacity import AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from server.agentic.concurrency import resource_slots, thread_slots
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.messages import AIMessage, BaseMessageChunk
+
+# Configuration (overridable through .env)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "20"))
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0.2"))
+FAKE_LLM_CHUNK_DELAY_SECONDS = float(os.getenv("FAKE_LLM_CHUNK_DELAY_SECONDS", "0.005"))
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Rate limits and connection errors; the OpenAI SDK's own retries are disabled, so these are the only ones."""
+    openai = sys.modules.get("openai")  # not loaded = not an OpenAI error
+    return openai is not None and isinstance(error, (openai.RateLimitError, openai.APIConnectionError))
+
+
+class LLMClients:
+    """
+    Shared HTTP clients, chat models, concurrency cap and retry policy.
+
+    Args:
+        backend: "openai" or "fake"; defaults to the LLM_BACKEND env var.
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        backend = backend or os.getenv("LLM_BACKEND", "openai")
+        if backend not in ("openai", "fake"):
+            raise ValueError(f"Unknown LLM_BACKEND: {backend!r}")
+        self.backend = backend
+        self._models: Dict[Tuple[str, float, bool], BaseChatModel] = {}
+        self._lock = threading.Lock()
+
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+        )
+        timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0)
+        self.http_client = httpx.Client(http2=True, limits=limits, timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(http2=True, limits=limits, timeout=timeout)
+
+        self._retry_policy = dict(
+            retry=retry_if_exception(_is_retryable),
+            wait=wait_random_exponential(multiplier=LLM_RETRY_BASE_SECONDS, max=LLM_RETRY_MAX_SECONDS),
+            stop=stop_after_attempt(max(1, LLM_RETRY_ATTEMPTS)),
+            reraise=True,
+        )
+
+    def preload(self) -> None:
+        """Import the libraries of this backend's chat models (startup warm-up, off the event loop)."""
+        if self.backend == "fake":
+            import server.agentic.fake_llm  # noqa: F401
+        else:
+            import langchain_openai  # noqa: F401
+
+    def chat_model(self, model_name: str, temperature: float, json_mode: bool = False) -> BaseChatModel:
+        """Return the shared chat model for these settings, creating it once."""
+        key = (model_name, temperature, json_mode)
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = self._build(model_name, temperature, json_mode)
+            return self._models[key]
+
+    def _build(self, model_name: str, temperature: float, json_mode: bool) -> BaseChatModel:
+        if self.backend == "fake":
+            from server.agentic.fake_llm import fake_chat_model
+
+            return fake_chat_model(json_mode, FAKE_LLM_LATENCY_SECONDS, FAKE_LLM_CHUNK_DELAY_SECONDS)
+
+        from langchain_openai import ChatOpenAI
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("Missing OPENAI_API_KEY in environment (.env).")
+        return ChatOpenAI(
+            api_key=api_key,
+            model=model_name,
+            temperature=temperature,
+            max_retries=0,
+            stream_usage=True,  # token usage (incl. cached tokens) on streamed replies
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            # Ask OpenAI to return a JSON object (supported by newer models)
+            model_kwargs={"response_format": {"type": "json_object"}} if json_mode else {},
+        )
+
+    def invoke(self, model: BaseChatModel, prompt: Any, **kwargs: Any) -> AIMessage:
+        with thread_slots("llm"):
+            return Retrying(**self._retry_policy)(model.invoke, prompt, **kwargs)
+
+    async def ainvoke(self, model: BaseChatModel, prompt: Any, **kwargs: Any) -> AIMessage:
+        async with resource_slots("llm"):
+            return await AsyncRetrying(**self._retry_policy)(model.ainvoke, prompt, **kwargs)
+
+    async def astream(self, model: BaseChatModel, prompt: Any, **kwargs: Any) -> AsyncIterator[BaseMessageChunk]:
+        """
+        Stream chunks while holding an "llm" slot. Only opening the stream is
+        retried: errors surface on the first chunk, and retrying after tokens
+        have been forwarded would duplicate them.
+        """
+        async def open_stream():
+            stream = model.astream(prompt, **kwargs)
+            try:
+                return await anext(stream), stream
+            except StopAsyncIteration:
+                return None, stream
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        async with resource_slots("llm"):
+            first, stream = await AsyncRetrying(**self._retry_policy)(open_stream)
+            try:
+                if first is None:
+                    return
+                yield first
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+
+    async def aclose(self) -> None:
+        self.http_client.close()
+        await self.http_async_client.aclose()
+
+
+_clients: Optional[LLMClients] = None
+_clients_lock = threading.Lock()
+
+
+def init_llm_clients() -> LLMClients:
+    """Create the process-wide registry (app lifespan); later calls reuse it."""
+    global _clients
+    with _clients_lock:
+        if _clients is None:
+            _clients = LLMClients()
+        return _clients
+
+
+def get_llm_clients() -> LLMClients:
+    """The registry; created on first use outside the app (scripts, benchmarks)."""
+    return _clients if _clients is not None else init_llm_clients()
+
+
+async def close_llm_clients() -> None:
+    global _clients
+    with _clients_lock:
+        clients, _clients = _clients, None
+    if clients is not None:
+        await clients.aclose()
@@ -1,56 +1,75 @@
 # --- OpenAI-based version ---
 from __future__ import annotations
 
-import os
+import asyncio
 import json
-import subprocess
-import tempfile
-from typing import Any, Dict, List
+import logging
+import time
+from contextlib import aclosing
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Tuple
 
-from dotenv import load_dotenv
-from fastapi import HTTPException  # only if you use it elsewhere
-from pydantic import BaseModel
+import xxhash
+from sqlalchemy import select, update
 
-# LangChain (OpenAI)
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+# Static code checks live in tools.py (resident Pylint engine)
+from server.agentic.tools import CodeChecker
+from server.agentic.llm_clients import get_llm_clients
+from server.agentic.memory import ConversationMemory, get_memory_store
+from server.agentic.metrics import get_metrics, task_label
+from server.agentic.result_cache import get_result_cache, make_key
+from server.database import db_models as models
 
-load_dotenv()
+# LangChain is imported on first use (see llm_clients.py)
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
 
+logger = logging.getLogger(__name__)
 
-# ──────────────────────────────────────────────────────────────────────────────
-# Static code checks (unchanged)
-# ──────────────────────────────────────────────────────────────────────────────
-class CodeChecker:
-    """Run Pylint on an in-memory Python string."""
-    @staticmethod
-    def check_code_with_pylint(code_string: str) -> str:
-        if not code_string.strip():
-            return "Error: Empty code string provided. Pylint cannot check empty code."
+LLM_LATENCY_SECONDS = get_metrics().histogram(
+    "refactoai_llm_latency_seconds", "Latency of AI review calls that reached the model", ("model", "task_id"))
+LLM_TOKENS = get_metrics().counter(
+    "refactoai_llm_tokens_total", "Tokens of AI review calls by kind (input, cached, output)", ("model", "kind"))
 
-        tmp = None
-        try:
-            with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
-                f.write(code_string)
-                tmp = f.name
-
-            result = subprocess.run(
-                ["pylint", tmp],
-                capture_output=True,
-                text=True,
-                timeout=20,
-            )
-            return result.stdout.strip()
-        except FileNotFoundError:
-            return "Error: 'pylint' not found. Is it installed and on PATH?"
-        except (subprocess.TimeoutExpired, OSError) as e:
-            return f"An error occurred while running Pylint: {e}"
-        finally:
-            if tmp and os.path.exists(tmp):
-                try:
-                    os.unlink(tmp)
-                except OSError:
-                    pass
+
+REVIEW_KEYS = ("answer", "hints", "score")
+
+
+def _is_review(obj: Any, partial: bool = False) -> bool:
+    """
+    Check a reply against the answer/hints/score schema; a `partial` (still
+    streaming) reply may lack keys, a final one needs all three.
+    """
+    if not isinstance(obj, dict):
+        return False
+    if not isinstance(obj.get("answer", ""), str):
+        return False
+    hints = obj.get("hints", [])
+    if not isinstance(hints, list) or not all(isinstance(h, str) for h in hints):
+        return False
+    score = obj.get("score", 0)
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        return False
+    return partial or all(name in obj for name in REVIEW_KEYS)
+
+
+def _can_become_review(reply: str) -> bool:
+    """Whether a streamed prefix can still grow into a valid review object."""
+    text = reply.lstrip()
+    if not text:
+        return True
+    if not text.startswith("{"):
+        return False
+    from langchain_core.utils.json import parse_partial_json
+
+    try:
+        return _is_review(parse_partial_json(text), partial=True)
+    except ValueError:
+        return False
+
+
+def task_problem(task: models.Task) -> str:
+    """The problem statement given to the reviewer for a task."""
+    return f"{task.name}\n{task.description}"
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -60,6 +79,9 @@ class Assistant_agent:
     """
     AI Code Review Tutor (OpenAI + LangChain).
     Returns a single JSON object as a string (schema enforced via prompt).
+
+    History lives in a bounded ConversationMemory: the session's shared one
+    when `session_id` is given, otherwise a private one for this instance.
     """
 
     MAIN_PROMPT = """You are an AI Code Review Tutor. Your purpose is to provide structured, educational feedback on code quality and design patterns.
@@ -77,89 +99,232 @@ Schema:
 }
 """
 
-    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.4):
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        if not self.openai_api_key:
-            raise ValueError("Missing OPENAI_API_KEY in environment (.env).")
+    OUTPUT_REQUIREMENTS = """**Output Requirements**
+- Return ONLY a single JSON object, no markdown.
+- Be more theoretical when giving hints (explain the technique).
+- Point to specific code areas that each hint applies to.
+- Include: "score" (0..100) assessing the code quality.
+
+Strict JSON schema:
+{
+  "answer": "...",
+  "hints": [
+    "concept/design pattern guidance",
+    "naming/structure/pylint-aligned hint",
+    "pythonic/maintainability hint"
+  ],
+  "score": 0
+}"""
 
+    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.4,
+                 session_id: str | None = None):
         self.model_name = model_name
         self.temperature = temperature
-        self.conversation_history: List[AIMessage | HumanMessage] = []
+        self.session_id = session_id
+        self.last_usage: Dict[str, Any] | None = None  # of the last review call that reached the model
+        self.memory = get_memory_store().get(session_id) if session_id else ConversationMemory()
 
+        # Shared, app-lifetime clients; raises ValueError without OPENAI_API_KEY
+        self.clients = get_llm_clients()
         # Base LLM (general replies)
-        self.llm = ChatOpenAI(
-            api_key=self.openai_api_key,
-            model=self.model_name,
-            temperature=self.temperature,
-        )
-
+        self.llm = self.clients.chat_model(self.model_name, self.temperature)
         # JSON-enforcing LLM (for review outputs)
-        self.json_llm = ChatOpenAI(
-            api_key=self.openai_api_key,
-            model=self.model_name,
-            temperature=self.temperature,
-            # Ask OpenAI to return a JSON object (supported by newer models)
-            model_kwargs={"response_format": {"type": "json_object"}},
-        )
+        self.json_llm = self.clients.chat_model(self.model_name, self.temperature, json_mode=True)
 
-    def run(self, problem: str, pylint_report: str, reference_solution: str, user_code: str) -> str:
+    def run(self, problem: str, pylint_report: str, reference_solution: str, user_code: str,
+            task_id: int | None = None, task_prefix: str | None = None) -> str:
         """
         Analyze code and return a JSON string. If the model returns non-JSON,
-        we attempt to coerce/validate.
+        we attempt to coerce/validate. Valid reviews are cached by content, so
+        resubmitting the same code for the same task skips the OpenAI call.
+
+        `task_prefix` is the task's precomputed Task.prompt_prefix; it is built
+        from problem and reference_solution when not given.
         """
-        user_payload = f"""
+        user_payload, key, blobs = self._review_request(problem, pylint_report, reference_solution, user_code, task_id)
+        cached = get_result_cache().get(key)
+        if cached is not None:
+            return self._finish_review(user_payload, cached, key, blobs)
+
+        # Use JSON-enforcing LLM
+        started = time.perf_counter()
+        messages = self._review_messages(task_prefix or self.task_prefix(problem, reference_solution), user_payload)
+        resp = self.clients.invoke(self.json_llm, messages, **self._prompt_cache_kwargs(task_id))
+        self._record_usage(started, resp.usage_metadata, task_id)
+        return self._finish_review(user_payload, resp.content, key, blobs)
+
+    async def arun(self, problem: str, pylint_report: str, reference_solution: str, user_code: str,
+                   task_id: int | None = None, task_prefix: str | None = None) -> str:
+        """
+        Async variant of run(); the shared clients apply the "llm" concurrency
+        limit. Memory reads and writes (SQLite with SHARED_STATE_PATH, token
+        counting in any case) and result cache disk reads run in a thread, off
+        the event loop.
+        """
+        user_payload, key, blobs = self._review_request(problem, pylint_report, reference_solution, user_code, task_id)
+        cached = await get_result_cache().aget(key)
+        if cached is not None:
+            return await asyncio.to_thread(self._finish_review, user_payload, cached, key, blobs)
+
+        started = time.perf_counter()
+        messages = await asyncio.to_thread(
+            self._review_messages, task_prefix or self.task_prefix(problem, reference_solution), user_payload)
+        resp = await self.clients.ainvoke(self.json_llm, messages, **self._prompt_cache_kwargs(task_id))
+        self._record_usage(started, resp.usage_metadata, task_id)
+        return await asyncio.to_thread(self._finish_review, user_payload, resp.content, key, blobs)
+
+    async def astream_run(self, problem: str, pylint_report: str, reference_solution: str, user_code: str,
+                          task_id: int | None = None,
+                          task_prefix: str | None = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of arun(). Yields ("token", text) as the model writes,
+        then ("usage", dict) for the model call and exactly one
+        ("result", json_string) with the validated review.
+        The partial reply is checked after every chunk; once it can no longer
+        become a review object the stream is cut and the fallback is returned.
+        """
+        user_payload, key, blobs = self._review_request(problem, pylint_report, reference_solution, user_code, task_id)
+        cached = await get_result_cache().aget(key)
+        if cached is not None:
+            yield "result", await asyncio.to_thread(self._finish_review, user_payload, cached, key, blobs)
+            return
+
+        started = time.perf_counter()
+        messages = await asyncio.to_thread(
+            self._review_messages, task_prefix or self.task_prefix(problem, reference_solution), user_payload)
+        stream = self.clients.astream(self.json_llm, messages, **self._prompt_cache_kwargs(task_id))
+        reply, usage = "", None
+        async with aclosing(stream) as chunks:
+            async for chunk in chunks:
+                usage = chunk.usage_metadata or usage  # sent with the last chunk
+                if not chunk.content:
+                    continue
+                reply += chunk.content
+                yield "token", chunk.content
+                if not _can_become_review(reply):
+                    break
+        yield "usage", self._record_usage(started, usage, task_id)
+        yield "result", await asyncio.to_thread(self._finish_review, user_payload, reply, key, blobs)
+
+    @classmethod
+    def task_prefix(cls, problem: str, reference_solution: str) -> str:
+        """
+        Stable head of a review prompt: everything that does not depend on the
+        submission. Sent first and byte-identical for every review of a task,
+        so the provider's prompt cache can reuse it.
+        """
+        return f"""{cls.MAIN_PROMPT}
+{cls.OUTPUT_REQUIREMENTS}
+
+**Task**
+{problem}
+
+**Reference solution**
+{reference_solution}
+"""
+
+    def _review_request(self, problem: str, pylint_report: str, reference_solution: str, user_code: str,
+                        task_id: int | None) -> Tuple[str, str, Dict[str, str]]:
+        """Variable prompt suffix, result-cache key and the blobs memory should hash."""
+        user_payload = self._review_payload(pylint_report, user_code)
+        key = self._review_key(problem, pylint_report, reference_solution, user_code, task_id)
+        return user_payload, key, {"reference_solution": reference_solution, "user_code": user_code}
+
+    def _review_payload(self, pylint_report: str, user_code: str) -> str:
+        return f"""
 **Context Variables for Analysis:**
-- problem: {problem}
 - code clean score (pylint): {pylint_report}
-- reference_solution: {reference_solution}
 - user_code: {user_code}
 
-**Output Requirements**
-- Return ONLY a single JSON object, no markdown.
-- Be more theoretical when giving hints (explain the technique).
-- Point to specific code areas that each hint applies to.
-- Include: "score" (0..100) assessing the code quality.
-
-Strict JSON schema:
-{{
-  "answer": "...",
-  "hints": [
-    "concept/design pattern guidance",
-    "naming/structure/pylint-aligned hint",
-    "pythonic/maintainability hint"
-  ],
-  "score": 0
-}}
+Review user_code against the task and reference solution above.
 """.strip()
 
-        messages = [
-            SystemMessage(content=self.MAIN_PROMPT),
-            *self.conversation_history,
-            HumanMessage(content=user_payload),
-        ]
+    def _review_key(self, problem: str, pylint_report: str, reference_solution: str, user_code: str,
+                    task_id: int | None) -> str:
+        return make_key(
+            "ai_review",
+            f"{self.model_name}:{self.temperature}:{self.MAIN_PROMPT}{self.OUTPUT_REQUIREMENTS}",
+            user_code,
+            task_id,
+            [problem, pylint_report, reference_solution],
+        )
 
-        # Use JSON-enforcing LLM
-        resp = self.json_llm.invoke(messages)
+    def _review_messages(self, task_prefix: str, user_payload: str) -> List[BaseMessage]:
+        from langchain_core.messages import HumanMessage, SystemMessage
 
-        # Keep history
-        self.conversation_history.append(HumanMessage(content=user_payload))
-        self.conversation_history.append(AIMessage(content=resp.content))
+        # Stable prefix first, then history, then the per-submission suffix
+        return [
+            SystemMessage(content=task_prefix),
+            *self.memory.messages(),
+            HumanMessage(content=user_payload),
+        ]
 
-        # Best-effort JSON validation
-        content = resp.content.strip()
+    @staticmethod
+    def _prompt_cache_kwargs(task_id: int | None) -> Dict[str, str]:
+        # Routes reviews of one task to the same provider cache shard
+        return {"prompt_cache_key": f"refactoai-task-{task_id}"} if task_id is not None else {}
+
+    def _record_usage(self, started: float, usage: Dict[str, Any] | None, task_id: int | None) -> Dict[str, Any]:
+        """Latency and prompt-cache hit ratio of one review call; logged and kept in last_usage."""
+        usage = usage or {}
+        input_tokens = usage.get("input_tokens")
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0) if input_tokens else None
+        self.last_usage = {
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "cached_ratio": round(cached_tokens / input_tokens, 3) if input_tokens else None,
+            "output_tokens": usage.get("output_tokens"),
+        }
+        LLM_LATENCY_SECONDS.observe(self.last_usage["latency_ms"] / 1000, model=self.model_name,
+                                    task_id=task_label(task_id))
+        for kind in ("input", "cached", "output"):
+            if self.last_usage[f"{kind}_tokens"]:
+                LLM_TOKENS.inc(self.last_usage[f"{kind}_tokens"], model=self.model_name, kind=kind)
+        logger.info("ai_review task=%s latency=%s ms input=%s cached=%s (ratio %s)", task_id,
+                    self.last_usage["latency_ms"], input_tokens, cached_tokens, self.last_usage["cached_ratio"])
+        return self.last_usage
+
+    def _finish_review(self, user_payload: str, reply: str, key: str, blobs: Dict[str, str]) -> str:
+        # Keep history; code blobs are remembered by hash only
+        self.memory.add_turn(user_payload, reply, blobs)
+
+        # Best-effort JSON + schema validation
+        content = reply.strip()
         try:
-            _ = json.loads(content)  # validate JSON
-            return content
+            parsed = json.loads(content)
         except json.JSONDecodeError:
-            # Fallback: wrap into a JSON object
-            return json.dumps({
-                "answer": "The assistant produced a non-JSON reply; here is a safe wrapper.",
-                "hints": [content[:300]],
-                "score": 0
-            })
+            problem = "The assistant produced a non-JSON reply; here is a safe wrapper."
+        else:
+            if _is_review(parsed):
+                get_result_cache().put(key, content)
+                return content
+            problem = "The assistant's reply did not match the answer/hints/score schema; here is a safe wrapper."
+        # Fallback: wrap into a JSON object
+        return json.dumps({
+            "answer": problem,
+            "hints": [content[:300]],
+            "score": 0
+        })
 
     def invoke_llm_for_chat(self, data: Dict) -> Dict[str, Any]:
-        prompt = f"""You are an expert programming mentor on clean code & design patterns.
+        resp = self.clients.invoke(self.llm, self._chat_prompt(data))
+        return {"message": resp.content}
+
+    async def ainvoke_llm_for_chat(self, data: Dict) -> Dict[str, Any]:
+        resp = await self.clients.ainvoke(self.llm, self._chat_prompt(data))
+        return {"message": resp.content}
+
+    async def astream_chat(self, data: Dict) -> AsyncIterator[str]:
+        """Streaming variant of ainvoke_llm_for_chat(); yields text chunks."""
+        async with aclosing(self.clients.astream(self.llm, self._chat_prompt(data))) as chunks:
+            async for chunk in chunks:
+                if chunk.content:
+                    yield chunk.content
+
+    @staticmethod
+    def _chat_prompt(data: Dict) -> str:
+        return f"""You are an expert programming mentor on clean code & design patterns.
 
 Provided: {data}
 
@@ -169,26 +334,80 @@ Instructions:
 - Ask clarifying questions if needed.
 - Prefer actionable steps over theory.
 """
-        resp = self.llm.invoke(prompt)
-        return {"message": resp.content}
 
     # Conversation utils
+    @property
+    def conversation_history(self) -> List[BaseMessage]:
+        return self.memory.messages()
+
     def clear_history(self) -> None:
-        self.conversation_history = []
+        self.memory.clear()
 
-    def get_history(self) -> List[AIMessage | HumanMessage]:
+    def get_history(self) -> List[BaseMessage]:
         return self.conversation_history
 
     def get_history_summary(self) -> str:
+        from langchain_core.messages import HumanMessage, SystemMessage
+
         out = []
         for i, msg in enumerate(self.conversation_history, 1):
-            role = "User" if isinstance(msg, HumanMessage) else "AI"
+            role = {HumanMessage: "User", SystemMessage: "Summary"}.get(type(msg), "AI")
             out.append(f"[{i}] {role}: {msg.content[:100]}...")
         return "\n".join(out)
 
 
+PROMPT_HASH_SETTING = "review_prompt_hash"
+PREFIX_BATCH_SIZE = 1000
+
+
+def review_prompt_hash() -> str:
+    """Changes whenever Assistant_agent.task_prefix() would build other prefixes for the same tasks."""
+    return xxhash.xxh3_64_hexdigest(Assistant_agent.task_prefix("{problem}", "{solution}").encode("utf-8"))
+
+
+def refresh_task_prefixes(db, read_db=None) -> int:
+    """
+    Store the review prompt prefix of every task lacking one (fill_db and
+    import_pack clear it when a task changes) on its row, so requests reuse
+    it instead of rebuilding it; every task's when the prompt template
+    changed since the last run (review_prompt_hash(), kept in the settings
+    table). Reads go through `read_db` (default `db`) and only the columns
+    the prefix needs, in batches of PREFIX_BATCH_SIZE; with nothing to do
+    this is two indexed reads and no write. Returns the number of rows written.
+    """
+    read_db = read_db or db
+    prompt_hash = review_prompt_hash()
+    stored = read_db.get(models.Setting, PROMPT_HASH_SETTING)
+    rebuild = stored is None or stored.value != prompt_hash
+    query = select(models.Task.id, models.Task.name, models.Task.description, models.Task.correct_code)
+    if not rebuild:
+        query = query.where(models.Task.prompt_prefix.is_(None))
+
+    changed, last_id = 0, None
+    while True:
+        batch = query.order_by(models.Task.id).limit(PREFIX_BATCH_SIZE)
+        if last_id is not None:
+            batch = batch.where(models.Task.id > last_id)
+        rows = read_db.execute(batch).all()
+        if not rows:
+            break
+        db.execute(update(models.Task), [
+            {"id": row.id, "prompt_prefix": Assistant_agent.task_prefix(task_problem(row), row.correct_code)}
+            for row in rows
+        ])
+        db.commit()
+        changed, last_id = changed + len(rows), rows[-1].id
+    if rebuild:
+        db.merge(models.Setting(key=PROMPT_HASH_SETTING, value=prompt_hash))
+        db.commit()
+    return changed
+
+
 # --- Example usage ---
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
     problem = "Adapt a Fahrenheit-only sensor to a Celsius interface."
     user_code = """
 class FahrenheitSensor:
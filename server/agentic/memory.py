@@ -0,0 +1,266 @@
+"""
+Bounded conversation memory for Assistant_agent.
+
+Each session keeps its last MEMORY_KEEP_TURNS exchanges verbatim; older
+exchanges are folded into a short rolling summary. Code blobs (user_code,
+reference_solution) are replaced by content hashes when a turn is stored,
+and the whole history is trimmed to MEMORY_MAX_TOKENS before it is sent.
+Sessions are keyed by a caller-supplied id and evicted LRU. LangChain's
+message classes are imported when the first turn is stored.
+
+Tokens are counted with tiktoken once load_encoder() has run (at app
+warm-up: the first load may download the BPE file). Until then, or when
+tiktoken is missing or offline, they are estimated from the length.
+
+With SHARED_STATE_PATH set (multi-worker deployments), session histories
+live in the SharedStore instead, so a session continues on whichever worker
+its next request reaches.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple, Union
+
+import xxhash
+
+from server.agentic.shared_state import SharedStore, get_shared_store
+
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+# Configuration (overridable through .env)
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "3000"))
+MEMORY_KEEP_TURNS = int(os.getenv("MEMORY_KEEP_TURNS", "4"))
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "400"))
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "1000"))
+
+Turn = Tuple["HumanMessage", "AIMessage"]
+
+
+_encoding = None  # set by load_encoder()
+_encoding_lock = threading.Lock()
+
+
+def load_encoder():
+    """
+    Load the gpt-4o tokenizer for count_tokens() and return it (None if it
+    is unavailable). Blocks while tiktoken downloads its BPE file, with no
+    timeout, so it is never called on the request path.
+    """
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o family
+            except Exception:  # pylint: disable=broad-exception-caught
+                # Not installed, or the BPE file cannot be downloaded (offline)
+                return None
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the gpt-4o tokenizer once loaded, else a ~4 chars/token estimate."""
+    encoder = _encoding
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[BaseMessage]) -> int:
+    # ~4 tokens of per-message framing in the chat format
+    return sum(count_tokens(str(m.content)) + 4 for m in messages)
+
+
+def blob_ref(name: str, text: str) -> str:
+    return f"<{name} xxh3:{xxhash.xxh3_64_hexdigest(text.encode('utf-8'))}, {len(text)} chars>"
+
+
+def strip_blobs(text: str, blobs: Dict[str, str]) -> str:
+    """Replace each blob (e.g. user_code, reference_solution) in text with its hash."""
+    # Longest first, so a blob that contains another is replaced whole
+    for name, blob in sorted(blobs.items(), key=lambda item: -len(item[1])):
+        if blob.strip():
+            text = text.replace(blob, blob_ref(name, blob))
+    return text
+
+
+def _gist(message: BaseMessage, limit: int = 160) -> str:
+    """One-line digest of a message; for JSON reviews, the answer and score."""
+    text = str(message.content).strip()
+    try:
+        review = json.loads(text)
+        if isinstance(review, dict) and "answer" in review:
+            text = f"{review['answer']} (score {review.get('score', '?')})"
+    except json.JSONDecodeError:
+        pass
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class ConversationMemory:
+    """
+    History of one session: a rolling summary plus the recent turns.
+
+    Args:
+        max_tokens: Budget for summary + turns as returned by messages().
+        keep_turns: Number of most recent turns kept verbatim.
+        summary_max_tokens: Budget for the rolling summary; oldest lines go first.
+    """
+
+    def __init__(self, max_tokens: int = MEMORY_MAX_TOKENS, keep_turns: int = MEMORY_KEEP_TURNS,
+                 summary_max_tokens: int = MEMORY_SUMMARY_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_lines: Deque[str] = deque()
+        self.turns: Deque[Turn] = deque()
+        self._lock = threading.Lock()
+
+    def add_turn(self, user: str, reply: str, blobs: Optional[Dict[str, str]] = None) -> None:
+        """Record an exchange; `blobs` (name -> text) are stored as hashes only."""
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        user = strip_blobs(user, blobs or {})
+        with self._lock:
+            self.turns.append((HumanMessage(content=user), AIMessage(content=reply)))
+            while len(self.turns) > self.keep_turns:
+                self._fold_oldest()
+            while len(self.turns) > 1 and count_message_tokens(self._messages()) > self.max_tokens:
+                self._fold_oldest()
+
+    def messages(self) -> List[BaseMessage]:
+        """Summary (as a system message) followed by the recent turns, oldest first."""
+        with self._lock:
+            return self._messages()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.summary_lines.clear()
+            self.turns.clear()
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-able snapshot: the summary lines and the recent turns as (user, reply) texts."""
+        with self._lock:
+            return {
+                "summary": list(self.summary_lines),
+                "turns": [[str(user.content), str(reply.content)] for user, reply in self.turns],
+            }
+
+    def load_state(self, state: Optional[Dict[str, Any]]) -> None:
+        """Replace the history with a to_state() snapshot (None = empty)."""
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        state = state or {}
+        with self._lock:
+            self.summary_lines = deque(state.get("summary", ()))
+            self.turns = deque((HumanMessage(content=user), AIMessage(content=reply))
+                               for user, reply in state.get("turns", ()))
+
+    def _messages(self) -> List[BaseMessage]:
+        out: List[BaseMessage] = []
+        if self.summary_lines:
+            from langchain_core.messages import SystemMessage
+
+            out.append(SystemMessage(content="Summary of earlier turns:\n" + "\n".join(self.summary_lines)))
+        for user, reply in self.turns:
+            out.extend((user, reply))
+        return out
+
+    def _fold_oldest(self) -> None:
+        user, reply = self.turns.popleft()
+        self.summary_lines.append(f"- User: {_gist(user)} | Tutor: {_gist(reply)}")
+        while len(self.summary_lines) > 1 and \
+                count_tokens("\n".join(self.summary_lines)) > self.summary_max_tokens:
+            self.summary_lines.popleft()
+
+
+class MemoryStore:
+    """Session id -> ConversationMemory, least recently used sessions evicted first."""
+
+    def __init__(self, max_sessions: int = MEMORY_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ConversationMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> ConversationMemory:
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = self._sessions[session_id] = ConversationMemory()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return memory
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SharedConversationMemory(ConversationMemory):
+    """
+    ConversationMemory of one session kept in a SharedStore. Reads reload the
+    stored history; add_turn() folds the new turn into it with
+    SharedStore.update_session(), so turns added concurrently by other
+    workers are not lost. Both block on SQLite: async callers run them in a
+    thread.
+    """
+
+    def __init__(self, session_id: str, store: SharedStore, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.session_id = session_id
+        self.store = store
+
+    def add_turn(self, user: str, reply: str, blobs: Optional[Dict[str, str]] = None) -> None:
+        def update(state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            self.load_state(state)
+            super(SharedConversationMemory, self).add_turn(user, reply, blobs)
+            return self.to_state()
+
+        self.store.update_session(self.session_id, update)
+
+    def messages(self) -> List[BaseMessage]:
+        self.load_state(self.store.load_session(self.session_id))
+        return super().messages()
+
+    def clear(self) -> None:
+        self.store.drop_session(self.session_id)
+        super().clear()
+
+
+class SharedMemoryStore:
+    """MemoryStore interface over a SharedStore; eviction happens in the store."""
+
+    def __init__(self, store: SharedStore):
+        self.store = store
+
+    def get(self, session_id: str) -> SharedConversationMemory:
+        return SharedConversationMemory(session_id, self.store)
+
+    def drop(self, session_id: str) -> None:
+        self.store.drop_session(session_id)
+
+    def __len__(self) -> int:
+        return self.store.session_count()
+
+
+_store: Optional[Union[MemoryStore, SharedMemoryStore]] = None
+_store_lock = threading.Lock()
+
+
+def get_memory_store() -> Union[MemoryStore, SharedMemoryStore]:
+    """The process-wide session store; shared between workers when SHARED_STATE_PATH is set."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            shared = get_shared_store()
+            _store = SharedMemoryStore(shared) if shared is not None else MemoryStore()
+        return _store
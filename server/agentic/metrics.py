@@ -0,0 +1,241 @@
+"""
+In-process metrics rendered in the Prometheus text format (version 0.0.4).
+
+Counters, gauges and histograms register once per process in the registry
+returned by get_metrics(); GET /metrics renders it. Values that live
+elsewhere (job queue depth, idle sandbox workers, cache counters) are not
+mirrored on every change: collectors added with add_collector() copy them
+into their metrics right before each scrape.
+
+Every worker process keeps its own registry, so with several uvicorn workers
+each scrape sees one of them. prometheus_client is not a dependency; the
+three metric types below are all the app needs.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configuration (overridable through .env)
+# Distinct task ids used as label values; later ones are reported as "other"
+METRICS_MAX_TASK_LABELS = int(os.getenv("METRICS_MAX_TASK_LABELS", "500"))
+
+# Seconds; from a cached lint (~1 ms) up to a slow LLM review
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """A metric family; one series per combination of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple("" if labels[name] is None else str(labels[name]) for name in self.labelnames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+            lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+            for values, state in series:
+                lines += self._samples(values, state)
+        return lines
+
+    def _samples(self, values: LabelValues, state: Any) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, values)} {_number(state)}"]
+
+
+class Counter(Metric):
+    """A value that only goes up; name it *_total."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels: Any) -> None:
+        """For collectors copying a counter kept elsewhere (e.g. cache hits)."""
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = float(value)
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._series.get(key)
+            if state is None:
+                state = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the seconds spent in the with-block, exceptions included."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self, values: LabelValues, state: Any) -> List[str]:
+        counts, total, count = state
+        lines, cumulative = [], 0
+        for bound, bucket in zip(self.buckets, counts):
+            cumulative += bucket
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, [('le', '+Inf')])} {count}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of one process, plus collectors run before each render."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args: Any, **kwargs: Any) -> Any:
+        # Re-registering returns the existing metric, so module reloads are harmless
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        for collector in collectors:
+            try:
+                collector()
+            except Exception:  # pylint: disable=broad-exception-caught
+                # A broken collector must not take the whole scrape down
+                logger.exception("Metrics collector %r failed", collector)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+_task_labels: set = set()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+def task_label(task_id: Any) -> str:
+    """
+    Label value for a task id. Only the first METRICS_MAX_TASK_LABELS distinct
+    ids get a series of their own, so a crawler walking every id cannot blow
+    up the number of series.
+    """
+    if task_id is None:
+        return ""
+    label = str(task_id)
+    with _registry_lock:
+        if label in _task_labels:
+            return label
+        if len(_task_labels) < METRICS_MAX_TASK_LABELS:
+            _task_labels.add(label)
+            return label
+    return "other"
@@ -0,0 +1,221 @@
+"""
+Content-addressed cache for lint, run and AI-review results.
+
+Learners resubmit the same code over and over (often the untouched
+``messed_code`` or the exact ``correct_code``). Results are keyed by an xxhash
+of the tool name, the tool version, the task id, any extra inputs and the
+normalized code. Lookups go to an in-memory LRU first and then to an optional
+SQLite tier (enabled with RESULT_CACHE_PATH) that survives restarts. It
+defaults to the SHARED_STATE_PATH file, where every worker process of a
+deployment reads what the others computed. Coroutines use aget()/aput(),
+which run the SQLite tier in a thread: another worker holding its write lock
+must not stall the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import orjson
+import xxhash
+
+from server.agentic.shared_state import SHARED_STATE_PATH
+
+# Configuration (overridable through .env)
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048"))
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", SHARED_STATE_PATH)  # unset = memory only
+RESULT_CACHE_DB_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_DB_MAX_ENTRIES", "100000"))
+
+_MISSING = object()
+
+
+def normalize_code(code: str) -> str:
+    """Normalize line endings so CRLF and LF submissions share an entry."""
+    return code.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def make_key(tool: str, version: str, code: str, task_id: Optional[int] = None, extra: Iterable[Any] = ()) -> str:
+    """
+    Build a cache key.
+
+    Args:
+        tool: Tool name ("lint", "run", "ai_review").
+        version: Anything that changes the tool's output (library version, model...).
+        code: The submitted source; normalized before hashing.
+        task_id: Task the submission belongs to, if any.
+        extra: Further inputs that affect the result (args, stdin, prompts...).
+    """
+    h = xxhash.xxh3_128()
+    for part in (tool, version, "" if task_id is None else str(task_id), *map(str, extra)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(normalize_code(code).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier LRU cache with hit/miss counters.
+
+    Args:
+        max_entries: Capacity of the in-memory tier.
+        db_path: SQLite file for the on-disk tier, or None to disable it.
+        db_max_entries: Capacity of the on-disk tier (least recently used rows are evicted).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        db_path: Optional[str] = RESULT_CACHE_PATH,
+        db_max_entries: int = RESULT_CACHE_DB_MAX_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.db_max_entries = db_max_entries
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()  # memory tier and counters; never held during disk I/O
+        self._db_lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._puts_since_evict = 0
+        if db_path:
+            # Other workers may hold the write lock for a moment
+            self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_result_cache_last_used ON result_cache (last_used)")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._memory_get(key)
+        if value is _MISSING and self._db is not None:
+            value = self._disk_get(key)
+        return self._count(value, default)
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        """get() for coroutines: a memory miss reads the SQLite tier in a thread."""
+        value = self._memory_get(key)
+        if value is _MISSING and self._db is not None:
+            value = await asyncio.to_thread(self._disk_get, key)
+        return self._count(value, default)
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value in both tiers."""
+        with self._lock:
+            self._remember(key, value)
+        if self._db is not None:
+            self._disk_put(key, value)
+
+    async def aput(self, key: str, value: Any) -> None:
+        """put() for coroutines: the SQLite tier is written in a thread."""
+        with self._lock:
+            self._remember(key, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, value)
+
+    def _memory_get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._memory:
+                return _MISSING
+            self._memory.move_to_end(key)
+            self._counters["memory_hits"] += 1
+            return self._memory[key]
+
+    def _disk_get(self, key: str) -> Any:
+        with self._db_lock:
+            row = self._db.execute("SELECT value FROM result_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return _MISSING
+            self._db.execute("UPDATE result_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        value = orjson.loads(row[0])
+        with self._lock:
+            self._remember(key, value)
+            self._counters["disk_hits"] += 1
+        return value
+
+    def _disk_put(self, key: str, value: Any) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO result_cache (key, value, last_used) VALUES (?, ?, ?)",
+                (key, orjson.dumps(value), time.time()),
+            )
+            # Counting rows is O(n); only trim the table every so often
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= 256:
+                self._puts_since_evict = 0
+                self._evict_disk()
+
+    def _count(self, value: Any, default: Any) -> Any:
+        with self._lock:
+            self._counters["misses" if value is _MISSING else "hits"] += 1
+        return default if value is _MISSING else value
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM result_cache").fetchone()
+        overflow = count - self.db_max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM result_cache WHERE key IN ("
+                " SELECT key FROM result_cache ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            with self._lock:
+                self._counters["evictions"] += overflow
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        cacheable: Callable[[Any], bool] = lambda _: True,
+    ) -> Any:
+        """Return the cached value for key, or compute and store it."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        if cacheable(value):
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM result_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": self._counters["hits"] / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
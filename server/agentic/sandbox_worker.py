@@ -0,0 +1,512 @@
+"""
+Long-lived sandbox worker used by server.agentic.worker_pool.
+
+The worker is started as a standalone script (``python -I sandbox_worker.py``)
+and only depends on the standard library. It reads one JSON job per line from
+its stdin and answers with one JSON line per job, running every submission in
+a fresh ``__main__`` namespace with its own argv, stdin and captured output.
+A job carrying "cases" compiles the code once and runs it for each case,
+checking each output against the case's "expected" with the job's "compare"
+rule (see outputs_match()). With "case_timeout", a case still running after
+that many seconds is killed and reported with the "timeout" limit; the
+cases before it keep their results.
+
+Every run happens in a child forked from the worker, which itself never
+executes user code: whatever a submission patches (builtins, json, math,
+this module) dies with its child, so it can neither leak into later jobs
+nor touch the replies, the output checks or the accounting, which the
+worker does from the child's raw output and wait4() usage. Where fork() is
+unavailable, runs happen in-process and every reply asks the pool to
+recycle the worker ("recycle": true).
+
+Limits come as a JSON object in argv[1] (see worker_pool.sandbox_limits()).
+Address space, open files, processes and file size are capped with setrlimit
+in each child. A worker running as root also drops each child to the
+unprivileged "uid" (and the same gid) first: the kernel does not apply
+RLIMIT_NPROC to root, and the submission should not own the server's files.
+That uid must be able to read the interpreter's standard library; the
+worker's ready line carries a "warning" when it cannot. A negative "uid"
+keeps runs as root. CPU time is capped per run with a profiling timer, backed by
+the soft RLIMIT_CPU in case the submission blocks SIGPROF (RLIMIT_CPU alone
+only counts whole seconds). Each run gets its own scratch directory, output
+beyond the cap is dropped, and replies report CPU time, peak RSS and wall
+time.
+"""
+import builtins
+import errno
+import io
+import json
+import linecache
+import math
+import os
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits; the pool's wall-clock timeout still applies
+    resource = None
+
+SCRIPT_NAME = "main.py"
+
+DEFAULT_LIMITS = {
+    "cpu_seconds": 5.0,
+    "memory_mb": 512,
+    "open_files": 64,
+    "processes": 0,
+    "file_mb": 16,
+    "output_chars": 65536,
+    "scratch_dir": None,
+    "uid": 65534,  # nobody
+}
+LIMITS = dict(DEFAULT_LIMITS)
+SCRATCH_ROOT = None  # this worker's directory; every run gets a fresh one inside it
+PROTOCOL_FDS = ()  # closed in every child, so submissions cannot reach the job protocol
+FORK = hasattr(os, "fork")
+# Bound before any submission runs, so a child reports even if the submission patched them
+_dumps, _exit = json.dumps, os._exit  # pylint: disable=protected-access
+
+
+# How a case's output is checked against the expected one:
+#   exact       equal once leading/trailing whitespace is stripped
+#   whitespace  same whitespace-separated tokens
+#   float       same tokens, numbers equal within the tolerance
+#   unordered   same non-blank lines in any order
+COMPARE_RULES = ("exact", "whitespace", "float", "unordered")
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+
+# OSErrors that mean the submission ran into a setrlimit cap
+_LIMIT_ERRNOS = {errno.EFBIG: "file_size", errno.EMFILE: "open_files", errno.EAGAIN: "processes"}
+
+
+class CPULimitExceeded(BaseException):
+    """Raised inside the submission on SIGPROF/SIGXCPU (a BaseException, so
+    ``except Exception`` blocks in user code cannot swallow it)."""
+
+
+def _on_sigxcpu(_signum, _frame):
+    raise CPULimitExceeded("CPU time limit exceeded")
+
+
+def apply_process_limits(limits: dict) -> None:
+    """Caps that hold for the process's lifetime (soft = hard, so user code cannot raise them)."""
+    if resource is None:
+        return
+    caps = [
+        (resource.RLIMIT_AS, limits["memory_mb"] * 1024 * 1024),
+        (resource.RLIMIT_NOFILE, limits["open_files"]),
+        (resource.RLIMIT_FSIZE, limits["file_mb"] * 1024 * 1024),
+    ]
+    if hasattr(resource, "RLIMIT_NPROC"):
+        # Counted per user by the kernel (and ignored for root), so a low value
+        # forbids fork() and new threads rather than allowing that many
+        caps.append((resource.RLIMIT_NPROC, limits["processes"]))
+    for which, value in caps:
+        _, hard = resource.getrlimit(which)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        resource.setrlimit(which, (value, value))
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)  # oversized writes raise OSError instead
+
+
+def _privileged() -> bool:
+    return hasattr(os, "geteuid") and os.geteuid() == 0 and LIMITS["uid"] is not None and LIMITS["uid"] >= 0
+
+
+def _readable_by(uid: int, path: str) -> bool:
+    """Whether `uid` (group `uid`, no other groups) may list `path` and reach it from /."""
+    path = os.path.abspath(path)
+    while True:
+        st = os.stat(path)
+        shift = 6 if st.st_uid == uid else 3 if st.st_gid == uid else 0
+        if (st.st_mode >> shift) & 0o5 != 0o5:
+            return False
+        parent = os.path.dirname(path)
+        if parent == path:
+            return True
+        path = parent
+
+
+def drop_privileges(uid: int) -> None:
+    """Become `uid` (group `uid`, no supplementary groups) for good."""
+    os.setgroups([])
+    os.setgid(uid)
+    os.setuid(uid)
+
+
+def _cpu_time() -> float:
+    if resource is None:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _set_cpu_budget(seconds) -> None:
+    """Let the process use `seconds` more CPU time (None lifts the cap)."""
+    if resource is None:
+        return
+    if seconds is not None:
+        # Re-installed every run: an earlier submission may have replaced them
+        signal.signal(signal.SIGPROF, _on_sigxcpu)
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    signal.setitimer(signal.ITIMER_PROF, seconds or 0)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = hard if seconds is None else math.ceil(_cpu_time() + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _reset_peak_rss() -> None:
+    # Linux: writing 5 to clear_refs resets VmHWM, so the peak is per job
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="utf-8") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_kb():
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # Lifetime peak of the worker; ru_maxrss is in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class _CappedOutput(io.StringIO):
+    """A StringIO that keeps the first `limit` characters and drops the rest."""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self.size = 0
+        self.truncated = False
+
+    def write(self, s: str) -> int:
+        room = self.limit - self.size
+        if len(s) > room:
+            self.truncated = True
+            if room <= 0:
+                return len(s)
+            super().write(s[:room])
+            self.size = self.limit
+            return len(s)
+        self.size += len(s)
+        return super().write(s)
+
+    def text(self) -> str:
+        value = self.getvalue()
+        if self.truncated:
+            value += f"\n[output truncated at {self.limit} characters]"
+        return value
+
+
+def _open_protocol_streams():
+    """
+    Move the job protocol off fd 0/1 so user code (os.write, child processes)
+    can never read jobs or corrupt replies.
+    """
+    proto_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    proto_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+    return proto_in, proto_out
+
+
+def _tokens_match(expected: str, actual: str, tolerance: float) -> bool:
+    if expected == actual:
+        return True
+    try:
+        return math.isclose(float(expected), float(actual), rel_tol=tolerance, abs_tol=tolerance)
+    except ValueError:
+        return False
+
+
+def _sorted_lines(text: str) -> list:
+    return sorted(line.strip() for line in text.splitlines() if line.strip())
+
+
+def outputs_match(expected: str, actual: str, rule: str = "exact", tolerance: float = DEFAULT_FLOAT_TOLERANCE) -> bool:
+    """Whether `actual` passes for `expected` under `rule` (one of COMPARE_RULES)."""
+    if rule == "exact":
+        return actual.strip() == expected.strip()
+    if rule == "whitespace":
+        return actual.split() == expected.split()
+    if rule == "float":
+        want, got = expected.split(), actual.split()
+        return len(want) == len(got) and all(_tokens_match(w, g, tolerance) for w, g in zip(want, got))
+    if rule == "unordered":
+        return _sorted_lines(actual) == _sorted_lines(expected)
+    raise ValueError(f"Unknown compare rule: {rule}")
+
+
+def _format_exception(exc: BaseException) -> str:
+    """Format a traceback without the worker's own exec() frame."""
+    tb = exc.__traceback__
+    if tb is not None and tb.tb_frame.f_code.co_filename == __file__:
+        tb = tb.tb_next
+    return "".join(traceback.format_exception(type(exc), exc, tb))
+
+
+def _exec_code(code_obj, args, stdin_data, scratch):
+    """
+    Execute a compiled submission as ``__main__`` in the scratch directory
+    and capture its output. Returns ok, stdout, stderr, cpu_time, peak_rss_kb
+    and the limit it ran into ("cpu", "memory", "output", "file_size",
+    "open_files", "processes" or None).
+    """
+    stdout, stderr = _CappedOutput(LIMITS["output_chars"]), _CappedOutput(LIMITS["output_chars"])
+    namespace = {"__name__": "__main__", "__file__": SCRIPT_NAME, "__builtins__": builtins}
+    saved = (sys.argv, sys.stdin, sys.stdout, sys.stderr)
+    modules_before = set(sys.modules)
+    _reset_peak_rss()
+    os.chdir(scratch)
+    tempfile.tempdir = os.environ["TMPDIR"] = scratch
+    sys.argv = [SCRIPT_NAME, *args]
+    sys.stdin = io.StringIO(stdin_data or "")
+    sys.stdout, sys.stderr = stdout, stderr
+    ok, limit = True, None
+    cpu_started = _cpu_time()
+    try:
+        _set_cpu_budget(LIMITS["cpu_seconds"])
+        exec(code_obj, namespace)  # pylint: disable=exec-used
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            ok = False
+            if not isinstance(e.code, int):
+                print(e.code, file=stderr)
+    except CPULimitExceeded:
+        ok, limit = False, "cpu"
+        stderr.write(f"CPU time limit exceeded ({LIMITS['cpu_seconds']:g} s)\n")
+    except MemoryError:
+        ok, limit = False, "memory"
+        stderr.write(f"Memory limit exceeded ({LIMITS['memory_mb']} MB)\n")
+    except BaseException as e:  # pylint: disable=broad-exception-caught
+        ok = False
+        if isinstance(e, OSError):
+            limit = _LIMIT_ERRNOS.get(e.errno)
+        elif isinstance(e, RuntimeError) and "can't start new thread" in str(e):
+            limit = "processes"
+        stderr.write(_format_exception(e))
+    finally:
+        _set_cpu_budget(None)
+        sys.argv, sys.stdin, sys.stdout, sys.stderr = saved
+        # Forget modules the submission imported so the next job starts clean
+        for name in set(sys.modules) - modules_before:
+            sys.modules.pop(name, None)
+        os.chdir(SCRATCH_ROOT)
+    if limit is None and (stdout.truncated or stderr.truncated):
+        limit = "output"
+    return {
+        "ok": ok,
+        "stdout": stdout.text(),
+        "stderr": stderr.text(),
+        "cpu_time": _cpu_time() - cpu_started,
+        "peak_rss_kb": _peak_rss_kb(),
+        "limit": limit,
+    }
+
+
+def _child(code_obj, args, stdin_data, scratch, write_fd) -> None:
+    """Body of a forked run: limits, the submission, its outcome down the pipe. Never returns."""
+    try:
+        for fd in PROTOCOL_FDS:
+            os.close(fd)
+        apply_process_limits(LIMITS)
+        if _privileged():
+            drop_privileges(LIMITS["uid"])
+        outcome = _exec_code(code_obj, args, stdin_data, scratch)
+        with os.fdopen(write_fd, "w", encoding="utf-8") as pipe:
+            pipe.write(_dumps(outcome))
+    finally:
+        _exit(0)
+
+
+def _read_until(read_fd, deadline):
+    """Everything the child writes to the pipe; None if it is still writing at `deadline`."""
+    chunks = []
+    with os.fdopen(read_fd, "rb", buffering=0) as pipe:
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([pipe], [], [], remaining)[0]:
+                    return None
+            chunk = pipe.read(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+
+def _run_isolated(code_obj, args, stdin_data, timeout=None):
+    """
+    Run a submission once, in a forked child where fork() exists (see the
+    module docstring). A child still running after `timeout` wall-clock
+    seconds is killed; without fork() only the pool's job timeout applies.
+    """
+    scratch = tempfile.mkdtemp(dir=SCRATCH_ROOT)
+    try:
+        if not FORK:
+            return _exec_code(code_obj, args, stdin_data, scratch)
+        if _privileged():
+            os.chown(scratch, LIMITS["uid"], LIMITS["uid"])
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            _child(code_obj, args, stdin_data, scratch, write_fd)
+        os.close(write_fd)
+        data = _read_until(read_fd, None if timeout is None else time.monotonic() + timeout)
+        if data is None:
+            os.kill(pid, signal.SIGKILL)
+        _, status, usage = os.wait4(pid, 0)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    if data is None:
+        outcome = {"ok": False, "stdout": "", "stderr": f"Execution timed out after {timeout:g} seconds\n",
+                   "limit": "timeout"}
+        return _with_usage(outcome, usage)
+    return _child_outcome(data, status, usage)
+
+
+def _child_outcome(data: bytes, status: int, usage) -> dict:
+    """The child's reply, with CPU time and peak RSS as measured by the kernel."""
+    try:
+        outcome = json.loads(data)
+        if not isinstance(outcome, dict):
+            raise ValueError("not an object")
+    except ValueError:
+        # Killed before it could answer (hard RLIMIT_CPU, a signal) or garbled its reply
+        outcome = {"ok": False, "stdout": "", "stderr": "", "limit": None}
+        if os.WIFSIGNALED(status):
+            signum = os.WTERMSIG(status)
+            if signum in (signal.SIGXCPU, signal.SIGKILL):
+                outcome["limit"] = "cpu"
+            outcome["stderr"] = f"Submission was killed by {signal.Signals(signum).name}\n"
+        else:
+            outcome["stderr"] = "Submission exited without a result\n"
+    outcome = {
+        "ok": outcome.get("ok") is True,
+        "stdout": str(outcome.get("stdout", "")),
+        "stderr": str(outcome.get("stderr", "")),
+        "limit": outcome.get("limit") if isinstance(outcome.get("limit"), str) else None,
+    }
+    return _with_usage(outcome, usage)
+
+
+def _with_usage(outcome: dict, usage) -> dict:
+    outcome["cpu_time"] = usage.ru_utime + usage.ru_stime
+    # ru_maxrss is in bytes on macOS
+    outcome["peak_rss_kb"] = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return outcome
+
+
+def handle_job(job: dict) -> dict:
+    """Compile and run a single job, returning the reply payload."""
+    reply = _handle_job(job, time.perf_counter())
+    if not FORK:
+        reply["recycle"] = True  # the submission ran in this process
+    return reply
+
+
+def _handle_job(job: dict, started: float) -> dict:
+    code = job["code"]
+    # Let tracebacks show the offending source lines
+    linecache.cache[SCRIPT_NAME] = (len(code), None, code.splitlines(True), SCRIPT_NAME)
+    try:
+        code_obj = compile(code, SCRIPT_NAME, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        return {
+            "ok": False,
+            "stdout": "",
+            "stderr": "".join(traceback.format_exception_only(type(e), e)),
+            "wall_time": time.perf_counter() - started,
+            "cpu_time": 0.0,
+            "peak_rss_kb": None,
+            "limit": None,
+        }
+
+    if "cases" in job:
+        compare = job.get("compare") or {}
+        return _run_cases(code_obj, job["cases"], job.get("stop_on_failure", False), started,
+                          compare.get("rule", "exact"), compare.get("tolerance", DEFAULT_FLOAT_TOLERANCE),
+                          job.get("case_timeout"))
+
+    reply = _run_isolated(code_obj, job.get("args") or [], job.get("stdin"))
+    reply["wall_time"] = time.perf_counter() - started
+    return reply
+
+
+def _run_cases(code_obj, cases, stop_on_failure, started, rule, tolerance, case_timeout=None):
+    """Run one compiled submission against every test case in turn."""
+    results = []
+    for case in cases:
+        case_started = time.perf_counter()
+        outcome = _run_isolated(code_obj, case.get("args") or [], case.get("stdin"), case_timeout)
+        outcome["passed"] = outcome["ok"] and outputs_match(case.get("expected", ""), outcome["stdout"], rule, tolerance)
+        outcome["wall_time"] = time.perf_counter() - case_started
+        results.append(outcome)
+        if stop_on_failure and not outcome["passed"]:
+            break
+    return {
+        "ok": True,
+        "cases": results,
+        "wall_time": time.perf_counter() - started,
+        "cpu_time": sum(outcome["cpu_time"] for outcome in results),
+        "peak_rss_kb": max((outcome["peak_rss_kb"] or 0 for outcome in results), default=None),
+        "limit": next((outcome["limit"] for outcome in results if outcome["limit"]), None),
+    }
+
+
+def main() -> None:
+    global SCRATCH_ROOT, PROTOCOL_FDS
+    if len(sys.argv) > 1:
+        LIMITS.update(json.loads(sys.argv[1]))
+    SCRATCH_ROOT = LIMITS["scratch_dir"] or tempfile.mkdtemp(prefix="refactoai-sandbox-")
+    os.makedirs(SCRATCH_ROOT, exist_ok=True)
+    if FORK and _privileged():
+        os.chmod(SCRATCH_ROOT, 0o711)  # dropped children reach their own directory, list none
+    os.chdir(SCRATCH_ROOT)
+    proto_in, proto_out = _open_protocol_streams()
+    PROTOCOL_FDS = (proto_in.fileno(), proto_out.fileno())
+    if not FORK:
+        apply_process_limits(LIMITS)
+    hello = {"ready": True}
+    if FORK and _privileged() and not _readable_by(LIMITS["uid"], os.path.dirname(os.__file__)):
+        hello["warning"] = (f"Sandbox uid {LIMITS['uid']} cannot read the standard library in "
+                            f"{os.path.dirname(os.__file__)}; submissions can only import modules the worker loaded")
+    proto_out.write(json.dumps(hello) + "\n")
+    proto_out.flush()
+
+    try:
+        for line in proto_in:
+            if not line.strip():
+                continue
+            try:
+                reply = handle_job(json.loads(line))
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                reply = {"ok": False, "stdout": "", "stderr": f"Worker error: {e}", "wall_time": 0.0,
+                         "cpu_time": 0.0, "limit": "memory" if isinstance(e, MemoryError) else None}
+            proto_out.write(json.dumps(reply) + "\n")
+            proto_out.flush()
+    finally:
+        os.chdir(os.path.dirname(SCRATCH_ROOT))
+        shutil.rmtree(SCRATCH_ROOT, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+State shared by every worker process of one deployment.
+
+With several uvicorn workers a request can land on any of them, so state
+that must outlive a single request cannot stay in process memory. When
+SHARED_STATE_PATH is set, conversation memory (memory.py) and rate-limit
+counters (backend/rate_limit.py) are kept in this SQLite file in WAL mode,
+and the result cache uses it as its on-disk tier. Unset, everything stays
+in-process as in a single-worker deployment.
+
+Each call opens its own short-lived connection, like JobStore. A session
+update is computed outside any transaction and stored with a compare-and-set
+on the state it started from; when another worker got there first it is
+recomputed from the new state, so concurrent updates do not lose turns and
+the write lock is only held for the write itself.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import orjson
+
+# Configuration (overridable through .env)
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH")  # unset = per-process state
+SHARED_SESSIONS_MAX = int(os.getenv("SHARED_SESSIONS_MAX", os.getenv("MEMORY_MAX_SESSIONS", "1000")))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    state BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_sessions_updated_at ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT NOT NULL,
+    window_end REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (key, window_end)
+) WITHOUT ROWID;
+"""
+
+# Trim sessions / expired rate-limit windows every this many writes
+_SWEEP_EVERY = 256
+# Compare-and-set attempts of a session update before it takes the write lock for the whole update
+_UPDATE_ATTEMPTS = 8
+
+State = Dict[str, Any]
+
+
+class SharedStore:
+    """
+    SQLite-backed session states and rate-limit counters.
+
+    Args:
+        path: Database file; created with its tables if missing.
+        max_sessions: Sessions kept; the least recently updated go first.
+    """
+
+    def __init__(self, path: str, max_sessions: int = SHARED_SESSIONS_MAX):
+        self.path = path
+        self.max_sessions = max_sessions
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # ── sessions ──────────────────────────────────────────────────────────────
+
+    def load_session(self, session_id: str) -> Optional[State]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def update_session(self, session_id: str, update: Callable[[Optional[State]], State]) -> State:
+        """
+        Apply `update` to the stored state (None if there is none) and store
+        its result, atomically. `update` runs outside any transaction and may
+        be called again if another worker updated the session meanwhile.
+        """
+        for _ in range(_UPDATE_ATTEMPTS):
+            with self._connect() as conn:
+                row = conn.execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            state = update(orjson.loads(row[0]) if row else None)
+            with self._connect() as conn:
+                if row is None:
+                    stored = conn.execute(
+                        "INSERT INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)"
+                        " ON CONFLICT (session_id) DO NOTHING",
+                        (session_id, orjson.dumps(state), time.time()),
+                    ).rowcount
+                else:
+                    stored = conn.execute(
+                        "UPDATE sessions SET state = ?, updated_at = ? WHERE session_id = ? AND state = ?",
+                        (orjson.dumps(state), time.time(), session_id, row[0]),
+                    ).rowcount
+            if stored:
+                break
+        else:
+            # Persistently contended: hold the write lock across the update
+            with self._transaction() as conn:
+                row = conn.execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+                state = update(orjson.loads(row[0]) if row else None)
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)",
+                    (session_id, orjson.dumps(state), time.time()),
+                )
+        self._maybe_sweep()
+        return state
+
+    def drop_session(self, session_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def session_count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    # ── rate limits ───────────────────────────────────────────────────────────
+
+    def hit(self, key: str, window_end: float, amount: int = 1) -> int:
+        """Add `amount` to the counter of `key` in the window ending at `window_end`; returns the new count."""
+        with self._connect() as conn:
+            (count,) = conn.execute(
+                "INSERT INTO rate_limits (key, window_end, count) VALUES (?, ?, ?)"
+                " ON CONFLICT (key, window_end) DO UPDATE SET count = count + excluded.count"
+                " RETURNING count",
+                (key, window_end, amount),
+            ).fetchone()
+        self._maybe_sweep()
+        return count
+
+    # ── housekeeping ──────────────────────────────────────────────────────────
+
+    def _maybe_sweep(self) -> None:
+        with self._writes_lock:
+            self._writes += 1
+            if self._writes % _SWEEP_EVERY:
+                return
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                " SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            conn.execute("DELETE FROM rate_limits WHERE window_end < ?", (time.time(),))
+
+
+_store: Optional[SharedStore] = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store() -> Optional[SharedStore]:
+    """Return the process-wide store, or None when SHARED_STATE_PATH is unset."""
+    global _store
+    if SHARED_STATE_PATH is None:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SharedStore(SHARED_STATE_PATH)
+        return _store
@@ -1,7 +1,41 @@
+import ast
+import asyncio
+import functools
+import json
+import shutil
 import subprocess
-import tempfile
-import os
 import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+from server.agentic.concurrency import resource_slots, thread_slots
+from server.agentic.lint_engine import (
+    LintResult,
+    engine_version,
+    get_lint_process_pool,
+    lint_source,
+    shutdown_lint_process_pool,
+)
+from server.agentic.metrics import get_metrics
+from server.agentic.result_cache import get_result_cache, make_key
+from server.agentic.worker_pool import (
+    RUNNER_TIMEOUT_SECONDS,
+    SANDBOX_SPAWN_SECONDS,
+    WorkerCrashed,
+    get_worker_pool,
+    kill_worker,
+    new_scratch_dir,
+    parse_reply,
+    reply_usage,
+    sandbox_limits,
+    worker_command,
+    worker_pool_enabled,
+)
+
+LINT_SECONDS = get_metrics().histogram(
+    "refactoai_lint_seconds", "Pylint time per uncached lint, by where it ran", ("runner",))
 
 
 class CodeChecker:
@@ -10,48 +44,104 @@ class CodeChecker:
     """
 
     @staticmethod
-    def check_code_with_pylint(code_string: str) -> str:
+    def check_code_with_pylint(code_string: str, task_id=None) -> str:
         """
         Runs Pylint on a given string of Python code and returns the report.
 
         Args:
             code_string: A string containing the Python code to check.
+            task_id: Task the code belongs to (part of the cache key).
 
         Returns:
             A string containing the Pylint report, or an error message.
         """
+        return CodeChecker.lint_code(code_string, task_id).report
+
+    @staticmethod
+    def lint_code(code_string: str, task_id=None) -> LintResult:
+        """
+        Lints a string of Python code in the lint process pool, holding a
+        "lint" slot like AsyncCodeChecker, so job threads never run Pylint
+        in the server process. Results are cached by content, so
+        resubmissions skip the linter.
+
+        Args:
+            code_string: A string containing the Python code to check.
+            task_id: Task the code belongs to (part of the cache key).
+
+        Returns:
+            A LintResult with structured messages, the score and the text
+            report (or an error message in place of the report).
+        """
         # Pylint cannot run on an empty file, so handle empty input
         if not code_string.strip():
-            return "Error: Empty code string provided. Pylint cannot check empty code."
+            return LintResult(error="Error: Empty code string provided. Pylint cannot check empty code.")
 
-        temp_file_path = None
+        key = make_key("lint", engine_version(), code_string, task_id)
         try:
-            # Create a temporary .py file to store the code
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
-                temp_file.write(code_string)
-                temp_file_path = temp_file.name
-
-            # Run Pylint as a subprocess and capture its output
-            result = subprocess.run(
-                ['pylint', temp_file_path],
-                capture_output=True,
-                text=True,
-                timeout=20
-            )
-            # The Pylint report is sent to stdout
-            return result.stdout.strip()
+            payload = get_result_cache().get_or_compute(key, lambda: CodeChecker._lint(code_string))
+            return LintResult.from_dict(payload)
+        except ImportError:
+            return LintResult(error="Error: Pylint is not installed. Add it to the environment to lint code.")
+        except BrokenProcessPool as e:
+            shutdown_lint_process_pool()
+            return LintResult(error=f"An error occurred while running Pylint: {str(e)}")
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # astroid can crash on exotic input; never take the request down
+            return LintResult(error=f"An error occurred while running Pylint: {str(e)}")
 
-        except FileNotFoundError:
-            return "Error: 'pylint' command not found. Is Pylint installed and in your PATH?"
-        except (subprocess.TimeoutExpired, OSError) as e:
-            return f"An error occurred while running Pylint: {str(e)}"
-        finally:
-            # Ensure the temporary file is always deleted
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.unlink(temp_file_path)
-                except OSError:
-                    pass
+    @staticmethod
+    def _lint(code_string: str) -> dict:
+        with thread_slots("lint"), LINT_SECONDS.time(runner="process_pool"):
+            return get_lint_process_pool().submit(lint_source, code_string).result()
+
+
+# Submissions importing these can print different output on every run; importlib
+# and builtins hand out any other module
+VOLATILE_MODULES = frozenset({
+    "random", "time", "datetime", "uuid", "secrets", "os", "socket", "threading", "subprocess",
+    "importlib", "builtins",
+})
+# Calls that can import a module the import statements do not show
+DYNAMIC_CALLS = frozenset({"__import__", "import_module", "eval", "exec"})
+
+
+def _call_name(func: ast.expr) -> str:
+    if isinstance(func, ast.Name):
+        return func.id
+    return func.attr if isinstance(func, ast.Attribute) else ""
+
+
+@functools.lru_cache(maxsize=1024)
+def is_volatile(code_string: str) -> bool:
+    """
+    True if the code may print different output on every run, so its runs
+    are not cached: it imports one of VOLATILE_MODULES anywhere (any name of
+    an import statement, at any depth) or imports or evaluates code
+    dynamically. Code that does not parse fails the same way every time.
+    """
+    try:
+        tree = ast.parse(code_string)
+    except (SyntaxError, ValueError):
+        return False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split(".")[0] in VOLATILE_MODULES for alias in node.names):
+                return True
+        elif isinstance(node, ast.ImportFrom):
+            if node.level == 0 and node.module.split(".")[0] in VOLATILE_MODULES:
+                return True
+        elif isinstance(node, ast.Call) and _call_name(node.func) in DYNAMIC_CALLS:
+            return True
+    return False
+
+
+@dataclass
+class RunResult:
+    """Output of a run and its resource usage ({"cached": True} for cache hits)."""
+
+    output: str
+    usage: Dict[str, Any] = field(default_factory=dict)
 
 
 class ScriptRunner:
@@ -60,44 +150,240 @@ class ScriptRunner:
     """
 
     @staticmethod
-    def run_python_code(code_string, args=None, inputs=None):
+    def run_python_code(code_string, args=None, inputs=None, timeout=None, task_id=None):
+        """
+        Runs a Python code string and returns its stdout.
+
+        Jobs go to the pre-warmed worker pool unless it is disabled with
+        RUNNER_POOL_SIZE=0, in which case a one-shot sandbox worker is
+        spawned. Both run under the same resource limits.
+
+        Args:
+            code_string: The Python source to execute.
+            args: Command-line arguments exposed through sys.argv.
+            inputs: Values fed to stdin, one per line.
+            timeout: Wall-clock limit in seconds (defaults to RUNNER_TIMEOUT_SECONDS).
+            task_id: Task the code belongs to (part of the cache key).
+
+        Returns:
+            The stripped stdout, or a string starting with "Error:".
+        """
+        return ScriptRunner.run_code(code_string, args, inputs, timeout, task_id).output
+
+    @staticmethod
+    def run_code(code_string, args=None, inputs=None, timeout=None, task_id=None) -> RunResult:
+        """Like run_python_code(), with the run's resource usage."""
         # Validate inputs
         if not code_string.strip():
-            return "Error: Empty code string provided"
+            return RunResult("Error: Empty code string provided")
+        args, stdin_input, timeout = ScriptRunner._prepare(args, inputs, timeout)
+
+        if is_volatile(code_string):
+            return ScriptRunner._execute(code_string, args, stdin_input, timeout)[0]
+
+        cache = get_result_cache()
+        key = ScriptRunner._cache_key(code_string, args, stdin_input, task_id)
+        cached = cache.get(key)
+        if cached is not None:
+            return RunResult(cached, {"cached": True})
+
+        result, cacheable = ScriptRunner._execute(code_string, args, stdin_input, timeout)
+        if cacheable:
+            cache.put(key, result.output)
+        return result
+
+    @staticmethod
+    def _prepare(args, inputs, timeout):
         args = [str(arg) for arg in args or []]  # Convert args to strings, default to empty list
         inputs = inputs or []  # Default to empty list for inputs
+        # Prepare input for stdin (join inputs with newlines)
+        stdin_input = "\n".join(str(i) for i in inputs) + "\n" if inputs else None
+        return args, stdin_input, timeout or RUNNER_TIMEOUT_SECONDS
+
+    @staticmethod
+    def _cache_key(code_string, args, stdin_input, task_id):
+        # A cached result only holds under the limits it ran with
+        return make_key("run", sys.version, code_string, task_id, [args, stdin_input, sandbox_limits()])
+
+    @staticmethod
+    def _execute(code_string, args, stdin_input, timeout):
+        """Runs the code; returns a RunResult and whether it is safe to cache."""
+        try:
+            if worker_pool_enabled():
+                reply = get_worker_pool().run(code_string, args, stdin_input, timeout)
+            else:
+                reply = ScriptRunner.spawn_python_code(code_string, args, stdin_input, timeout)
+        except (TimeoutError, WorkerCrashed, OSError, ValueError) as e:
+            # Timeouts and crashes depend on load; never cache them
+            usage = {"limit": "timeout"} if isinstance(e, TimeoutError) else {}
+            return RunResult(f"Error: {str(e)}", usage), False
+        return ScriptRunner._result(reply)
 
-        temp_file_path = None
+    @staticmethod
+    def _result(reply):
+        usage = reply_usage(reply)
+        # A run cut short by the CPU limit may finish next time (e.g. on a faster host)
+        cacheable = usage["limit"] != "cpu"
+        if not reply["ok"]:
+            return RunResult(f"Error: {reply['stderr'].strip()}", usage), cacheable
+        return RunResult(reply["stdout"].strip(), usage), cacheable
+
+    @staticmethod
+    def _job_line(code_string, args, stdin_input):
+        return json.dumps({"code": code_string, "args": args, "stdin": stdin_input}) + "\n"
+
+    @staticmethod
+    def spawn_python_code(code_string, args, stdin_input, timeout):
+        """
+        Runs the code in a one-shot sandbox worker (a brand-new interpreter)
+        and returns the worker reply, like WorkerPool.run().
+        """
+        return ScriptRunner.spawn_job({"code": code_string, "args": args, "stdin": stdin_input}, timeout)
+
+    @staticmethod
+    def spawn_job(job, timeout):
+        """
+        Runs any sandbox worker job (e.g. a grader job with "cases") in a
+        one-shot worker and returns its reply, like WorkerPool.submit().
+
+        Raises:
+            TimeoutError: The run exceeded `timeout` (interpreter startup included).
+            WorkerCrashed: The worker died without replying.
+        """
+        scratch_dir = new_scratch_dir()
+        started = time.perf_counter()
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
-                temp_file.write(code_string)
-                temp_file_path = temp_file.name
-
-            # Prepare input for stdin (join inputs with newlines)
-            stdin_input = "\n".join(str(i) for i in inputs) + "\n" if inputs else None
-
-            # Run the temporary script with arguments and capture output
-            result = subprocess.run(
-                [sys.executable, temp_file_path] + args,
-                input=stdin_input,
-                capture_output=True,
+            with subprocess.Popen(
+                worker_command(scratch_dir),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 text=True,
-                check=True,
-                timeout=10  # Prevent infinite loops
-            )
-            return result.stdout.strip()
+                encoding="utf-8",
+                start_new_session=True,  # kill_worker() then also reaches the forked run
+            ) as process:
+                try:
+                    stdout, _ = process.communicate(json.dumps(job) + "\n", timeout=timeout)  # Prevent infinite loops
+                except subprocess.TimeoutExpired as e:
+                    kill_worker(process)
+                    process.communicate()
+                    raise TimeoutError(f"Execution timed out after {timeout:g} seconds") from e
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+        return ScriptRunner._spawned_reply(stdout, started)
+
+    @staticmethod
+    def _spawned_reply(stdout, started):
+        """Parse a one-shot worker's reply; whatever the run itself did not use was startup."""
+        reply = parse_reply(stdout)
+        SANDBOX_SPAWN_SECONDS.observe(max(0.0, time.perf_counter() - started - reply.get("wall_time", 0.0)),
+                                      mode="oneshot")
+        return reply
+
+
+class AsyncCodeChecker:
+    """
+    Non-blocking counterpart of CodeChecker for async routes.
+
+    Lint jobs run in a small pool of processes that each hold a resident
+    Pylint engine, bounded by the "lint" concurrency limit.
+    """
+
+    @staticmethod
+    async def lint_code(code_string: str, task_id=None) -> LintResult:
+        if not code_string.strip():
+            return LintResult(error="Error: Empty code string provided. Pylint cannot check empty code.")
+
+        cache = get_result_cache()
+        key = make_key("lint", engine_version(), code_string, task_id)
+        payload = await cache.aget(key)
+        if payload is None:
+            try:
+                async with resource_slots("lint"):
+                    loop = asyncio.get_running_loop()
+                    with LINT_SECONDS.time(runner="process_pool"):
+                        payload = await loop.run_in_executor(get_lint_process_pool(), lint_source, code_string)
+            except ImportError:
+                return LintResult(error="Error: Pylint is not installed. Add it to the environment to lint code.")
+            except BrokenProcessPool as e:
+                shutdown_lint_process_pool()
+                return LintResult(error=f"An error occurred while running Pylint: {str(e)}")
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                return LintResult(error=f"An error occurred while running Pylint: {str(e)}")
+            await cache.aput(key, payload)
+        return LintResult.from_dict(payload)
+
+    @staticmethod
+    async def check_code_with_pylint(code_string: str, task_id=None) -> str:
+        return (await AsyncCodeChecker.lint_code(code_string, task_id)).report
+
 
-        except subprocess.CalledProcessError as e:
-            return f"Error: {e.stderr.strip()}"
-        except (subprocess.TimeoutExpired, OSError, PermissionError) as e:
-            return f"Error: {str(e)}"
+class AsyncScriptRunner:
+    """
+    Non-blocking counterpart of ScriptRunner for async routes, bounded by the
+    "run" concurrency limit.
+    """
+
+    @staticmethod
+    async def run_python_code(code_string, args=None, inputs=None, timeout=None, task_id=None):
+        return (await AsyncScriptRunner.run_code(code_string, args, inputs, timeout, task_id)).output
+
+    @staticmethod
+    async def run_code(code_string, args=None, inputs=None, timeout=None, task_id=None) -> RunResult:
+        if not code_string.strip():
+            return RunResult("Error: Empty code string provided")
+        args, stdin_input, timeout = ScriptRunner._prepare(args, inputs, timeout)
+
+        cache = get_result_cache()
+        key = ScriptRunner._cache_key(code_string, args, stdin_input, task_id)
+        volatile = is_volatile(code_string)
+        cached = None if volatile else await cache.aget(key)
+        if cached is not None:
+            return RunResult(cached, {"cached": True})
+
+        async with resource_slots("run"):
+            result, cacheable = await AsyncScriptRunner._execute(code_string, args, stdin_input, timeout)
+        if cacheable and not volatile:
+            await cache.aput(key, result.output)
+        return result
+
+    @staticmethod
+    async def _execute(code_string, args, stdin_input, timeout):
+        if worker_pool_enabled():
+            # The pool blocks on a pipe; keep that wait off the event loop
+            return await asyncio.to_thread(ScriptRunner._execute, code_string, args, stdin_input, timeout)
+        try:
+            reply = await AsyncScriptRunner.spawn_python_code(code_string, args, stdin_input, timeout)
+        except (TimeoutError, WorkerCrashed, OSError, ValueError) as e:
+            usage = {"limit": "timeout"} if isinstance(e, TimeoutError) else {}
+            return RunResult(f"Error: {str(e)}", usage), False
+        return ScriptRunner._result(reply)
+
+    @staticmethod
+    async def spawn_python_code(code_string, args, stdin_input, timeout):
+        """Runs the code in a one-shot sandbox worker via asyncio.create_subprocess_exec."""
+        scratch_dir = new_scratch_dir()
+        started = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *worker_command(scratch_dir),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            try:
+                stdout, _ = await asyncio.wait_for(
+                    process.communicate(ScriptRunner._job_line(code_string, args, stdin_input).encode()),
+                    timeout,
+                )
+            except asyncio.TimeoutError as e:
+                kill_worker(process)
+                await process.wait()
+                raise TimeoutError(f"Execution timed out after {timeout:g} seconds") from e
         finally:
-            # Always clean up the temporary file
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.unlink(temp_file_path)
-                except OSError:
-                    pass  # Ignore cleanup errors
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+        return ScriptRunner._spawned_reply(stdout.decode(errors="replace"), started)
 
 
 # Example usage
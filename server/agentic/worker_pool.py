@@ -0,0 +1,340 @@
+"""
+Pool of pre-warmed Python interpreters for running user submissions.
+
+Spawning a fresh interpreter for every "Run" click spends most of the request
+in interpreter startup. The pool keeps a few sandbox workers alive, sends them
+code over a pipe and recycles a worker after a fixed number of jobs, on crash
+or on timeout. Every run happens in a child forked from its worker under the
+RUNNER_* resource limits below (see sandbox_worker), and every worker gets
+its own scratch directory, removed when the worker goes away. Workers lead
+their own process group, so killing one also kills the run it forked.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from server.agentic.metrics import get_metrics
+
+WORKER_SCRIPT = Path(__file__).with_name("sandbox_worker.py")
+
+logger = logging.getLogger(__name__)
+_worker_warnings = set()  # logged once per process
+
+# Configuration (overridable through .env)
+RUNNER_POOL_SIZE = int(os.getenv("RUNNER_POOL_SIZE", "2"))
+RUNNER_MAX_JOBS_PER_WORKER = int(os.getenv("RUNNER_MAX_JOBS_PER_WORKER", "50"))
+RUNNER_TIMEOUT_SECONDS = float(os.getenv("RUNNER_TIMEOUT_SECONDS", "10"))
+RUNNER_STARTUP_TIMEOUT_SECONDS = 10.0
+RUNNER_POOL_WAIT_SECONDS = float(os.getenv("RUNNER_POOL_WAIT_SECONDS", "60"))  # for a free worker
+# Sandbox limits, enforced with setrlimit inside every worker (POSIX only)
+RUNNER_CPU_SECONDS = float(os.getenv("RUNNER_CPU_SECONDS", "5"))  # per run
+RUNNER_MEMORY_MB = int(os.getenv("RUNNER_MEMORY_MB", "512"))  # address space
+RUNNER_MAX_OPEN_FILES = int(os.getenv("RUNNER_MAX_OPEN_FILES", "64"))
+RUNNER_MAX_PROCESSES = int(os.getenv("RUNNER_MAX_PROCESSES", "0"))  # per user
+RUNNER_SANDBOX_UID = int(os.getenv("RUNNER_SANDBOX_UID", "65534"))  # runs drop to it when root; -1 keeps root
+RUNNER_MAX_FILE_MB = int(os.getenv("RUNNER_MAX_FILE_MB", "16"))
+RUNNER_MAX_OUTPUT_CHARS = int(os.getenv("RUNNER_MAX_OUTPUT_CHARS", "65536"))  # each of stdout/stderr
+RUNNER_SCRATCH_DIR = os.getenv("RUNNER_SCRATCH_DIR")  # defaults to the system temp dir
+
+
+SANDBOX_RUN_SECONDS = get_metrics().histogram(
+    "refactoai_sandbox_run_seconds", "Wall time of submissions inside the sandbox worker")
+SANDBOX_CPU_SECONDS = get_metrics().histogram(
+    "refactoai_sandbox_cpu_seconds", "CPU time of submissions inside the sandbox worker")
+SANDBOX_LIMIT_HITS = get_metrics().counter(
+    "refactoai_sandbox_limit_hits_total", "Sandbox runs stopped by a resource limit", ("limit",))
+SANDBOX_SPAWN_SECONDS = get_metrics().histogram(
+    "refactoai_sandbox_spawn_seconds",
+    "Interpreter startup paid by a run: one-shot worker overhead, or waiting for a fresh pool worker",
+    ("mode",))
+SANDBOX_POOL_WAIT_SECONDS = get_metrics().histogram(
+    "refactoai_sandbox_pool_wait_seconds", "Time a run waited for an idle pool worker")
+
+
+class WorkerCrashed(RuntimeError):
+    """Raised when a worker dies or stops answering mid-job."""
+
+
+def sandbox_limits() -> Dict[str, Any]:
+    return {
+        "cpu_seconds": RUNNER_CPU_SECONDS,
+        "memory_mb": RUNNER_MEMORY_MB,
+        "open_files": RUNNER_MAX_OPEN_FILES,
+        "processes": RUNNER_MAX_PROCESSES,
+        "file_mb": RUNNER_MAX_FILE_MB,
+        "output_chars": RUNNER_MAX_OUTPUT_CHARS,
+        "uid": RUNNER_SANDBOX_UID,
+    }
+
+
+def worker_command(scratch_dir: str) -> List[str]:
+    """Command line of a sandbox worker using `scratch_dir` for its runs."""
+    limits = dict(sandbox_limits(), scratch_dir=scratch_dir)
+    return [sys.executable, "-I", "-u", str(WORKER_SCRIPT), json.dumps(limits)]
+
+
+def kill_worker(process) -> None:
+    """Kill a sandbox worker (a Popen or an asyncio Process) and any run it forked."""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # the whole group is gone already
+        return
+    process.kill()
+
+
+def new_scratch_dir() -> str:
+    return tempfile.mkdtemp(prefix="refactoai-sandbox-", dir=RUNNER_SCRATCH_DIR)
+
+
+def parse_reply(stdout: str) -> Dict[str, Any]:
+    """The job reply of a one-shot worker: the last line after its ready line."""
+    lines = stdout.strip().splitlines()
+    if len(lines) < 2:
+        raise WorkerCrashed("Worker exited without replying")
+    return json.loads(lines[-1])
+
+
+def reply_usage(reply: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resource accounting of a worker reply, for API responses. Submissions
+    that ran into a sandbox limit are logged, as they are the ones slowing
+    the workers down for everyone else.
+    """
+    usage = {
+        "wall_time_ms": round(reply.get("wall_time", 0.0) * 1000, 1),
+        "cpu_time_ms": round(reply.get("cpu_time", 0.0) * 1000, 1),
+        "peak_rss_kb": reply.get("peak_rss_kb"),
+        "limit": reply.get("limit"),
+    }
+    SANDBOX_RUN_SECONDS.observe(reply.get("wall_time", 0.0))
+    SANDBOX_CPU_SECONDS.observe(reply.get("cpu_time", 0.0))
+    if usage["limit"]:
+        SANDBOX_LIMIT_HITS.inc(limit=usage["limit"])
+        logger.warning("Sandbox run hit its %s limit: wall=%s ms cpu=%s ms peak_rss=%s KiB",
+                       usage["limit"], usage["wall_time_ms"], usage["cpu_time_ms"], usage["peak_rss_kb"])
+    return usage
+
+
+class SandboxWorker:
+    """One long-lived interpreter speaking the sandbox_worker line protocol."""
+
+    def __init__(self):
+        self.jobs_done = 0
+        self.recycle = False  # set when a submission ran inside the worker itself
+        self._ready = False
+        self.scratch_dir = new_scratch_dir()
+        try:
+            self.process = subprocess.Popen(
+                worker_command(self.scratch_dir),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+                start_new_session=True,
+            )
+        except BaseException:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+            raise
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_reply(self, timeout: float) -> Dict[str, Any]:
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            raise TimeoutError(f"Execution timed out after {timeout:g} seconds")
+        line = self.process.stdout.readline()
+        if not line:
+            raise WorkerCrashed(f"Worker exited with code {self.process.wait()}")
+        return json.loads(line)
+
+    def run(self, job: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Send one job and wait for its reply (kills the worker on timeout)."""
+        try:
+            if not self._ready:
+                started = time.perf_counter()
+                hello = self._read_reply(RUNNER_STARTUP_TIMEOUT_SECONDS)
+                if hello.get("warning") and hello["warning"] not in _worker_warnings:
+                    _worker_warnings.add(hello["warning"])
+                    logger.warning(hello["warning"])
+                self._ready = True
+                SANDBOX_SPAWN_SECONDS.observe(time.perf_counter() - started, mode="pool")
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+            reply = self._read_reply(timeout)
+        except (TimeoutError, WorkerCrashed, OSError, ValueError):
+            self.kill()
+            raise
+        self.jobs_done += 1
+        self.recycle = bool(reply.get("recycle"))
+        return reply
+
+    def kill(self) -> None:
+        kill_worker(self.process)
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of SandboxWorker processes. Every slot goes back to the
+    idle queue after a job; a slot whose worker could not be (re)spawned
+    goes back empty (None) and the next job that takes it tries again.
+
+    Args:
+        size: Number of workers kept warm.
+        max_jobs_per_worker: Recycle a worker after this many jobs.
+        timeout: Default per-job wall-clock limit in seconds.
+    """
+
+    def __init__(
+        self,
+        size: int = RUNNER_POOL_SIZE,
+        max_jobs_per_worker: int = RUNNER_MAX_JOBS_PER_WORKER,
+        timeout: float = RUNNER_TIMEOUT_SECONDS,
+    ):
+        self.size = max(1, size)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.timeout = timeout
+        self._idle: "queue.Queue[SandboxWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers: List[SandboxWorker] = []
+        self._started = False
+        self._closed = False
+
+    def start(self) -> "WorkerPool":
+        """Spawn all workers up front so the first requests are warm."""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        for _ in range(self.size):
+            self._idle.put(self._replace(None))
+        return self
+
+    def _replace(self, worker: Optional[SandboxWorker]) -> Optional[SandboxWorker]:
+        """Swap `worker` (None: an empty slot) for a fresh one; None if none can be spawned."""
+        if worker is not None:
+            worker.kill()
+            with self._lock:
+                self._workers = [w for w in self._workers if w is not worker]
+        try:
+            fresh = SandboxWorker()
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning("Could not start a sandbox worker: %s", e)
+            return None
+        with self._lock:
+            self._workers.append(fresh)
+        return fresh
+
+    def submit(self, job: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run one job on an idle worker.
+
+        Args:
+            job: Protocol payload ({"code", "args", "stdin"}).
+            timeout: Per-job limit; defaults to the pool timeout.
+
+        Returns:
+            The worker reply ({"ok", "stdout", "stderr", "wall_time",
+            "cpu_time", "peak_rss_kb", "limit"}).
+
+        Raises:
+            TimeoutError: The job exceeded its time limit, or no worker
+                became free within RUNNER_POOL_WAIT_SECONDS.
+            WorkerCrashed: The worker died while running the job, or no
+                worker could be started for it.
+        """
+        if self._closed:
+            raise RuntimeError("Worker pool is shut down")
+        self.start()
+
+        started = time.perf_counter()
+        try:
+            worker = self._idle.get(timeout=RUNNER_POOL_WAIT_SECONDS)
+        except queue.Empty:
+            raise TimeoutError(f"No sandbox worker became free within {RUNNER_POOL_WAIT_SECONDS:g} seconds") from None
+        SANDBOX_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+        try:
+            if worker is None or not worker.alive or worker.jobs_done >= self.max_jobs_per_worker:
+                worker = self._replace(worker)
+                if worker is None:
+                    raise WorkerCrashed("Could not start a sandbox worker")
+            return worker.run(job, timeout or self.timeout)
+        finally:
+            if worker is not None and (not worker.alive or worker.recycle):
+                worker = self._replace(worker)
+            self._idle.put(worker)
+
+    def run(self, code: str, args: List[str], stdin_input: Optional[str], timeout: Optional[float] = None):
+        return self.submit({"code": code, "args": args, "stdin": stdin_input}, timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Workers alive and idle right now."""
+        with self._lock:
+            size = len(self._workers)
+        idle = self._idle.qsize()
+        return {"size": size, "idle": idle, "busy": max(0, size - idle)}
+
+    def shutdown(self) -> None:
+        self._closed = True
+        with self._lock:
+            for worker in self._workers:
+                worker.kill()
+            self._workers = []
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def worker_pool_enabled() -> bool:
+    return RUNNER_POOL_SIZE > 0
+
+
+def get_worker_pool() -> WorkerPool:
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WorkerPool().start()
+                atexit.register(_pool.shutdown)
+    return _pool
+
+
+def worker_pool_stats() -> Optional[Dict[str, int]]:
+    """WorkerPool.stats() of the process-wide pool; None until it is created."""
+    pool = _pool
+    return pool.stats() if pool is not None else None
+
+
+def shutdown_worker_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
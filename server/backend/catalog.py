@@ -0,0 +1,160 @@
+"""
+In-process, read-through task catalog for the GET /tasks routes.
+
+All tasks are loaded once (only the columns TaskOut exposes), indexed by id
+and by topic, and serialized to JSON up front together with a strong ETag,
+so a listing request costs a dict lookup instead of a query plus ORM and
+Pydantic work. The catalog reloads itself when the SQLite file (or its WAL)
+changes on disk, e.g. after scripts/fill_db.py reseeds it, or when
+invalidate() bumps its version from inside the process.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+import xxhash
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from server.database import db_models as models
+from server.database.db import ReadSessionLocal, read_engine
+
+CATALOG_FIELDS = ("id", "name", "topic", "description")  # what TaskOut exposes
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """A pre-serialized JSON response body and its strong ETag."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def of(cls, body: bytes) -> "CatalogEntry":
+        return cls(body, f'"{xxhash.xxh3_64_hexdigest(body)}"')
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """If-None-Match check (weak comparison, as RFC 9110 asks for GET)."""
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags
+
+
+class TaskCatalog:
+    """
+    Tasks by id and by topic, served from memory.
+
+    Args:
+        session_factory: Opens a session for (re)loading.
+        db_path: SQLite file watched for changes; None disables the check,
+            leaving invalidate() as the only way to reload.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], db_path: Optional[str]):
+        self.session_factory = session_factory
+        self.db_path = db_path
+        self.version = 0
+        self._loaded_version = -1
+        self._loaded_signature: Optional[Tuple] = None
+        self._lock = threading.Lock()
+        self._all = CatalogEntry.of(b"[]")
+        self._by_id: Dict[int, CatalogEntry] = {}
+        self._by_topic: Dict[str, CatalogEntry] = {}
+
+    def invalidate(self) -> None:
+        """Force a reload on the next request (call after writing tasks in-process)."""
+        self.version += 1
+
+    def is_stale(self) -> bool:
+        return self._loaded_version != self.version or self._loaded_signature != self._signature()
+
+    def load(self) -> None:
+        """Read the catalog from the database; blocking, so run it off the event loop."""
+        with self._lock:
+            version, signature = self.version, self._signature()
+            if version == self._loaded_version and signature == self._loaded_signature:
+                return  # another thread reloaded while we waited
+
+            columns = [getattr(models.Task, name) for name in CATALOG_FIELDS]
+            with self.session_factory() as db:
+                rows = db.execute(select(*columns).order_by(models.Task.id)).all()
+
+            serialized = [(row.id, row.topic, orjson.dumps(dict(zip(CATALOG_FIELDS, row)))) for row in rows]
+            by_topic: Dict[str, List[bytes]] = {}
+            for _, topic, body in serialized:
+                by_topic.setdefault(topic, []).append(body)
+
+            self._all = CatalogEntry.of(b"[" + b",".join(body for _, _, body in serialized) + b"]")
+            self._by_id = {task_id: CatalogEntry.of(body) for task_id, _, body in serialized}
+            self._by_topic = {topic: CatalogEntry.of(b"[" + b",".join(bodies) + b"]")
+                              for topic, bodies in by_topic.items()}
+            self._loaded_version, self._loaded_signature = version, signature
+
+    def all(self) -> CatalogEntry:
+        return self._all
+
+    def task(self, task_id: int) -> Optional[CatalogEntry]:
+        return self._by_id.get(task_id)
+
+    def topic(self, topic: str) -> CatalogEntry:
+        return self._by_topic.get(topic) or CatalogEntry.of(b"[]")
+
+    def _signature(self) -> Optional[Tuple]:
+        # Writes in WAL mode land in the -wal file until a checkpoint
+        if not self.db_path:
+            return None
+        signature = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+
+def task_page(
+    db: Session,
+    fields: Sequence[str] = CATALOG_FIELDS,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[int] = None,
+    topic: Optional[str] = None,
+) -> CatalogEntry:
+    """
+    One page of tasks, straight from the database: only `fields` are selected
+    and the page starts after task id `cursor` (keyset pagination, so the
+    cost is the same on page 1 and page 1000). Reads limit + 1 rows to know
+    whether another page follows.
+    """
+    columns = [getattr(models.Task, name) for name in fields]
+    query = select(*columns).order_by(models.Task.id).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(models.Task.id > cursor)
+    if topic is not None:
+        query = query.where(models.Task.topic == topic)
+
+    rows = db.execute(query).all()
+    items = [dict(zip(fields, row)) for row in rows[:limit]]
+    next_cursor = items[-1]["id"] if len(rows) > limit else None
+    return CatalogEntry.of(orjson.dumps({"items": items, "next_cursor": next_cursor}))
+
+
+_catalog: Optional[TaskCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_task_catalog() -> TaskCatalog:
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            url = read_engine.url
+            db_path = url.database if url.get_backend_name() == "sqlite" else None
+            _catalog = TaskCatalog(ReadSessionLocal, db_path)
+        return _catalog
@@ -0,0 +1,257 @@
+"""
+Request timing, per-request database accounting, saturation gauges and
+on-demand profiling.
+
+RequestMetricsMiddleware times every HTTP request into histograms labelled
+by route template and task id, and counts the SQL statements the request ran
+(SQLAlchemy cursor events on both engines, attributed through a context
+variable that threadpool routes inherit). The totals also go out in a
+Server-Timing header, so browser dev tools show them per request.
+
+ProfilingMiddleware is off unless PROFILING_ENABLED=1. Then a request sent
+with "X-Profile: 1" is profiled and answered with the profile report as
+text/plain instead of its normal body (its status is in X-Profile-Status).
+pyinstrument is used when installed (async-aware: only the profiled request
+is sampled); otherwise cProfile, which records everything the event loop
+thread runs meanwhile and none of the work handed to threadpools. One request
+is profiled at a time.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.agentic.concurrency import slot_usage
+from server.agentic.lint_session import get_lint_sessions
+from server.agentic.metrics import get_metrics, task_label
+from server.agentic.result_cache import get_result_cache
+from server.agentic.worker_pool import worker_pool_stats
+from server.backend.jobs import get_job_queue
+
+# Configuration (overridable through .env)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))  # cProfile report length
+
+PROFILE_HEADER = b"x-profile"
+
+_metrics = get_metrics()
+HTTP_REQUESTS = _metrics.counter(
+    "refactoai_http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+HTTP_SECONDS = _metrics.histogram(
+    "refactoai_http_request_duration_seconds", "Time from request to the last body byte",
+    ("method", "route", "task_id"))
+HTTP_IN_FLIGHT = _metrics.gauge("refactoai_http_requests_in_flight", "HTTP requests being served")
+HTTP_DB_QUERIES = _metrics.histogram(
+    "refactoai_http_db_queries", "SQL statements run per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+HTTP_DB_SECONDS = _metrics.histogram(
+    "refactoai_http_db_seconds", "Time in SQL statements per HTTP request", ("route",))
+DB_QUERY_SECONDS = _metrics.histogram(
+    "refactoai_db_query_seconds", "Duration of single SQL statements", ("engine",))
+DB_CONNECTIONS_IN_USE = _metrics.gauge(
+    "refactoai_db_connections_in_use", "Connections checked out of each SQLAlchemy pool", ("engine",))
+JOBS = _metrics.gauge("refactoai_jobs", "Background jobs by status", ("status",))
+JOB_OLDEST_QUEUED_SECONDS = _metrics.gauge(
+    "refactoai_job_oldest_queued_age_seconds", "Age of the oldest queued background job")
+SANDBOX_WORKERS = _metrics.gauge("refactoai_sandbox_workers", "Sandbox pool workers by state", ("state",))
+SLOTS = _metrics.gauge(
+    "refactoai_concurrency_slots", "Concurrency slots per resource class (limit, in_use, waiting)",
+    ("resource", "state"))
+CACHE_LOOKUPS = _metrics.counter(
+    "refactoai_result_cache_lookups_total", "Result cache lookups by outcome", ("outcome",))
+CACHE_ENTRIES = _metrics.gauge("refactoai_result_cache_memory_entries", "Entries in the in-memory result cache")
+LINT_SESSIONS = _metrics.gauge("refactoai_lint_sessions", "Live lint sessions held in memory")
+
+
+@dataclass
+class RequestStats:
+    """SQL work done on behalf of one HTTP request."""
+
+    db_queries: int = 0
+    db_seconds: float = 0.0
+
+    def server_timing(self, app_seconds: float) -> str:
+        return (f'app;dur={app_seconds * 1000:.1f}, '
+                f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"')
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+_engines: dict = {}
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Time every statement `engine` runs; idempotent."""
+    if engine in _engines.values():
+        return
+    _engines[name] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, _cursor, _statement, _parameters, _context, _executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, _cursor, _statement, _parameters, _context, _executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERY_SECONDS.observe(elapsed, engine=name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_seconds += elapsed
+
+
+def _route(scope: Scope) -> Tuple[str, str]:
+    """Route template ("unmatched" for 404s, to keep series bounded) and task id label."""
+    route = scope.get("route")
+    template = getattr(route, "path", None) or "unmatched"
+    return template, task_label(scope.get("path_params", {}).get("task_id"))
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI, so streamed responses are timed to their last byte."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing",
+                                                     stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            HTTP_IN_FLIGHT.dec()
+            route, task_id = _route(scope)
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method=method, route=route, status=status)
+            HTTP_SECONDS.observe(elapsed, method=method, route=route, task_id=task_id)
+            HTTP_DB_QUERIES.observe(stats.db_queries, route=route)
+            HTTP_DB_SECONDS.observe(stats.db_seconds, route=route)
+
+
+def collect_saturation() -> None:
+    """Copy queue, pool and cache state into their gauges (runs before each scrape)."""
+    for name, engine in _engines.items():
+        checkedout = getattr(engine.pool, "checkedout", None)
+        if checkedout is not None:
+            DB_CONNECTIONS_IN_USE.set(checkedout(), engine=name)
+
+    try:
+        queue = get_job_queue()
+    except RuntimeError:
+        queue = None  # not started (scripts, tests)
+    if queue is not None:
+        jobs = queue.store.metrics()
+        for status in ("queue_depth", "running", "done", "failed"):
+            JOBS.set(jobs[status], status="queued" if status == "queue_depth" else status)
+        JOB_OLDEST_QUEUED_SECONDS.set(jobs["oldest_queued_age_seconds"])
+
+    pool = worker_pool_stats()
+    if pool is not None:
+        SANDBOX_WORKERS.set(pool["idle"], state="idle")
+        SANDBOX_WORKERS.set(pool["busy"], state="busy")
+
+    for resource, usage in slot_usage().items():
+        for state, value in usage.items():
+            SLOTS.set(value, resource=resource, state=state)
+
+    cache = get_result_cache().stats()
+    CACHE_LOOKUPS.set(cache["memory_hits"], outcome="memory_hit")
+    CACHE_LOOKUPS.set(cache["disk_hits"], outcome="disk_hit")
+    CACHE_LOOKUPS.set(cache["misses"], outcome="miss")
+    CACHE_ENTRIES.set(cache["memory_entries"])
+    LINT_SESSIONS.set(len(get_lint_sessions()))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Profiling
+# ──────────────────────────────────────────────────────────────────────────────
+
+_profile_lock = threading.Lock()
+
+
+def _start_profiler() -> Tuple[str, Any]:
+    try:
+        from pyinstrument import Profiler  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return "cProfile", profiler
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    return "pyinstrument", profiler
+
+
+def _stop_profiler(kind: str, profiler: Any) -> str:
+    if kind == "pyinstrument":
+        profiler.stop()
+        return profiler.output_text(unicode=False, color=False)
+    profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """Answers "X-Profile: 1" requests with their profile (see module docstring)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not (PROFILING_ENABLED and scope["type"] == "http"
+                and dict(scope["headers"]).get(PROFILE_HEADER) == b"1"):
+            await self.app(scope, receive, send)
+            return
+        if not _profile_lock.acquire(blocking=False):
+            await PlainTextResponse("Another request is being profiled", status_code=409)(scope, receive, send)
+            return
+
+        status = None
+
+        async def discard(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        try:
+            kind, profiler = _start_profiler()
+            started = time.perf_counter()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                elapsed = time.perf_counter() - started
+                report = _stop_profiler(kind, profiler)
+        finally:
+            _profile_lock.release()
+        headers = {"X-Profile-Status": str(status), "X-Profiler": kind,
+                   "X-Profile-Duration-Ms": f"{elapsed * 1000:.1f}"}
+        await PlainTextResponse(report, headers=headers)(scope, receive, send)
@@ -0,0 +1,357 @@
+"""
+Background job subsystem for long-running checks.
+
+Jobs (run, lint, AI review) are persisted in a local SQLite table. Submitting
+returns a job id at once; a pool of worker threads claims queued jobs by
+priority, favouring users with the fewest running jobs, and stores results
+until they expire after JOB_RESULT_TTL_SECONDS.
+
+A claimed job holds a lease of JOB_LEASE_SECONDS that its queue renews while
+the job runs. A job whose lease ran out (its process crashed or was
+restarted mid-job) goes back to the queue, and fails once it has been
+claimed JOB_MAX_ATTEMPTS times, so a job that kills its worker cannot do so
+forever.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Configuration (overridable through .env)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL_SECONDS = 1.0
+JOB_PURGE_INTERVAL_SECONDS = 60.0
+
+
+def default_jobs_db_path() -> str:
+    """JOBS_DB_PATH, or jobs.db next to the main database."""
+    if os.getenv("JOBS_DB_PATH"):
+        return os.environ["JOBS_DB_PATH"]
+    db_path = os.getenv("DATABASE_PATH")
+    return str(Path(db_path).with_name("jobs.db")) if db_path else "jobs.db"
+
+
+JobHandler = Callable[[Dict[str, Any]], Any]
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_queue ON jobs (status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS ix_jobs_user_status ON jobs (user_id, status);
+CREATE INDEX IF NOT EXISTS ix_jobs_finished_at ON jobs (finished_at);
+"""
+
+# Columns added since the first jobs.db: name -> definition
+ADDED_COLUMNS = {
+    "lease_until": "REAL",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+}
+
+# Highest priority first; among equals, the user with the fewest running
+# jobs goes first so one user's burst cannot starve everyone else.
+CLAIM_SQL = """
+SELECT id FROM jobs AS j
+WHERE j.status = 'queued'
+ORDER BY
+    j.priority DESC,
+    (SELECT COUNT(*) FROM jobs AS r WHERE r.user_id = j.user_id AND r.status = 'running'),
+    j.created_at
+LIMIT 1
+"""
+
+
+class JobStore:
+    """SQLite persistence for jobs; each call uses its own short-lived connection."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_jobs_db_path()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, definition in ADDED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, kind: str, payload: Dict[str, Any], user_id: str, priority: int = 0) -> str:
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, user_id, priority, payload, status, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, user_id, priority, json.dumps(payload), QUEUED, time.time()),
+            )
+        return job_id
+
+    def claim(self, lease: float = JOB_LEASE_SECONDS) -> Optional[sqlite3.Row]:
+        """Atomically move the next queued job to running, leased for `lease` seconds, and return it."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(CLAIM_SQL).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                now = time.time()
+                job = conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, lease_until = ?, attempts = attempts + 1"
+                    " WHERE id = ? RETURNING *",
+                    (RUNNING, now, now + lease, row["id"]),
+                ).fetchone()
+                conn.execute("COMMIT")
+                return job
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def renew(self, job_ids: List[str], lease: float = JOB_LEASE_SECONDS) -> None:
+        """Extend the leases of running jobs (their queue's heartbeat)."""
+        if not job_ids:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET lease_until = ? WHERE status = ? AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time() + lease, RUNNING, *job_ids),
+            )
+
+    def recover_expired(self, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """
+        Requeue running jobs whose lease ran out (rows from before leases
+        count as expired); those already claimed `max_attempts` times fail.
+        Returns how many jobs were recovered.
+        """
+        now = time.time()
+        expired = "status = ? AND (lease_until IS NULL OR lease_until < ?)"
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                failed = conn.execute(
+                    f"UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL"
+                    f" WHERE {expired} AND attempts >= ?",
+                    (FAILED, "Job was interrupted too many times", now, RUNNING, now, max_attempts),
+                ).rowcount
+                requeued = conn.execute(
+                    f"UPDATE jobs SET status = ?, started_at = NULL, lease_until = NULL WHERE {expired}",
+                    (QUEUED, RUNNING, now),
+                ).rowcount
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return failed + requeued
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None,
+               attempt: Optional[int] = None) -> None:
+        """Store a job's outcome; with `attempt`, only if the job was not reclaimed since."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL"
+                " WHERE id = ? AND (? IS NULL OR (status = ? AND attempts = ?))",
+                (FAILED if error else DONE, json.dumps(result), error, time.time(), job_id,
+                 attempt, RUNNING, attempt),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "priority": row["priority"],
+            "attempts": row["attempts"],
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+
+    def purge_expired(self, ttl: float = JOB_RESULT_TTL_SECONDS) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (*FINISHED, time.time() - ttl),
+            )
+            return cursor.rowcount
+
+    def metrics(self, window: int = 1000) -> Dict[str, Any]:
+        """Queue depth per status plus wait-time stats over the last started jobs."""
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            waits: List[float] = sorted(
+                row[0] for row in conn.execute(
+                    "SELECT started_at - created_at FROM jobs WHERE started_at IS NOT NULL"
+                    " ORDER BY started_at DESC LIMIT ?",
+                    (window,),
+                )
+            )
+            (oldest,) = conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()
+
+        def pct(p: float) -> Optional[float]:
+            return waits[min(len(waits) - 1, int(p * len(waits)))] if waits else None
+
+        return {
+            "queue_depth": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0),
+            "oldest_queued_age_seconds": time.time() - oldest if oldest else 0.0,
+            "wait_seconds": {
+                "mean": sum(waits) / len(waits) if waits else None,
+                "p50": pct(0.50),
+                "p95": pct(0.95),
+                "max": waits[-1] if waits else None,
+            },
+        }
+
+
+class JobQueue:
+    """
+    Worker threads that execute jobs from a JobStore.
+
+    Args:
+        store: Where jobs are persisted.
+        handlers: Job kind -> callable taking the payload and returning a JSON-able result.
+        workers: Number of worker threads.
+        lease: Seconds a claimed job stays leased between heartbeats.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, JobHandler], workers: int = JOB_WORKERS,
+                 lease: float = JOB_LEASE_SECONDS):
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.lease = lease
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[str, int] = {}  # job id -> attempt, for the heartbeat
+        self._running_lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def start(self) -> "JobQueue":
+        # Jobs left running by a crashed or restarted process go back to the queue
+        self.store.recover_expired()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, kind: str, payload: Dict[str, Any], user_id: str, priority: int = 0) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = self.store.submit(kind, payload, user_id, priority)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            self._maybe_purge()
+            job = self.store.claim(self.lease)
+            if job is None:
+                # Also polls, so jobs submitted by other processes get picked up
+                with self._wakeup:
+                    self._wakeup.wait(JOB_POLL_INTERVAL_SECONDS)
+                continue
+            with self._running_lock:
+                self._running[job["id"]] = job["attempts"]
+            try:
+                result = self.handlers[job["kind"]](json.loads(job["payload"]))
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self.store.finish(job["id"], error=f"{type(e).__name__}: {e}", attempt=job["attempts"])
+            else:
+                self.store.finish(job["id"], result=result, attempt=job["attempts"])
+            finally:
+                with self._running_lock:
+                    self._running.pop(job["id"], None)
+
+    def _heartbeat(self) -> None:
+        while not self._stopping.wait(self.lease / 3):
+            with self._running_lock:
+                job_ids = list(self._running)
+            try:
+                self.store.renew(job_ids, self.lease)
+            except sqlite3.Error:
+                pass  # retried on the next beat; the lease outlasts two missed beats
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge >= JOB_PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            self.store.purge_expired()
+            self.store.recover_expired()
+
+
+_queue: Optional[JobQueue] = None
+
+
+def start_job_queue(handlers: Dict[str, JobHandler]) -> JobQueue:
+    """Create the process-wide queue and start its workers (app lifespan)."""
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(JobStore(), handlers).start()
+    return _queue
+
+
+def get_job_queue() -> JobQueue:
+    if _queue is None:
+        raise RuntimeError("Job queue is not running; start_job_queue() runs in the app lifespan")
+    return _queue
+
+
+def stop_job_queue() -> None:
+    global _queue
+    if _queue is not None:
+        _queue.stop()
+        _queue = None
@@ -0,0 +1,88 @@
+"""
+Fixed-window rate limit for the LLM-backed routes.
+
+Each client address may start RATE_LIMIT_LLM_PER_MINUTE AI reviews and chat
+replies per minute, and so may each X-Session-Id; a request counts against
+both and further requests get 429 with Retry-After until the stricter window
+ends. The session header is chosen by the client, so it can only tighten the
+limit: fresh session ids do not buy an address more requests. Behind a
+reverse proxy, run uvicorn with --forwarded-allow-ips so the address is the
+client's. With SHARED_STATE_PATH set the counters live in the SharedStore,
+so the limit holds for the whole deployment instead of once per worker.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import Header, HTTPException, Request
+
+from server.agentic.shared_state import SharedStore, get_shared_store
+
+# Configuration (overridable through .env)
+RATE_LIMIT_LLM_PER_MINUTE = int(os.getenv("RATE_LIMIT_LLM_PER_MINUTE", "0"))  # 0 = unlimited
+
+
+class RateLimiter:
+    """
+    Counts hits per client in fixed windows.
+
+    Args:
+        name: Prefix of the counter keys, so limiters can share a store.
+        limit: Hits allowed per window; 0 disables the limiter.
+        window_seconds: Window length.
+        store: Shared counters, or None to count in this process.
+    """
+
+    def __init__(self, name: str, limit: int, window_seconds: float = 60.0, store: Optional[SharedStore] = None):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.store = store
+        self._counts: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, client: str) -> Optional[float]:
+        """Count a hit; returns None if it is allowed, else the seconds until the window ends."""
+        if self.limit <= 0:
+            return None
+        now = time.time()
+        window_end = (now // self.window_seconds + 1) * self.window_seconds
+        key = f"{self.name}:{client}"
+        if self.store is not None:
+            count = self.store.hit(key, window_end)
+        else:
+            with self._lock:
+                if len(self._counts) > 10_000:
+                    self._counts = {k: v for k, v in self._counts.items() if v[0] > now}
+                end, count = self._counts.get(key, (window_end, 0))
+                count = count + 1 if end == window_end else 1
+                self._counts[key] = (window_end, count)
+        return None if count <= self.limit else window_end - now
+
+
+_llm_limiter: Optional[RateLimiter] = None
+_llm_limiter_lock = threading.Lock()
+
+
+def get_llm_rate_limiter() -> RateLimiter:
+    global _llm_limiter
+    with _llm_limiter_lock:
+        if _llm_limiter is None:
+            _llm_limiter = RateLimiter("llm", RATE_LIMIT_LLM_PER_MINUTE, store=get_shared_store())
+        return _llm_limiter
+
+
+def llm_rate_limit(request: Request, x_session_id: str | None = Header(default=None, max_length=128)) -> None:
+    """Route dependency: 429 once the client's address or session used up its LLM requests for this minute."""
+    limiter = get_llm_rate_limiter()
+    clients = [f"addr:{request.client.host if request.client else 'unknown'}"]
+    if x_session_id:
+        clients.append(f"session:{x_session_id}")
+    waits = [wait for wait in (limiter.hit(client) for client in clients) if wait is not None]
+    if waits:
+        retry_after = max(waits)
+        raise HTTPException(status_code=429, detail="Too many AI requests; try again later",
+                            headers={"Retry-After": str(max(1, round(retry_after)))})
@@ -0,0 +1,136 @@
+# server/backend/routers/jobs.py
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from server.agentic.main import Assistant_agent, task_problem
+from server.agentic.tools import CodeChecker, ScriptRunner
+from server.backend.jobs import FINISHED, get_job_queue
+from server.backend.routers.routes import load_task, session_id_header
+from server.backend.sse import SSE_HEADERS, format_sse, sse_comment
+from server.database import db_models as models
+
+router = APIRouter(tags=["jobs"])
+
+SSE_POLL_INTERVAL_SECONDS = 0.25
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Job handlers (run on the queue's worker threads)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def run_job(payload: Dict[str, Any]) -> str:
+    return ScriptRunner.run_python_code(payload["code"], task_id=payload["task_id"])
+
+
+def lint_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return CodeChecker.lint_code(payload["code"], payload["task_id"]).to_dict()
+
+
+def ai_review_job(payload: Dict[str, Any]) -> Any:
+    task = load_task(payload["task_id"])
+    code = payload["code"]
+    problem = task_problem(task)
+    pylint_report = CodeChecker.check_code_with_pylint(code, task.id)
+    agent = Assistant_agent(session_id=payload.get("session_id"))
+    response = agent.run(problem, pylint_report, task.correct_code, code, task.id, task.prompt_prefix)
+    return json.loads(response)
+
+
+JOB_HANDLERS = {
+    "run": run_job,
+    "lint": lint_job,
+    "ai_review": ai_review_job,
+}
+
+# Set by the server, not the client: quick checks before slow AI reviews
+JOB_PRIORITIES = {
+    "run": 2,
+    "lint": 1,
+    "ai_review": 0,
+}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Schemas
+# ──────────────────────────────────────────────────────────────────────────────
+
+class JobSubmit(BaseModel):
+    kind: Literal["run", "lint", "ai_review"]
+    lines: List[str]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Job endpoints
+# ──────────────────────────────────────────────────────────────────────────────
+
+@router.post("/tasks/{task_id}/jobs", status_code=202)
+def submit_job(
+    task_id: int,
+    payload: JobSubmit,
+    request: Request,
+    task: models.Task = Depends(load_task),
+    session_id: str | None = Depends(session_id_header),
+):
+    """
+    Queue a run/lint/AI-review job and return its id immediately. Its
+    priority follows from its kind, and fairness is per client address.
+    """
+    user_id = request.client.host if request.client else "anonymous"
+    job_id = get_job_queue().submit(
+        payload.kind,
+        {"task_id": task_id, "code": "\n".join(payload.lines), "session_id": session_id},
+        user_id=user_id,
+        priority=JOB_PRIORITIES[payload.kind],
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/jobs/metrics")
+def job_metrics():
+    """Queue depth and wait-time statistics."""
+    return get_job_queue().store.metrics()
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Poll a job; the result is present once status is done/failed."""
+    job = get_job_queue().store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """Subscribe to a job over SSE: status events, then one result event."""
+    store = get_job_queue().store
+    if await asyncio.to_thread(store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_status, last_sent = None, time.monotonic()
+        while True:
+            job = await asyncio.to_thread(store.get, job_id)
+            if job is None:
+                yield format_sse("error", {"detail": "Job expired"})
+                return
+            if job["status"] != last_status:
+                last_status, last_sent = job["status"], time.monotonic()
+                yield format_sse("status", {"job_id": job_id, "status": last_status})
+            if job["status"] in FINISHED:
+                yield format_sse("result", job)
+                return
+            if time.monotonic() - last_sent >= SSE_KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield sse_comment()
+            await asyncio.sleep(SSE_POLL_INTERVAL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -2,17 +2,31 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
-
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Literal, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import orjson
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from server.database.db import get_db, engine  # central engine + session dependency
+from server.database.db import get_read_db, ReadSessionLocal  # central engines + session dependency
 from server.database import db_models as models
-
-# Create tables on startup (safe in dev; for prod use Alembic migrations)
-models.Base.metadata.create_all(bind=engine)
+from server.database.task_pack import get_task_pack
+from server.database.task_search import DEFAULT_SEARCH_LIMIT, search_tasks
+from server.backend.catalog import (
+    CATALOG_FIELDS,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    CatalogEntry,
+    TaskCatalog,
+    get_task_catalog,
+    task_page,
+)
 
 router = APIRouter(tags=["tasks"])
 
@@ -30,10 +44,34 @@ class TaskOut(BaseModel):
         from_attributes = True  # Pydantic v2 ORM mode
 
 
+class TaskPage(BaseModel):
+    items: List[Dict[str, Any]]  # TaskOut, restricted to the requested fields
+    next_cursor: int | None = None
+
+
+class TaskSearchHit(BaseModel):
+    id: int
+    name: str
+    topic: str
+    name_highlight: str  # HTML-escaped, matches in <mark>
+    snippet: str  # description excerpt, same markup
+    score: float  # BM25, lower is better
+
+
+class TaskSearchPage(BaseModel):
+    items: List[TaskSearchHit]
+    next_offset: int | None = None
+
+
 class MultilineData(BaseModel):
     lines: List[str]
 
 
+class LiveLintData(BaseModel):
+    lines: List[str]
+    version: int = 0  # the editor's edit counter, echoed back
+
+
 class ChatPayload(BaseModel):
     # keep it flexible; you can tighten later to your exact chat format
     messages: List[Dict[str, Any]] | None = None
@@ -44,92 +82,376 @@ class ChatPayload(BaseModel):
 # Task endpoints
 # ──────────────────────────────────────────────────────────────────────────────
 
-@router.get("/tasks", response_model=List[TaskOut])
-def list_tasks(db: Session = Depends(get_db)) -> List[models.Task]:
-    """Return all tasks (id, name, topic, description)."""
-    return db.query(models.Task).all()
+# Full listings are served from the in-memory catalog as pre-serialized JSON;
+# paged ones (any of limit/cursor/fields) by a keyset query selecting only the
+# requested columns. response_model only documents the shape. Clients
+# revalidate with If-None-Match and get 304s.
+
+async def task_catalog() -> TaskCatalog:
+    """The catalog, reloaded first (off the event loop) if the database changed."""
+    catalog = get_task_catalog()
+    if catalog.is_stale():
+        await run_in_threadpool(catalog.load)
+    return catalog
+
+
+def page_query(
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(default=None, ge=0, description="next_cursor of the previous page"),
+    fields: str | None = Query(default=None, description="Comma-separated subset of id,name,topic,description"),
+) -> Dict[str, Any] | None:
+    """Paging parameters, or None when none were given (the full list is wanted)."""
+    if limit is None and cursor is None and fields is None:
+        return None
+    requested = {name.strip() for name in (fields or "").split(",") if name.strip()} or set(CATALOG_FIELDS)
+    unknown = requested - set(CATALOG_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return {
+        "fields": [name for name in CATALOG_FIELDS if name in requested or name == "id"],  # id is the cursor
+        "limit": limit or DEFAULT_PAGE_SIZE,
+        "cursor": cursor,
+    }
+
+
+def _load_page(page: Dict[str, Any], topic: str | None = None) -> CatalogEntry:
+    with ReadSessionLocal() as db:
+        return task_page(db, topic=topic, **page)
+
+
+def _catalog_response(entry: CatalogEntry, request: Request) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if entry.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@router.get("/tasks", response_model=List[TaskOut] | TaskPage)
+async def list_tasks(request: Request, page: Dict[str, Any] | None = Depends(page_query)) -> Response:
+    """Return all tasks (id, name, topic, description), or one TaskPage when paging."""
+    if page is None:
+        return _catalog_response((await task_catalog()).all(), request)
+    return _catalog_response(await run_in_threadpool(_load_page, page), request)
+
+
+def _search(q: str, limit: int, offset: int, topic: str | None) -> CatalogEntry:
+    with ReadSessionLocal() as db:
+        return CatalogEntry.of(orjson.dumps(search_tasks(db, q, limit, offset, topic)))
+
+
+# Declared before /tasks/{task_id}, which would otherwise claim the path
+@router.get("/tasks/search", response_model=TaskSearchPage)
+async def search_task_list(
+    request: Request,
+    q: str = Query(min_length=1, max_length=200, description="Words to find in name, topic or description"),
+    topic: str | None = Query(default=None, description="Only tasks with this exact topic"),
+    limit: int = Query(default=DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(default=0, ge=0, le=10_000, description="next_offset of the previous page"),
+) -> Response:
+    """Full-text search over tasks, best match first (every word must match as a prefix)."""
+    return _catalog_response(await run_in_threadpool(_search, q, limit, offset, topic), request)
 
 
 @router.get("/tasks/{task_id}", response_model=TaskOut)
-def get_task(task_id: int, db: Session = Depends(get_db)) -> models.Task:
+async def get_task(task_id: int, request: Request, catalog: TaskCatalog = Depends(task_catalog)) -> Response:
     """Return one task by id or 404."""
-    task = db.get(models.Task, task_id)
-    if not task:
+    entry = catalog.task(task_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return task
+    return _catalog_response(entry, request)
 
 
-@router.get("/tasks/topic/{topic}", response_model=List[TaskOut])
-def get_tasks_by_topic(topic: str, db: Session = Depends(get_db)) -> List[models.Task]:
-    """Return tasks filtered by topic."""
-    return db.query(models.Task).filter(models.Task.topic == topic).all()
+@router.get("/tasks/topic/{topic}", response_model=List[TaskOut] | TaskPage)
+async def get_tasks_by_topic(topic: str, request: Request,
+                             page: Dict[str, Any] | None = Depends(page_query)) -> Response:
+    """Return tasks filtered by topic, or one TaskPage when paging."""
+    if page is None:
+        return _catalog_response((await task_catalog()).topic(topic), request)
+    return _catalog_response(await run_in_threadpool(_load_page, page, topic), request)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Code execution / quality checks
-# (Uncomment real tool imports when those modules are in place)
+# (async: slow runs, lint jobs and LLM calls must not starve the threadpool)
 # ──────────────────────────────────────────────────────────────────────────────
 
-# from server.agentic.tools import ScriptRunner, CodeChecker
-# from server.agentic.main import Assistant_agent
+from server.agentic.concurrency import thread_slots
+from server.agentic.tools import AsyncScriptRunner, AsyncCodeChecker
+from server.agentic.batch_grader import BATCH_GRADE_MAX_BYTES, BatchGrader, BatchInputError, parse_submissions
+from server.agentic.grader import (
+    COMPARE_RULES,
+    DEFAULT_FLOAT_TOLERANCE,
+    TestCase,
+    TestCaseGrader,
+    load_test_cases,
+    pack_test_cases,
+)
+from server.agentic.lint_session import get_lint_sessions
+from server.agentic.main import Assistant_agent, task_problem
+from server.backend.rate_limit import llm_rate_limit
+from server.backend.sse import SSE_HEADERS, format_sse
+
+logger = logging.getLogger(__name__)
+
+
+def load_task(task_id: int) -> models.Task:
+    """
+    Task lookup for the async routes. Runs in the threadpool and returns the
+    connection to the pool before the handler awaits slow tools; holding a
+    session across those awaits exhausts the pool and stalls the event loop.
+    Tasks in the TASK_PACK_PATH pack are decoded from it without a query,
+    unless the pack predates recorded prompt prefixes; get_task_pack() drops
+    a pack the database was rewritten since.
+    """
+    pack = get_task_pack()
+    task = pack.task_model(task_id) if pack is not None else None
+    if task is not None and task.prompt_prefix is not None:
+        return task
+    with ReadSessionLocal() as db:
+        task = db.get(models.Task, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        db.expunge(task)
+        return task
+
+
+def session_id_header(x_session_id: str | None = Header(default=None, max_length=128)) -> str | None:
+    """Optional X-Session-Id; reviews sharing one continue the same conversation."""
+    return x_session_id
+
+
+def _new_agent(session_id: str | None = None) -> Assistant_agent:
+    try:
+        return Assistant_agent(session_id=session_id)
+    except ValueError as e:  # missing OPENAI_API_KEY
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def _wants_event_stream(request: Request) -> bool:
+    return "text/event-stream" in request.headers.get("accept", "")
+
+
+def _stream_llm(events: AsyncIterator[Tuple[str, Any]], started: float, route: str) -> StreamingResponse:
+    """
+    Forward (event, data) pairs from an agent stream as SSE. A closing "done"
+    event reports time-to-first-token and total time, measured from when the
+    request reached the handler; both are logged as well.
+    """
+    async def body():
+        first_token = None
+        tokens = 0
+        try:
+            async for event, data in events:
+                if event == "token":
+                    tokens += 1
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                yield format_sse(event, data)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Headers are already sent, so the failure has to travel in-band
+            yield format_sse("error", {"detail": f"{type(e).__name__}: {e}"})
+            return
+        finished = time.perf_counter()
+        timing = {
+            "ttfb_ms": round((first_token - started) * 1000, 1) if first_token else None,
+            "total_ms": round((finished - started) * 1000, 1),
+            "tokens": tokens,
+        }
+        logger.info("%s stream: ttfb=%s ms total=%s ms tokens=%d",
+                    route, timing["ttfb_ms"], timing["total_ms"], tokens)
+        yield format_sse("done", timing)
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers=SSE_HEADERS)
 
-@router.post("/tasks/{task_id}/run")
-def run_code_by_task_id(task_id: int, payload: MultilineData, db: Session = Depends(get_db)):
-    """Execute user code for a given task (dev stub; wire to ScriptRunner)."""
-    task = db.get(models.Task, task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
 
+@router.post("/tasks/{task_id}/run")
+async def run_code_by_task_id(task_id: int, payload: MultilineData, task: models.Task = Depends(load_task)):
+    """Execute user code for a given task on the pre-warmed worker pool."""
     code = "\n".join(payload.lines)
-    # result = ScriptRunner.run_python_code(code)
-    result = {"echo": code}  # stub so the API runs even if agentic tools aren’t ready
-    return {"result": result}
+    result = await AsyncScriptRunner.run_code(code, task_id=task_id)
+    return {"result": result.output, "usage": result.usage}
 
 
-@router.post("/tasks/{task_id}/manual_quality_checker")
-def manual_quality_checker(task_id: int, payload: MultilineData, db: Session = Depends(get_db)):
-    """Static analysis of code (dev stub; wire to CodeChecker)."""
+def task_test_cases(db: Session, task_id: int) -> Tuple[List[TestCase], str]:
+    """A task's test cases and correct_code, from the task pack (while current) or the database."""
+    pack = get_task_pack()
+    record = pack.task(task_id) if pack is not None else None
+    if record is not None:
+        return pack_test_cases(record), record["correct_code"]
     task = db.get(models.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    return load_test_cases(db, task_id), task.correct_code
+
+
+@router.post("/tasks/{task_id}/grade")
+def grade_by_task_id(
+    task_id: int,
+    payload: MultilineData,
+    stop_on_first_failure: bool = False,
+    reference: bool = Query(default=False, description="Compare against the output of the task's correct_code"),
+    compare: Literal[COMPARE_RULES] = "exact",
+    tolerance: float = Query(default=DEFAULT_FLOAT_TOLERANCE, ge=0, description="For compare=float"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Run user code against all of the task's test cases in one sandbox worker,
+    checking its output against the stored outputs or, with reference=true,
+    against the task's correct_code (cached per case). Takes a "run" slot,
+    like /run and batch grading.
+    """
+    cases, correct_code = task_test_cases(db, task_id)
+    code = "\n".join(payload.lines)
+    with thread_slots("run"):
+        if reference:
+            result = TestCaseGrader.grade_against_reference(
+                code, task_id, correct_code, cases, stop_on_first_failure, compare=compare, tolerance=tolerance,
+            )
+        else:
+            result = TestCaseGrader.grade(code, cases, stop_on_first_failure, compare=compare, tolerance=tolerance)
+    return {"result": result.to_dict()}
+
+
+def _load_test_cases(task_id: int) -> Tuple[List[TestCase], str]:
+    with ReadSessionLocal() as db:
+        return task_test_cases(db, task_id)
+
+
+async def _read_upload(request: Request, limit: int) -> bytes:
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail=f"Upload larger than {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@router.post("/tasks/{task_id}/batch_grade")
+async def batch_grade(
+    task_id: int,
+    request: Request,
+    stop_on_first_failure: bool = False,
+    reference: bool = Query(default=False, description="Compare against the output of the task's correct_code"),
+    compare: Literal[COMPARE_RULES] = "exact",
+    tolerance: float = Query(default=DEFAULT_FLOAT_TOLERANCE, ge=0, description="For compare=float"),
+    lint: bool = Query(default=True, description="Also lint every submission"),
+):
+    """
+    Grade many submissions to one task; results stream back as NDJSON in
+    completion order, one line per submission ({"index", "id", "digest",
+    "duplicate_of", "result", "lint"} or "error"), then a {"done": true}
+    summary line. The body is a JSON list of {"id", "lines"} or {"id",
+    "code"} objects, or the same as JSONL (Content-Type
+    application/x-ndjson), optionally zstd-compressed. Identical
+    submissions are graded once.
+    """
+    body = await _read_upload(request, BATCH_GRADE_MAX_BYTES)
+    content_type = request.headers.get("content-type", "")
+    jsonl = "ndjson" in content_type or "jsonl" in content_type
+    try:
+        submissions = await run_in_threadpool(parse_submissions, body, jsonl)
+    except BatchInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cases, correct_code = await run_in_threadpool(_load_test_cases, task_id)
+
+    grader = BatchGrader(task_id, cases, correct_code, reference=reference, lint=lint,
+                         stop_on_first_failure=stop_on_first_failure, compare=compare, tolerance=tolerance)
+
+    async def lines():
+        async for record in grader.stream(submissions):
+            yield orjson.dumps(record) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 
+@router.post("/tasks/{task_id}/manual_quality_checker")
+async def manual_quality_checker(task_id: int, payload: MultilineData, task: models.Task = Depends(load_task)):
+    """Static analysis of code with the resident Pylint engine."""
     code = "\n".join(payload.lines)
-    # report = CodeChecker.check_code_with_pylint(code)
-    report = {"pylint": "stubbed report"}  # stub
+    report = (await AsyncCodeChecker.lint_code(code, task_id)).to_dict()
     return {"result": report}
 
 
-@router.post("/tasks/{task_id}/ai_checker")
-def ai_checker(task_id: int, payload: MultilineData, db: Session = Depends(get_db)):
-    """LLM-based code review against the task’s spec and reference solution (dev stub)."""
-    task = db.get(models.Task, task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
+@router.post("/tasks/{task_id}/lint/live")
+async def live_lint(
+    task_id: int,
+    payload: LiveLintData,
+    session_id: str | None = Depends(session_id_header),
+    task: models.Task = Depends(load_task),
+):
+    """
+    Lint-on-keystroke for the editor. Per X-Session-Id, only the functions
+    edited since the last call are relinted, edits are debounced, and a call
+    overtaken by a newer edit returns {"superseded": true} in its result.
+    """
+    if not session_id:
+        raise HTTPException(status_code=400, detail="X-Session-Id header is required")
+    session = get_lint_sessions().get(f"{session_id}:{task_id}")
+    result = await session.lint("\n".join(payload.lines))
+    return {"version": payload.version, "result": result}
+
+
+@router.post("/tasks/{task_id}/ai_checker", dependencies=[Depends(llm_rate_limit)])
+async def ai_checker(
+    task_id: int,
+    payload: MultilineData,
+    task: models.Task = Depends(load_task),
+    session_id: str | None = Depends(session_id_header),
+):
+    """LLM-based code review against the task’s spec and reference solution."""
     code = "\n".join(payload.lines)
-    problem = f"{task.name}\n{task.description}"
-
-    # pylint_report = CodeChecker.check_code_with_pylint(code)
-    # agent = Assistant_agent()
-    # response = agent.run(problem, pylint_report, task.correct_code, code)
-    response = {
-        "problem": problem,
-        "reference_present": bool(task.correct_code),
-        "analysis": "stubbed ai response",
-    }
-    return {"result": response}
+    problem = task_problem(task)
+
+    pylint_report = await AsyncCodeChecker.check_code_with_pylint(code, task_id)
+    agent = _new_agent(session_id)
+    response = await agent.arun(problem, pylint_report, task.correct_code, code, task_id, task.prompt_prefix)
+    return {"result": response, "usage": agent.last_usage}
+
+
+@router.post("/tasks/{task_id}/ai_checker/stream", dependencies=[Depends(llm_rate_limit)])
+async def ai_checker_stream(
+    task_id: int,
+    payload: MultilineData,
+    task: models.Task = Depends(load_task),
+    session_id: str | None = Depends(session_id_header),
+):
+    """
+    Streaming AI review over SSE: "status" events report the stage ("linting",
+    then "reviewing"), "token" events carry raw model output, one "result"
+    event carries the validated JSON review, "done" the timings. The first
+    status goes out before the lint, so the client sees bytes at once.
+    """
+    started = time.perf_counter()
+    code = "\n".join(payload.lines)
+    problem = task_problem(task)
+    agent = _new_agent(session_id)
+
+    async def events():
+        yield "status", {"status": "linting"}
+        pylint_report = await AsyncCodeChecker.check_code_with_pylint(code, task_id)
+        yield "status", {"status": "reviewing"}
+        review = agent.astream_run(problem, pylint_report, task.correct_code, code, task_id, task.prompt_prefix)
+        async with aclosing(review) as review_events:
+            async for event in review_events:
+                yield event
+
+    return _stream_llm(events(), started, "ai_checker")
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Chat endpoint
 # ──────────────────────────────────────────────────────────────────────────────
 
-@router.post("/chat")
-def chat(payload: ChatPayload):
-    """Generic chat endpoint (dev stub; wire to Assistant_agent)."""
-    # agent = Assistant_agent()
-    # return agent.invoke_llm_for_chat(payload.model_dump())
-    return {
-        "echo": payload.model_dump(),
-        "note": "wire to Assistant_agent.invoke_llm_for_chat when ready",
-    }
+@router.post("/chat", dependencies=[Depends(llm_rate_limit)])
+async def chat(payload: ChatPayload, request: Request):
+    """
+    Generic chat endpoint backed by Assistant_agent. Clients that send
+    `Accept: text/event-stream` get the reply streamed as "token" events.
+    """
+    started = time.perf_counter()
+    agent = _new_agent()
+    if _wants_event_stream(request):
+        tokens = (("token", text) async for text in agent.astream_chat(payload.model_dump()))
+        return _stream_llm(tokens, started, "chat")
+    return await agent.ainvoke_llm_for_chat(payload.model_dump())
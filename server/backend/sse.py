@@ -0,0 +1,22 @@
+"""Server-Sent Events helpers."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # stop nginx from buffering the stream
+}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one SSE frame; non-string data is sent as JSON."""
+    payload = data if isinstance(data, str) else json.dumps(data)
+    lines = "".join(f"data: {line}\n" for line in payload.split("\n"))
+    return f"event: {event}\n{lines}\n"
+
+
+def sse_comment(text: str = "keep-alive") -> str:
+    """A comment frame; keeps idle connections open through proxies."""
+    return f": {text}\n\n"
@@ -1,10 +1,10 @@
 # server/database/db_models.py
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
-load_dotenv()
+# .env is loaded by the entry point (server/main.py, the scripts) before this
+# module reads its configuration. Importing it connects to nothing.
 
 # 1) Prefer absolute DATABASE_PATH if available; fallback to DATABASE_URL.
 db_path = os.getenv("DATABASE_PATH")
@@ -18,24 +18,107 @@ elif db_url:
 else:
     raise RuntimeError("Neither DATABASE_PATH nor DATABASE_URL is set in .env")
 
-# 2) SQLite specific connect arg (safe for others to leave empty)
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# 2) SQLite storage profile: PRAGMAs applied to every new connection.
+#    Pick one with DB_STORAGE_PROFILE; override single values with SQLITE_<PRAGMA>,
+#    e.g. SQLITE_MMAP_SIZE=0.
+STORAGE_PROFILES = {
+    # WAL: readers never block the writer or each other; NORMAL fsync is safe
+    # against crashes in WAL mode (only a power cut can lose the last commits)
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -16000,  # KiB per connection
+        "busy_timeout": 5000,  # ms to wait for a lock instead of "database is locked"
+        "foreign_keys": "ON",
+        "temp_store": "MEMORY",
+    },
+    # Same, but every commit is fsynced
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "busy_timeout": 5000,
+        "foreign_keys": "ON",
+    },
+    # Driver defaults (rollback journal) and one shared pool, as before
+    "legacy": {},
+}
+DB_STORAGE_PROFILE = os.getenv("DB_STORAGE_PROFILE", "production")
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+
+if DB_STORAGE_PROFILE not in STORAGE_PROFILES:
+    raise RuntimeError(f"Unknown DB_STORAGE_PROFILE {DB_STORAGE_PROFILE!r}; use one of {', '.join(STORAGE_PROFILES)}")
+
+PRAGMAS = {
+    name: os.getenv(f"SQLITE_{name.upper()}", value)
+    for name, value in STORAGE_PROFILES[DB_STORAGE_PROFILE].items()
+}
+
+# 3) SQLite specific connect arg (safe for others to leave empty)
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+
+# 4) Engines. With a SQLite profile, mutations go through a single pooled
+#    writer connection (BEGIN IMMEDIATE, so lock waits happen up front under
+#    busy_timeout) and GET routes use a separate pool of query-only readers.
+#    Every transaction on the writer holds the write lock, so anything that
+#    only reads (start-up checks, catalog loads, exports) uses the readers.
+SPLIT_POOLS = IS_SQLITE and bool(PRAGMAS)
 
-# 3) Create engine (THIS was missing in your snippet)
 engine = create_engine(
     DATABASE_URL,
     echo=False,
     future=True,
     connect_args=connect_args,
+    **({"pool_size": 1, "max_overflow": 0, "pool_timeout": 30} if SPLIT_POOLS else {}),
 )
 
+read_engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    future=True,
+    connect_args=connect_args,
+    pool_size=DB_READ_POOL_SIZE,
+    max_overflow=DB_READ_POOL_SIZE,
+) if SPLIT_POOLS else engine
+
+
+def _apply_pragmas(dbapi_connection, read_only: bool) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in PRAGMAS.items():
+        if name == "journal_mode" and read_only:
+            continue  # persistent in the file; the writer sets it
+        cursor.execute(f"PRAGMA {name} = {value}")
+    if read_only:
+        cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
+if SPLIT_POOLS:
+    @event.listens_for(engine, "connect")
+    def _on_writer_connect(dbapi_connection, _record):
+        dbapi_connection.isolation_level = None  # SQLAlchemy's "begin" event issues BEGIN
+        _apply_pragmas(dbapi_connection, read_only=False)
+
+    @event.listens_for(engine, "begin")
+    def _on_writer_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    @event.listens_for(read_engine, "connect")
+    def _on_reader_connect(dbapi_connection, _record):
+        _apply_pragmas(dbapi_connection, read_only=True)
+
+
 class Base(DeclarativeBase):
     pass
 
-# 4) Session factory
+# 5) Session factories: SessionLocal for mutations, ReadSessionLocal for reads
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
 
-# 5) FastAPI dependency
+# 6) FastAPI dependencies
 def get_db():
     db = SessionLocal()
     try:
@@ -43,5 +126,10 @@ def get_db():
     finally:
         db.close()
 
-# Optional: quick sanity print on startup to confirm path
-print("▶ Using DB URL:", DATABASE_URL)
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -8,6 +8,8 @@ from sqlalchemy import (
     Boolean,
     Integer,
     ForeignKey,
+    Index,
+    text,
 )
 from sqlalchemy.orm import (
     DeclarativeBase,
@@ -30,14 +32,22 @@ class Task(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(50), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=False)
-    topic: Mapped[str] = mapped_column(String(50), nullable=False)
+    topic: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
     correct_code: Mapped[str] = mapped_column(Text, nullable=False)
     messed_code: Mapped[str] = mapped_column(Text, nullable=False)
+    # Stable head of the AI-review prompt (see Assistant_agent.task_prefix); refreshed at startup
+    prompt_prefix: Mapped[str | None] = mapped_column(Text, nullable=True)
 
-    # ORM relationship
+    __table_args__ = (
+        # Tasks still waiting for their prefix, found without scanning the catalog
+        Index("ix_tasks_prompt_prefix_missing", "id", sqlite_where=text("prompt_prefix IS NULL")),
+    )
+
+    # ORM relationship (lazy; use server.database.loaders to fetch whole suites)
     input_outputs: Mapped[list["InputOutput"]] = relationship(
         back_populates="task",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="InputOutput.id",
     )
 
     def __repr__(self) -> str:
@@ -51,17 +61,19 @@ class InputOutput(Base):
     __tablename__ = "input_output"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    task_id: Mapped[int] = mapped_column(ForeignKey("tasks.id"), nullable=False)
+    task_id: Mapped[int] = mapped_column(ForeignKey("tasks.id"), nullable=False, index=True)
 
     # ORM relationships
     task: Mapped["Task"] = relationship(back_populates="input_outputs")
     inputs: Mapped[list["Input"]] = relationship(
         back_populates="input_output",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="Input.id",
     )
     outputs: Mapped[list["Output"]] = relationship(
         back_populates="input_output",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="Output.id",
     )
 
     def __repr__(self) -> str:
@@ -77,7 +89,7 @@ class Input(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     input: Mapped[str] = mapped_column(String(100), nullable=False)
     input_type: Mapped[str] = mapped_column(String(50), nullable=False)
-    input_output_id: Mapped[int] = mapped_column(ForeignKey("input_output.id"), nullable=False)
+    input_output_id: Mapped[int] = mapped_column(ForeignKey("input_output.id"), nullable=False, index=True)
 
     # ORM relationship
     input_output: Mapped["InputOutput"] = relationship(back_populates="inputs")
@@ -95,10 +107,23 @@ class Output(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     output: Mapped[str] = mapped_column(String(100), nullable=False)
     output_type: Mapped[str] = mapped_column(String(50), nullable=False)
-    input_output_id: Mapped[int] = mapped_column(ForeignKey("input_output.id"), nullable=False)
+    input_output_id: Mapped[int] = mapped_column(ForeignKey("input_output.id"), nullable=False, index=True)
 
     # ORM relationship
     input_output: Mapped["InputOutput"] = relationship(back_populates="outputs")
 
     def __repr__(self) -> str:
-        return f"<Output(id={self.id}, type={self.output_type})>"
\ No newline at end of file
+        return f"<Output(id={self.id}, type={self.output_type})>"
+
+
+# ───────────────────────────────────────────────
+# SETTINGS TABLE (app state kept with the data)
+# ───────────────────────────────────────────────
+class Setting(Base):
+    __tablename__ = "settings"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[str] = mapped_column(Text, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<Setting(key={self.key})>"
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Eager loaders for tasks and their test suites.
+
+The Task -> InputOutput -> Input/Output relationships are lazy, so walking a
+task's cases one attribute at a time costs 1 + N + 2N queries. These loaders
+fetch the whole graph with selectinload in a fixed four queries (tasks, cases,
+inputs, outputs), however many tasks or cases are involved.
+"""
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from server.database import db_models as models
+
+TASK_WITH_CASES = (
+    selectinload(models.Task.input_outputs).selectinload(models.InputOutput.inputs),
+    selectinload(models.Task.input_outputs).selectinload(models.InputOutput.outputs),
+)
+
+
+def load_task_with_cases(db: Session, task_id: int) -> Optional[models.Task]:
+    """One task with its InputOutput cases and their inputs/outputs, or None."""
+    stmt = select(models.Task).where(models.Task.id == task_id).options(*TASK_WITH_CASES)
+    return db.scalars(stmt).one_or_none()
+
+
+def load_tasks_with_cases(db: Session, task_ids: Optional[Sequence[int]] = None) -> List[models.Task]:
+    """Several tasks (all when task_ids is None), ordered by id, with their cases."""
+    stmt = select(models.Task).options(*TASK_WITH_CASES).order_by(models.Task.id)
+    if task_ids is not None:
+        stmt = stmt.where(models.Task.id.in_(task_ids))
+    return list(db.scalars(stmt))
@@ -0,0 +1,77 @@
+"""
+In-place schema upgrades for existing databases.
+
+create_all() only creates missing tables; columns added to a model after its
+table first shipped, indexes declared on the models later and the task
+full-text index are added here, so databases filled by older versions keep
+working.
+
+ensure_schema() runs both at app start-up. On SQLite it records
+SCHEMA_VERSION in the database (PRAGMA user_version) and skips all of it
+when the database is already there, so a worker start costs one PRAGMA
+instead of inspecting every table.
+"""
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import Engine, inspect, text
+
+from server.database import db_models as models
+from server.database.task_search import ensure_search_index
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a model, ADDED_COLUMNS or the search index changes
+SCHEMA_VERSION = 2
+
+# table -> [(column, SQL type)] added after the table was first created
+ADDED_COLUMNS = {
+    "tasks": [("prompt_prefix", "TEXT")],
+}
+
+
+def ensure_schema(engine: Engine, read_engine: Optional[Engine] = None) -> bool:
+    """
+    Create missing tables and run upgrade_schema(), unless a SQLite database
+    is already at SCHEMA_VERSION. Returns whether anything ran. The version
+    check goes through `read_engine` when given: on the writer it would take
+    the write lock (BEGIN IMMEDIATE) at every start-up.
+    """
+    versioned = engine.dialect.name == "sqlite"
+    if versioned:
+        with (read_engine or engine).connect() as conn:
+            if conn.exec_driver_sql("PRAGMA user_version").scalar() >= SCHEMA_VERSION:
+                return False
+
+    started = time.perf_counter()
+    models.Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    if versioned:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    logger.info("Upgraded the schema of %s to version %d in %.0f ms",
+                engine.url, SCHEMA_VERSION, (time.perf_counter() - started) * 1000)
+    return True
+
+
+def upgrade_schema(engine: Engine) -> None:
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, sql_type in columns:
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}"))
+
+        # Indexes declared on the models (index=True) that an older database lacks
+        for table in models.Base.metadata.sorted_tables:
+            if inspector.has_table(table.name):
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+
+        # FTS5 index behind GET /tasks/search
+        if conn.dialect.name == "sqlite" and inspector.has_table("tasks"):
+            ensure_search_index(conn)
@@ -0,0 +1,468 @@
+"""
+Binary task packs: a versioned, zstd-compressed snapshot of tasks and their
+test suites that can be memory-mapped and read one task at a time.
+
+The database (through the SQLAlchemy models) stays the source of truth;
+export_pack() writes a pack from it and import_pack() upserts a pack back
+into it, e.g. on deploy instead of reseeding from JSON. With TASK_PACK_PATH
+set, the routes decode single tasks straight from the mapped pack; while the
+file is missing or unreadable they keep the last pack that opened, or go to
+the database if none did.
+
+Every write of task data (fill_db, import_pack) stores a new random revision
+in the settings table, and export_pack records the database's revision in
+the pack. The routes only use a pack whose revision is the database's, so a
+reseed is served from the database until the pack is exported again;
+import_pack sets the database to the pack's revision once it has written
+all of it.
+
+Layout (little-endian):
+
+    header   magic, version, flags, task count, dictionary offset/length,
+             index offset, creation time, database revision (HEADER,
+             padded to 64 bytes; version 1 has no revision)
+    dict     optional zstd dictionary trained on the records
+    frames   one zstd frame per task: the orjson record, shaped like a
+             scripts/fill_db.py task record (fields plus "test_cases"),
+             with the task's review prompt prefix as of the export
+    index    int64 task ids (sorted), then uint64 frame offsets (count + 1)
+
+    python -m server.database.task_pack export tasks.pack
+    python -m server.database.task_pack import tasks.pack
+    python -m server.database.task_pack info tasks.pack
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+import zstandard as zstd
+from sqlalchemy import bindparam, case, null, or_, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from server.database import db_models as models
+
+MAGIC = b"RFTPACK\0"
+VERSION = 2
+HEADER = struct.Struct("<8sHHIQQQQQ")
+HEADER_V1 = struct.Struct("<8sHHIQQQQ")
+HEADER_SIZE = 64
+
+TASK_FIELDS = ("id", "name", "description", "topic", "correct_code", "messed_code")
+# Also in each record, but never imported: the app rebuilds it from the fields at startup
+DERIVED_FIELDS = ("prompt_prefix",)
+# ...after import_pack clears it because one of these changed
+PREFIX_SOURCES = ("name", "description", "correct_code")
+COMPRESSION_LEVEL = 9  # 19 is ~1% smaller and several times slower
+DICT_SIZE = 64 * 1024
+DICT_SAMPLES = 2000  # records buffered to train the dictionary
+EXPORT_BATCH_SIZE = 500
+
+# Ids a batch of imported tasks keeps; the rest of those tasks' suites is deleted (as in scripts/fill_db.py)
+SYNC_TABLES = ("sync_tasks", "keep_cases", "keep_inputs", "keep_outputs")
+DELETE_ORPHANS = (
+    "DELETE FROM input WHERE id NOT IN (SELECT id FROM keep_inputs) AND input_output_id IN"
+    " (SELECT id FROM input_output WHERE task_id IN (SELECT id FROM sync_tasks))",
+    "DELETE FROM output WHERE id NOT IN (SELECT id FROM keep_outputs) AND input_output_id IN"
+    " (SELECT id FROM input_output WHERE task_id IN (SELECT id FROM sync_tasks))",
+    "DELETE FROM input_output WHERE id NOT IN (SELECT id FROM keep_cases)"
+    " AND task_id IN (SELECT id FROM sync_tasks)",
+)
+REVISION_SETTING = "task_data_revision"
+
+# Configuration (overridable through .env)
+TASK_PACK_PATH = os.getenv("TASK_PACK_PATH")
+# How long the database's revision is trusted before get_task_pack() reads it again
+REVISION_TTL_SECONDS = float(os.getenv("TASK_PACK_REVISION_TTL_SECONDS", "2"))
+
+logger = logging.getLogger(__name__)
+
+
+def task_record(task: models.Task) -> Dict[str, Any]:
+    """A loaded task and its suite as a plain dict (the pack's record format)."""
+    record = {name: getattr(task, name) for name in TASK_FIELDS + DERIVED_FIELDS}
+    record["test_cases"] = [
+        {
+            "id": case.id,
+            "inputs": [{"id": i.id, "input": i.input, "input_type": i.input_type} for i in case.inputs],
+            "outputs": [{"id": o.id, "output": o.output, "output_type": o.output_type} for o in case.outputs],
+        }
+        for case in task.input_outputs
+    ]
+    return record
+
+
+def new_revision() -> int:
+    """A random revision for a write of task data (never 0, which means "none")."""
+    return uuid.uuid4().int >> 65 or 1
+
+
+def read_revision(db: Session) -> Optional[int]:
+    """The revision of the task data in the database, None if it was never recorded."""
+    setting = db.get(models.Setting, REVISION_SETTING)
+    return int(setting.value) if setting is not None else None
+
+
+def write_revision(db: Session, revision: int) -> None:
+    """Record `revision` for the task data; committed with the caller's transaction."""
+    db.merge(models.Setting(key=REVISION_SETTING, value=str(revision)))
+
+
+def task_records(db: Session, task_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    task_record() for several tasks, built from four Core queries on the model
+    tables; skipping ORM identity bookkeeping makes exports ~3x faster.
+    """
+    Task, InputOutput, Input, Output = models.Task, models.InputOutput, models.Input, models.Output
+    columns = [getattr(Task, name) for name in TASK_FIELDS + DERIVED_FIELDS]
+    records = {row.id: {**row._asdict(), "test_cases": []}
+               for row in db.execute(select(*columns).where(Task.id.in_(task_ids)).order_by(Task.id))}
+
+    cases = {}
+    for case_id, task_id in db.execute(
+        select(InputOutput.id, InputOutput.task_id).where(InputOutput.task_id.in_(task_ids)).order_by(InputOutput.id)
+    ):
+        cases[case_id] = {"id": case_id, "inputs": [], "outputs": []}
+        records[task_id]["test_cases"].append(cases[case_id])
+    for row in db.execute(
+        select(Input.id, Input.input, Input.input_type, Input.input_output_id)
+        .join(InputOutput).where(InputOutput.task_id.in_(task_ids)).order_by(Input.id)
+    ):
+        cases[row.input_output_id]["inputs"].append({"id": row.id, "input": row.input, "input_type": row.input_type})
+    for row in db.execute(
+        select(Output.id, Output.output, Output.output_type, Output.input_output_id)
+        .join(InputOutput).where(InputOutput.task_id.in_(task_ids)).order_by(Output.id)
+    ):
+        cases[row.input_output_id]["outputs"].append({"id": row.id, "output": row.output, "output_type": row.output_type})
+    return list(records.values())
+
+
+class TaskPack:
+    """
+    A pack file mapped read-only. Opening it reads only the header; task(id)
+    binary-searches the index in place and decompresses that one frame.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER_SIZE:
+            raise ValueError(f"{path}: not a task pack")
+        magic, version = HEADER_V1.unpack_from(self._mm)[:2]
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a task pack")
+        if version == 1:
+            (_, _, _flags, count, dict_offset, dict_length, index_offset, created), revision = \
+                HEADER_V1.unpack_from(self._mm), 0
+        elif version == VERSION:
+            _, _, _flags, count, dict_offset, dict_length, index_offset, created, revision = HEADER.unpack_from(self._mm)
+        else:
+            raise ValueError(f"{path}: task pack version {version}, expected {VERSION}")
+
+        # revision: the database's as of the export; None for version 1 packs
+        self.version, self.created, self.revision = version, created, revision or None
+        view = memoryview(self._mm)
+        self._ids = view[index_offset:index_offset + 8 * count].cast("q")
+        self._offsets = view[index_offset + 8 * count:index_offset + 8 * (2 * count + 1)].cast("Q")
+        self._dict = zstd.ZstdCompressionDict(self._mm[dict_offset:dict_offset + dict_length]) if dict_length else None
+        self._local = threading.local()  # decompressors are not thread-safe
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, task_id: int) -> bool:
+        return self._position(task_id) is not None
+
+    def ids(self) -> List[int]:
+        return self._ids.tolist()
+
+    def raw(self, task_id: int) -> Optional[bytes]:
+        """The record's JSON bytes, or None if the task is not in the pack."""
+        position = self._position(task_id)
+        if position is None:
+            return None
+        return self._decompress(position)
+
+    def task(self, task_id: int) -> Optional[Dict[str, Any]]:
+        raw = self.raw(task_id)
+        return orjson.loads(raw) if raw is not None else None
+
+    def task_model(self, task_id: int) -> Optional[models.Task]:
+        """
+        A transient Task with the record's fields (no suite attached).
+        prompt_prefix is None in packs exported before it was recorded.
+        """
+        record = self.task(task_id)
+        if record is None:
+            return None
+        return models.Task(**{name: record[name] for name in TASK_FIELDS},
+                           **{name: record.get(name) for name in DERIVED_FIELDS})
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for position in range(len(self)):
+            yield orjson.loads(self._decompress(position))
+
+    def _position(self, task_id: int) -> Optional[int]:
+        position = bisect_left(self._ids, task_id)
+        if position < len(self._ids) and self._ids[position] == task_id:
+            return position
+        return None
+
+    def _decompress(self, position: int) -> bytes:
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstd.ZstdDecompressor(dict_data=self._dict)
+        return decompressor.decompress(self._mm[self._offsets[position]:self._offsets[position + 1]])
+
+    def close(self) -> None:
+        self._ids.release()
+        self._offsets.release()
+        self._mm.close()
+
+
+def export_pack(db: Session, path: str, level: int = COMPRESSION_LEVEL, write_db: Optional[Session] = None) -> int:
+    """
+    Write every task in the database to a pack at `path` and return the task
+    count. The file is written beside `path` and renamed over it, so servers
+    mapping the old pack never see a partial file. `db` only reads (a
+    ReadSessionLocal session keeps the export off the write lock); a
+    database without a recorded revision gets one through `write_db`
+    (default `db`) first.
+    """
+    revision = read_revision(db)
+    if revision is None:
+        write_db = write_db or db
+        revision = new_revision()
+        write_revision(write_db, revision)
+        write_db.commit()
+    task_ids = db.scalars(select(models.Task.id).order_by(models.Task.id)).all()
+
+    def records() -> Iterator[Tuple[int, bytes]]:
+        for start in range(0, len(task_ids), EXPORT_BATCH_SIZE):
+            for record in task_records(db, task_ids[start:start + EXPORT_BATCH_SIZE]):
+                yield record["id"], orjson.dumps(record)
+
+    stream = records()
+    buffered = [item for _, item in zip(range(DICT_SAMPLES), stream)]
+    try:
+        dictionary = zstd.train_dictionary(DICT_SIZE, [body for _, body in buffered])
+        dict_data = dictionary.as_bytes()
+    except zstd.ZstdError:
+        dictionary, dict_data = None, b""  # too few or too small records to train on
+    compressor = zstd.ZstdCompressor(level=level, dict_data=dictionary)
+
+    tmp_path = f"{path}.tmp"
+    ids, offsets = [], []
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * HEADER_SIZE)
+        f.write(dict_data)
+        for task_id, body in chain(buffered, stream):
+            ids.append(task_id)
+            offsets.append(f.tell())
+            f.write(compressor.compress(body))
+        offsets.append(f.tell())
+        f.write(b"\0" * (-f.tell() % 8))
+        index_offset = f.tell()
+        f.write(struct.pack(f"<{len(ids)}q", *ids))
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(ids), HEADER_SIZE, len(dict_data), index_offset,
+                            int(time.time()), revision))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(ids)
+
+
+def import_pack(pack: TaskPack, db: Session, batch_size: int = EXPORT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Upsert every task of `pack` with its suite into the database, one
+    transaction per `batch_size` tasks. Returns the rows written per table.
+    The upserts are compiled from the model tables once and the rows go to
+    the driver as plain tuples (executemany); rows whose values did not
+    change are left alone, and a task's prompt_prefix is cleared only when
+    one of PREFIX_SOURCES changed. Each record holds its task's whole suite:
+    cases, inputs and outputs of an imported task missing from the pack are
+    deleted, as scripts/fill_db.py does.
+
+    Every batch marks the database with a fresh revision, and the last one
+    with the pack's, so the routes use the pack only once it is all in.
+    """
+    columns = {
+        models.Task.__table__: TASK_FIELDS,
+        models.InputOutput.__table__: ("id", "task_id"),
+        models.Input.__table__: ("id", "input", "input_type", "input_output_id"),
+        models.Output.__table__: ("id", "output", "output_type", "input_output_id"),
+    }
+    statements = {}
+    for table, names in columns.items():  # parents first
+        stmt = insert(table).values({name: bindparam(name) for name in names})
+
+        def changed(sources):
+            return or_(*(table.c[name].is_distinct_from(stmt.excluded[name]) for name in sources))
+
+        updates = {name: stmt.excluded[name] for name in names[1:]}
+        if table is models.Task.__table__:
+            # rebuilt for changed tasks at startup
+            updates["prompt_prefix"] = case((changed(PREFIX_SOURCES), null()), else_=table.c.prompt_prefix)
+        compiled = stmt.on_conflict_do_update(
+            index_elements=[table.c.id], set_=updates, where=changed(names[1:])
+        ).compile(dialect=db.get_bind().dialect)
+        assert tuple(compiled.positiontup) == names
+        statements[table.name] = str(compiled)
+
+    totals = {name: 0 for name in statements}
+    pending: Dict[str, List[tuple]] = {name: [] for name in statements}
+    revision = new_revision()
+
+    def flush(revision):
+        connection = db.connection()
+        for name, sql in statements.items():
+            if pending[name]:
+                connection.exec_driver_sql(sql, pending[name])
+        if pending["tasks"]:
+            # the temp tables live in this transaction only: the session may get another connection next batch
+            for keep, source in zip(SYNC_TABLES, statements):
+                connection.exec_driver_sql(f"CREATE TEMP TABLE {keep} (id INTEGER PRIMARY KEY)")
+                if pending[source]:
+                    connection.exec_driver_sql(f"INSERT INTO {keep} (id) VALUES (?)",
+                                               [row[:1] for row in pending[source]])
+            for sql in DELETE_ORPHANS:
+                connection.exec_driver_sql(sql)
+            for keep in SYNC_TABLES:
+                connection.exec_driver_sql(f"DROP TABLE temp.{keep}")
+        write_revision(db, revision)
+        db.commit()
+        for name, rows in pending.items():
+            totals[name] += len(rows)
+            rows.clear()
+
+    for count, record in enumerate(pack, start=1):
+        pending["tasks"].append(tuple(record[name] for name in TASK_FIELDS))
+        for test_case in record["test_cases"]:
+            pending["input_output"].append((test_case["id"], record["id"]))
+            pending["input"].extend((i["id"], i["input"], i["input_type"], test_case["id"])
+                                    for i in test_case["inputs"])
+            pending["output"].extend((o["id"], o["output"], o["output_type"], test_case["id"])
+                                     for o in test_case["outputs"])
+        if count % batch_size == 0:
+            flush(revision)
+    flush(pack.revision or revision)
+    return totals
+
+
+_pack: Optional[TaskPack] = None
+_pack_signature: Optional[Tuple] = None
+_pack_failed: Optional[Tuple] = None  # signature (or error) last logged as unusable
+_pack_stale: Optional[Tuple] = None  # (pack, database) revisions last logged as disagreeing
+_pack_lock = threading.Lock()
+_revision: Tuple[float, Optional[int]] = (float("-inf"), None)  # (read at, revision)
+
+
+def database_revision() -> Optional[int]:
+    """read_revision() through the read-only engine, reused for REVISION_TTL_SECONDS."""
+    global _revision
+    read_at, revision = _revision
+    if time.monotonic() - read_at >= REVISION_TTL_SECONDS:
+        from server.database.db import ReadSessionLocal
+
+        with ReadSessionLocal() as db:
+            revision = read_revision(db)
+        _revision = (time.monotonic(), revision)
+    return revision
+
+
+def get_task_pack() -> Optional[TaskPack]:
+    """
+    The pack at TASK_PACK_PATH, or None when unset. Reopened when the file is
+    replaced (a new export); the old mapping stays valid for readers still
+    holding it and is released once they are done. A missing or unreadable
+    file leaves the last good pack in place (None if there was none) and is
+    logged once. None as well, logged once, while the pack's revision is not
+    the database's: the tasks were rewritten since the export.
+    """
+    global _pack, _pack_signature, _pack_failed
+    if not TASK_PACK_PATH:
+        return None
+    try:
+        stat = os.stat(TASK_PACK_PATH)
+    except OSError as e:
+        _pack_unusable((type(e).__name__, e.errno), e)
+        return _current(_pack)
+    signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if signature not in (_pack_signature, _pack_failed):
+        with _pack_lock:
+            if signature not in (_pack_signature, _pack_failed):
+                try:
+                    _pack, _pack_signature, _pack_failed = TaskPack(TASK_PACK_PATH), signature, None
+                except (OSError, ValueError) as e:
+                    _pack_unusable(signature, e)
+    return _current(_pack)
+
+
+def _current(pack: Optional[TaskPack]) -> Optional[TaskPack]:
+    """`pack` if it holds the database's task data, else None (logged once per disagreement)."""
+    global _pack_stale
+    if pack is None:
+        return None
+    revision = database_revision()
+    if pack.revision is not None and pack.revision == revision:
+        return pack
+    if (pack.revision, revision) != _pack_stale:
+        _pack_stale = (pack.revision, revision)
+        logger.warning("Task pack %s is stale (revision %s, database %s); serving tasks from the database "
+                       "until it is exported again", TASK_PACK_PATH, pack.revision, revision)
+    return None
+
+
+def _pack_unusable(key: Tuple, error: Exception) -> None:
+    global _pack_failed
+    if key != _pack_failed:
+        _pack_failed = key
+        logger.warning("Task pack %s is unusable (%s); serving %s", TASK_PACK_PATH, error,
+                       "the last good pack" if _pack is not None else "tasks from the database")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from server.database.db import ReadSessionLocal, SessionLocal, engine, read_engine
+    from server.database.migrations import ensure_schema
+
+    parser = argparse.ArgumentParser(description="Export, import or inspect a binary task pack.")
+    parser.add_argument("command", choices=("export", "import", "info"))
+    parser.add_argument("path")
+    parser.add_argument("--level", type=int, default=COMPRESSION_LEVEL, help="zstd level for export")
+    opts = parser.parse_args()
+
+    if opts.command != "info":
+        ensure_schema(engine, read_engine)  # the settings table holds the revision
+    started = time.perf_counter()
+    if opts.command == "export":
+        with ReadSessionLocal() as session, SessionLocal() as write_session:
+            exported = export_pack(session, opts.path, opts.level, write_session)
+        print(f"Exported {exported:,} tasks to {opts.path} ({os.path.getsize(opts.path) / 2**20:.1f} MiB) "
+              f"in {time.perf_counter() - started:.2f} s")
+    elif opts.command == "import":
+        with SessionLocal() as session:
+            written = import_pack(TaskPack(opts.path), session)
+        counts = ", ".join(f"{count:,} {name}" for name, count in written.items())
+        print(f"Imported {counts} in {time.perf_counter() - started:.2f} s")
+    else:
+        info = TaskPack(opts.path)
+        print(f"{opts.path}: version {info.version}, {len(info):,} tasks, "
+              f"{os.path.getsize(opts.path) / 2**20:.1f} MiB, created {time.ctime(info.created)}, "
+              f"revision {info.revision}")
@@ -1,8 +1,79 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from server.backend.routers.routes import router as tasks_router
+import asyncio
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="RefactoAI API")
+from dotenv import load_dotenv
+
+load_dotenv()  # before any server module reads its configuration
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.responses import PlainTextResponse  # noqa: E402
+from server.agentic.lint_engine import shutdown_lint_process_pool, warm_lint_process_pool  # noqa: E402
+from server.agentic.llm_clients import close_llm_clients, get_llm_clients, init_llm_clients  # noqa: E402
+from server.agentic.memory import load_encoder  # noqa: E402
+from server.agentic.worker_pool import get_worker_pool, shutdown_worker_pool, worker_pool_enabled  # noqa: E402
+from server.agentic.main import refresh_task_prefixes  # noqa: E402
+from server.agentic.metrics import get_metrics  # noqa: E402
+from server.backend.catalog import get_task_catalog  # noqa: E402
+from server.backend.instrumentation import (  # noqa: E402
+    ProfilingMiddleware,
+    RequestMetricsMiddleware,
+    collect_saturation,
+    instrument_engine,
+)
+from server.backend.jobs import start_job_queue, stop_job_queue  # noqa: E402
+from server.backend.routers.routes import router as tasks_router  # noqa: E402
+from server.backend.routers.jobs import JOB_HANDLERS, router as jobs_router  # noqa: E402
+from server.database.db import ReadSessionLocal, SessionLocal, engine, read_engine  # noqa: E402
+from server.database.migrations import ensure_schema  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up() -> None:
+    """
+    Start the sandbox workers and the lint processes (each importing pylint)
+    and import the LLM libraries. Runs in a thread once the app is up; a request that
+    needs one of them first simply waits for it. The tokenizer loads in a
+    daemon thread of its own, as its download cannot be timed out; memory
+    estimates token counts until it is ready.
+    """
+    threading.Thread(target=load_encoder, name="tokenizer-load", daemon=True).start()
+    try:
+        if worker_pool_enabled():
+            get_worker_pool()
+        warm_lint_process_pool()
+        get_llm_clients().preload()
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Warm-up failed; the first requests will pay for it")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tables, columns and indexes; one PRAGMA when the database is current
+    ensure_schema(engine, read_engine)
+    # One set of keep-alive HTTP/2 connections to the LLM provider for all requests
+    init_llm_clients()
+    # Per-task review prompt prefixes, so provider-side prompt caching applies
+    # (server.serve refreshes them once for all its workers)
+    if not os.getenv("TASK_PREFIXES_READY"):
+        with SessionLocal() as db, ReadSessionLocal() as read_db:
+            refresh_task_prefixes(db, read_db)
+    get_task_catalog().load()
+    start_job_queue(JOB_HANDLERS)
+    warming = asyncio.create_task(asyncio.to_thread(warm_up))
+    yield
+    await warming  # or the pools could be created after their shutdown below
+    stop_job_queue()
+    await close_llm_clients()
+    shutdown_worker_pool()
+    shutdown_lint_process_pool()
+
+
+app = FastAPI(title="RefactoAI API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -10,9 +81,22 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last = outermost: the profile covers the whole stack
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
+instrument_engine(engine, "writer")
+instrument_engine(read_engine, "reader")
+get_metrics().add_collector(collect_saturation)
 
 @app.get("/")
 def root():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (text format 0.0.4)."""
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(tasks_router)
+app.include_router(jobs_router)
@@ -1,7 +1,44 @@
+"""
+Seed the database from a JSON or JSONL task pack.
+
+    python scripts/fill_db.py [PACK] [--table tasks] [--batch-size 1000]
+
+PACK defaults to JSON_FILE_PATH. A ".jsonl" pack holds one record per line;
+anything else is read as a JSON array. Either way records are parsed one at
+a time, so memory stays flat however large the pack is.
+
+With --table tasks (the default) every record is a task; it may carry its
+test suite in "test_cases", each with its own inputs and outputs:
+
+    {"id": 1, "name": ..., "description": ..., "topic": ...,
+     "correct_code": ..., "messed_code": ...,
+     "test_cases": [{"id": 10,
+                     "inputs": [{"id": 100, "input": "3", "input_type": "int"}],
+                     "outputs": [{"id": 200, "output": "6", "output_type": "int"}]}]}
+
+With --table input_output / input / output the records are flat rows of that
+table, as in the database. Rows are written with executemany, one transaction
+per --batch-size records, and upserted by id, so re-running a pack updates
+rows in place instead of failing or duplicating them; rows whose values did
+not change are left alone. A task record that carries "test_cases" holds its
+whole suite: cases, inputs and outputs of that task missing from the record
+are deleted.
+
+Every batch also stores a new random task data revision in the settings
+table (when the database has one), which tells the app that a task pack
+exported earlier no longer matches the database.
+"""
+import argparse
 import json
 import os
+import re
 import sqlite3
+import time
+import uuid
 from pathlib import Path
+from typing import IO, Dict, Iterator, List, Tuple
+
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,113 +47,229 @@ load_dotenv()
 DB_PATH = os.getenv("DATABASE_PATH")
 JSON_FILE_PATH = os.getenv("JSON_FILE_PATH")
 
-if not DB_PATH:
-    raise RuntimeError("DATABASE_PATH not set in .env")
-if not JSON_FILE_PATH:
-    raise RuntimeError("JSON_FILE_PATH not set in .env")
+BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 1 << 20
 
+# Columns per table, id first; the upsert updates every other column
+TABLE_COLUMNS = {
+    "tasks": ("id", "name", "description", "topic", "correct_code", "messed_code"),
+    "input_output": ("id", "task_id"),
+    "input": ("id", "input", "input_type", "input_output_id"),
+    "output": ("id", "output", "output_type", "input_output_id"),
+}
+# Parents before children, so foreign keys hold inside every batch
+TABLE_ORDER = ("tasks", "input_output", "input", "output")
+# Derived columns set to NULL when one of the columns they derive from changes:
+# a task's review prompt prefix is rebuilt from these at app startup
+RESET_ON_CHANGE = {
+    "tasks": {"prompt_prefix": ("name", "description", "correct_code")},
+}
 
-class TaskType:
-    def __init__(self, id: int, name: str, description: str, topic: str, correct_code: str, messed_code: str):
-        self.id = id
-        self.name = name
-        self.description = description
-        self.topic = topic
-        self.correct_code = correct_code
-        self.messed_code = messed_code
+# Ids a batch of task records keeps; the rest of those tasks' suites is deleted
+SYNC_TABLES = ("sync_tasks", "keep_cases", "keep_inputs", "keep_outputs")
+DELETE_ORPHANS = (
+    "DELETE FROM input WHERE id NOT IN (SELECT id FROM keep_inputs) AND input_output_id IN"
+    " (SELECT id FROM input_output WHERE task_id IN (SELECT id FROM sync_tasks))",
+    "DELETE FROM output WHERE id NOT IN (SELECT id FROM keep_outputs) AND input_output_id IN"
+    " (SELECT id FROM input_output WHERE task_id IN (SELECT id FROM sync_tasks))",
+    "DELETE FROM input_output WHERE id NOT IN (SELECT id FROM keep_cases)"
+    " AND task_id IN (SELECT id FROM sync_tasks)",
+)
+# server/database/task_pack.py REVISION_SETTING
+SET_REVISION = (
+    "INSERT INTO settings (key, value) VALUES ('task_data_revision', ?)"
+    " ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+)
 
-class InputRow:
-    def __init__(self, id: int, input: str, input_type: str, input_output_id: int):
-        self.id = id
-        self.input = input
-        self.input_type = input_type
-        self.input_output_id = input_output_id
 
+def get_upsert(table: str, columns: Tuple[str, ...], reset: Dict[str, Tuple[str, ...]] = None) -> str:
+    """
+    INSERT ... ON CONFLICT(id) DO UPDATE, skipping rows whose values are all
+    unchanged; each `reset` column is set to NULL when one of the columns it
+    maps to changes.
+    """
+    def changed(names):
+        return " OR ".join(f"{name} IS NOT excluded.{name}" for name in names)
 
-def get_json_data(path: str):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError) as e:
-        print(f"Error reading JSON: {e}")
-        return []
+    updates = [f"{name} = excluded.{name}" for name in columns[1:]]
+    updates += [f"{name} = CASE WHEN {changed(sources)} THEN NULL ELSE {name} END"
+                for name, sources in (reset or {}).items()]
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT(id) DO UPDATE SET {', '.join(updates)} WHERE {changed(columns[1:])}"
+    )
 
 
-def get_task_insert(task: TaskType):
-    sql = """
-        INSERT INTO tasks (id, name, description, topic, correct_code, messed_code)
-        VALUES (?, ?, ?, ?, ?, ?)
+# Between the records of a JSON array pack
+_SEPARATORS = re.compile(r"[\s,]*")
+_decoder = json.JSONDecoder()
+
+
+def iter_json_array(stream: IO[str], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Yield the records of a top-level JSON array, reading `stream` in chunks.
+    A record cut off by the end of the buffer fails to decode and is retried
+    once more text has been read.
     """
-    params = (task.id, task.name, task.description, task.topic, task.correct_code, task.messed_code)
-    return sql, params
+    buf, pos = "", 0
+    while not buf.lstrip():
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        buf += chunk
+    buf = buf.lstrip()
+    if not buf.startswith("["):
+        raise ValueError("Expected a JSON array of records")
+    pos = 1
+
+    while True:
+        pos = _SEPARATORS.match(buf, pos).end()
+        if pos < len(buf):
+            if buf[pos] == "]":
+                return
+            try:
+                record, pos = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                pass
+            else:
+                yield record
+                continue
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            raise ValueError(f"Unexpected end of JSON pack near {buf[pos:pos + 40]!r}")
+        buf, pos = buf[pos:] + chunk, 0
 
 
-def get_input_insert(inp: InputRow):
-    sql = """
-        INSERT INTO input (id, input, input_type, input_output_id)
-        VALUES (?, ?, ?, ?)
+def iter_records(path: str) -> Iterator[dict]:
+    """Records of a .jsonl pack (one per line) or a JSON array pack."""
+    if path.endswith(".jsonl"):
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from iter_json_array(f)
+
+
+def get_rows(table: str, record: dict) -> Dict[str, List[tuple]]:
+    """
+    The rows one record contributes to each table, plus, for a task record
+    with "test_cases", the ids it keeps per SYNC_TABLES table.
     """
-    params = (inp.id, inp.input, inp.input_type, inp.input_output_id)
-    return sql, params
+    rows: Dict[str, List[tuple]] = {name: [] for name in TABLE_ORDER + SYNC_TABLES}
+    rows[table].append(tuple(record[name] for name in TABLE_COLUMNS[table]))
+    if table == "tasks" and "test_cases" in record:
+        rows["sync_tasks"].append((record["id"],))
+        for case in record["test_cases"]:
+            rows["input_output"].append((case["id"], record["id"]))
+            for inp in case.get("inputs", ()):
+                rows["input"].append((inp["id"], inp["input"], inp["input_type"], case["id"]))
+            for out in case.get("outputs", ()):
+                rows["output"].append((out["id"], out["output"], out["output_type"], case["id"]))
+        for keep, source in zip(SYNC_TABLES[1:], TABLE_ORDER[1:]):
+            rows[keep] = [(row[0],) for row in rows[source]]
+    return rows
+
 
+def add_data_to_db(table: str = "tasks", path: str = None, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Load the pack at `path` (JSON_FILE_PATH by default); returns rows written per table."""
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"Unsupported table: {table}")
+    path = path or JSON_FILE_PATH
 
-def add_data_to_db(table: str = "tasks"):
     print("Establishing database connection")
-    conn = None
-    try:
-        db_path = Path(DB_PATH)
-        db_path.parent.mkdir(parents=True, exist_ok=True)
+    db_path = Path(DB_PATH)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
 
-        conn = sqlite3.connect(str(db_path))
-        conn.execute("PRAGMA foreign_keys = ON;")
-        cursor = conn.cursor()
+    # A changed task needs its review prompt prefix rebuilt (done at app startup)
+    task_columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+    statements = {
+        name: get_upsert(name, TABLE_COLUMNS[name], {
+            column: sources for column, sources in RESET_ON_CHANGE.get(name, {}).items() if column in task_columns
+        })
+        for name in TABLE_ORDER
+    }
+    for name in SYNC_TABLES:
+        conn.execute(f"CREATE TEMP TABLE {name} (id INTEGER PRIMARY KEY)")
+    has_settings = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'settings'").fetchone()
+    revision = str(uuid.uuid4().int >> 65 or 1)
 
-        print(f"Loading JSON from {JSON_FILE_PATH}")
-        data = get_json_data(JSON_FILE_PATH)
-        if not isinstance(data, list) or not data:
-            print("No records found in JSON; nothing to insert.")
-            return
+    totals = {name: 0 for name in TABLE_ORDER}
+    pending: Dict[str, List[tuple]] = {name: [] for name in TABLE_ORDER + SYNC_TABLES}
+    records = removed = 0
+    started = time.perf_counter()
 
-        if table == "tasks":
-            print("Inserting tasks ...")
-            for row in data:
-                task = TaskType(
-                    id=row["id"],
-                    name=row["name"],
-                    description=row["description"],
-                    topic=row["topic"],
-                    correct_code=row["correct_code"],
-                    messed_code=row["messed_code"],
-                )
-                sql, params = get_task_insert(task)
-                cursor.execute(sql, params)
-
-        elif table == "input":
-            print("Inserting inputs ...")
-            for row in data:
-                inp = InputRow(
-                    id=row["id"],
-                    input=row["input"],
-                    input_type=row["input_type"],
-                    input_output_id=row["input_output_id"],
-                )
-                sql, params = get_input_insert(inp)
-                cursor.execute(sql, params)
-        else:
-            raise ValueError(f"Unsupported table: {table}")
-
-        conn.commit()
-        print("Insert complete.")
-
-    except sqlite3.Error as e:
-        print(f"Database error: {e}")
-        if conn:
-            conn.rollback()
+    def flush():
+        nonlocal removed
+        conn.execute("BEGIN")
+        try:
+            for name in TABLE_ORDER:
+                conn.executemany(statements[name], pending[name])
+            if pending["sync_tasks"]:
+                for name in SYNC_TABLES:
+                    conn.execute(f"DELETE FROM {name}")
+                    conn.executemany(f"INSERT OR IGNORE INTO {name} (id) VALUES (?)", pending[name])
+                batch_removed = sum(conn.execute(sql).rowcount for sql in DELETE_ORPHANS)
+            else:
+                batch_removed = 0
+            if has_settings:
+                conn.execute(SET_REVISION, (revision,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        removed += batch_removed
+        for name in TABLE_ORDER:
+            totals[name] += len(pending[name])
+        for rows in pending.values():
+            rows.clear()
+        rows = sum(totals.values())
+        print(f"  {records:,} records, {rows:,} rows ({rows / (time.perf_counter() - started):,.0f} rows/s)")
+
+    try:
+        print(f"Loading {table} from {path}")
+        for record in iter_records(path):
+            for name, rows in get_rows(table, record).items():
+                pending[name].extend(rows)
+            records += 1
+            if records % batch_size == 0:
+                flush()
+        if any(pending.values()):
+            flush()
+    except (sqlite3.Error, ValueError, KeyError, OSError) as e:
+        print(f"Error after {records:,} records (earlier batches are committed): {e!r}")
+        raise
     finally:
-        if conn:
-            conn.close()
-            print("Database connection closed")
+        conn.close()
+        print("Database connection closed")
+
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    if not records:
+        print("No records found in pack; nothing to insert.")
+    else:
+        counts = ", ".join(f"{count:,} {name}" for name, count in totals.items() if count)
+        print(f"Insert complete: {counts} in {elapsed:.2f} s ({rows / elapsed:,.0f} rows/s);"
+              f" {removed:,} rows no longer in the pack removed")
+    return totals
 
 
 if __name__ == "__main__":
-    add_data_to_db("tasks")
+    parser = argparse.ArgumentParser(description="Seed the database from a JSON/JSONL task pack.")
+    parser.add_argument("pack", nargs="?", default=JSON_FILE_PATH, help="defaults to JSON_FILE_PATH")
+    parser.add_argument("--table", choices=TABLE_COLUMNS, default="tasks")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="records per transaction")
+    opts = parser.parse_args()
+
+    if not DB_PATH:
+        raise RuntimeError("DATABASE_PATH not set in .env")
+    if not opts.pack:
+        raise RuntimeError("JSON_FILE_PATH not set in .env")
+    try:
+        add_data_to_db(opts.table, opts.pack, opts.batch_size)
+    except (sqlite3.Error, ValueError, KeyError, OSError):
+        raise SystemExit(1)  # already reported
@@ -0,0 +1,76 @@
+"""
+Production entry point: uvicorn with one worker process per core.
+
+    python -m server.serve [--workers N] [--host 0.0.0.0] [--port 8000]
+
+--workers defaults to WEB_CONCURRENCY, else the cores this process may run
+on. The schema and the tasks' review prompt prefixes are brought up to date
+once here, before the workers start, so they do not race to create them or
+each take the write lock for it.
+
+With more than one worker, state that has to follow a user between requests
+goes to the SHARED_STATE_PATH SQLite file (default: shared_state.db next to
+DATABASE_PATH): chat/review session memory, LLM rate-limit counters and the
+result cache's disk tier. Jobs already live in jobs.db and are claimed
+atomically by whichever worker is free. Still per worker: each one's
+sandbox and lint process pools (size RUNNER_POOL_SIZE and LINT_CONCURRENCY
+for the whole host accordingly), its in-memory cache tier, its live-lint
+sessions (an edit that lands on another worker is linted in full, with the
+same result) and its /metrics registry.
+"""
+import argparse
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+def default_workers() -> int:
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"])
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        return os.cpu_count() or 1
+
+
+def default_shared_state_path() -> str:
+    """shared_state.db next to the main database (as jobs.db is)."""
+    db_path = os.getenv("DATABASE_PATH")
+    return str(Path(db_path).with_name("shared_state.db")) if db_path else "shared_state.db"
+
+
+def prepare(workers: int) -> None:
+    """Settle the configuration the workers inherit, migrate the database and refresh prompt prefixes."""
+    if workers > 1 and not os.getenv("SHARED_STATE_PATH"):
+        os.environ["SHARED_STATE_PATH"] = default_shared_state_path()
+
+    from server.agentic.main import refresh_task_prefixes
+    from server.database.db import ReadSessionLocal, SessionLocal, engine, read_engine
+    from server.database.migrations import ensure_schema
+
+    ensure_schema(engine, read_engine)
+    with SessionLocal() as db, ReadSessionLocal() as read_db:
+        refresh_task_prefixes(db, read_db)
+    os.environ["TASK_PREFIXES_READY"] = "1"  # the workers' lifespan skips it
+    engine.dispose()
+    read_engine.dispose()
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes.")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    opts = parser.parse_args()
+
+    prepare(opts.workers)
+    import uvicorn
+
+    uvicorn.run("server.main:app", host=opts.host, port=opts.port, workers=opts.workers, log_level=opts.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Test settings: a throwaway database and the offline fake LLM, set before any
+server module reads its configuration, plus an in-memory task database.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="refactoai-tests-"), "tasks.db"))
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+
+@pytest.fixture
+def db():
+    """A session on an in-memory SQLite database holding three tasks, each with two test cases."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from server.database import db_models as models
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for task_id in (1, 2, 3):
+            session.add(models.Task(
+                id=task_id, name=f"Task {task_id}", description="Add two numbers.", topic="basics",
+                correct_code="print(int(input()) + int(input()))", messed_code="print(input())",
+                prompt_prefix=f"prefix {task_id}",
+                input_outputs=[
+                    models.InputOutput(
+                        inputs=[models.Input(input=str(value), input_type="int") for value in (a, b)],
+                        outputs=[models.Output(output=str(a + b), output_type="int")],
+                    )
+                    for a, b in ((task_id, 1), (task_id, 2))
+                ],
+            ))
+        session.commit()
+        yield session
+    engine.dispose()
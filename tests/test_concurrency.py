@@ -0,0 +1,75 @@
+"""concurrency.Slots: one budget for blocking and async callers."""
+import asyncio
+import threading
+
+import pytest
+
+from server.agentic.concurrency import Slots, resource_slots, thread_slots
+
+
+def test_threads_and_coroutines_share_the_budget():
+    slots = Slots(2)
+    in_thread, release_thread = threading.Event(), threading.Event()
+
+    def blocking_caller():
+        with slots:
+            in_thread.set()
+            release_thread.wait()
+
+    thread = threading.Thread(target=blocking_caller)
+    thread.start()
+    in_thread.wait()
+
+    async def main():
+        async with slots:
+            waiter = asyncio.create_task(slots.acquire_async())
+            await asyncio.sleep(0.05)
+            assert not waiter.done()
+            assert slots.usage() == {"limit": 2, "in_use": 2, "waiting": 1}
+            # The blocking caller's release hands its slot to the waiting coroutine
+            release_thread.set()
+            await asyncio.wait_for(waiter, 5)
+        slots.release()
+
+    asyncio.run(main())
+    thread.join()
+    assert slots.usage() == {"limit": 2, "in_use": 0, "waiting": 0}
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    slots = Slots(1)
+
+    async def main():
+        async with slots:
+            waiter = asyncio.create_task(slots.acquire_async())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        async with slots:
+            pass
+
+    asyncio.run(main())
+    assert slots.usage() == {"limit": 1, "in_use": 0, "waiting": 0}
+
+
+@pytest.mark.parametrize("handed_over", [False, True])
+def test_cancelled_during_hand_over_passes_the_slot_on(handed_over):
+    slots = Slots(1)
+
+    async def main():
+        slots.acquire()
+        waiter = asyncio.create_task(slots.acquire_async())
+        await asyncio.sleep(0)
+        slots.release()  # schedules the hand-over
+        if handed_over:
+            await asyncio.sleep(0)  # the waiter holds the slot but has not resumed yet
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert slots.usage() == {"limit": 1, "in_use": 0, "waiting": 0}
+
+
+def test_blocking_and_async_callers_get_the_same_llm_slots():
+    assert thread_slots("llm") is resource_slots("llm")
@@ -0,0 +1,71 @@
+"""scripts/fill_db.py: re-running a pack keeps prompt prefixes of unchanged tasks and drops removed test cases."""
+import sqlite3
+
+import orjson
+import pytest
+from sqlalchemy import create_engine
+
+from server.database import db_models as models
+from server.scripts import fill_db
+
+
+def _task(task_id, description="Add two numbers.", cases=((10, 100, 200), (11, 101, 201))):
+    return {
+        "id": task_id, "name": f"Task {task_id}", "description": description, "topic": "basics",
+        "correct_code": "print(int(input()) + int(input()))", "messed_code": "print(input())",
+        "test_cases": [
+            {"id": task_id * 100 + case, "inputs": [{"id": task_id * 1000 + inp, "input": "3", "input_type": "int"}],
+             "outputs": [{"id": task_id * 1000 + out, "output": "6", "output_type": "int"}]}
+            for case, inp, out in cases
+        ],
+    }
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = tmp_path / "tasks.db"
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    engine.dispose()
+    monkeypatch.setattr(fill_db, "DB_PATH", str(path))
+    return path
+
+
+def _load(tmp_path, tasks):
+    pack = tmp_path / "pack.jsonl"
+    pack.write_bytes(b"\n".join(orjson.dumps(task) for task in tasks))
+    fill_db.add_data_to_db("tasks", str(pack))
+
+
+def _query(path, sql):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def test_rerun_resets_only_changed_prefixes(database, tmp_path):
+    _load(tmp_path, [_task(1), _task(2)])
+    with sqlite3.connect(database) as conn:
+        conn.execute("UPDATE tasks SET prompt_prefix = 'prefix ' || id")
+
+    _load(tmp_path, [_task(1), {**_task(2, "Add three numbers."), "topic": "loops"}])
+
+    assert _query(database, "SELECT id, prompt_prefix, topic FROM tasks ORDER BY id") == [
+        (1, "prefix 1", "basics"), (2, None, "loops"),
+    ]
+
+
+def test_rerun_removes_cases_no_longer_in_the_pack(database, tmp_path):
+    _load(tmp_path, [_task(1), _task(2)])
+
+    _load(tmp_path, [_task(1, cases=((10, 100, 200),)), {k: v for k, v in _task(2).items() if k != "test_cases"}])
+
+    assert _query(database, "SELECT id, task_id FROM input_output ORDER BY id") == [(110, 1), (210, 2), (211, 2)]
+    assert _query(database, "SELECT id FROM input ORDER BY id") == [(1100,), (2100,), (2101,)]
+    assert _query(database, "SELECT id FROM output ORDER BY id") == [(1200,), (2200,), (2201,)]
+
+
+def test_every_run_records_a_new_revision(database, tmp_path):
+    _load(tmp_path, [_task(1)])
+    first = _query(database, "SELECT value FROM settings WHERE key = 'task_data_revision'")
+    _load(tmp_path, [_task(1)])
+    assert first and _query(database, "SELECT value FROM settings WHERE key = 'task_data_revision'") != first
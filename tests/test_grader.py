@@ -0,0 +1,30 @@
+"""TestCaseGrader against the sandbox worker pool, or one-shot workers without it."""
+import pytest
+
+from server.agentic import grader
+
+ECHO_OR_HANG = "import time\nvalue = input()\nif value == 'hang':\n    time.sleep(60)\nprint(value)"
+
+
+def test_a_hanging_case_fails_alone():
+    cases = [grader.TestCase(1, ["1"], ["1"]), grader.TestCase(2, ["hang"], ["hang"]), grader.TestCase(3, ["3"], ["3"])]
+    result = grader.TestCaseGrader.grade(ECHO_OR_HANG, cases, timeout=1)
+    assert [case.passed for case in result.cases] == [True, False, True]
+    assert result.cases[1].limit == "timeout"
+    assert "timed out" in result.cases[1].error
+    assert result.cases[1].time_ms < 5000
+
+
+def test_stop_on_first_failure_after_a_timeout():
+    cases = [grader.TestCase(1, ["1"], ["1"]), grader.TestCase(2, ["hang"], ["hang"]), grader.TestCase(3, ["3"], ["3"])]
+    result = grader.TestCaseGrader.grade(ECHO_OR_HANG, cases, stop_on_first_failure=True, timeout=1)
+    assert [case.passed for case in result.cases] == [True, False]
+    assert result.total == 3
+
+
+def test_without_the_pool_each_job_gets_a_one_shot_worker(monkeypatch):
+    monkeypatch.setattr(grader, "worker_pool_enabled", lambda: False)
+    monkeypatch.setattr(grader, "get_worker_pool", lambda: pytest.fail("started the worker pool"))
+    cases = [grader.TestCase(1, ["1"], ["1"]), grader.TestCase(2, ["2"], ["3"])]
+    result = grader.TestCaseGrader.grade(ECHO_OR_HANG, cases, timeout=5)
+    assert [case.passed for case in result.cases] == [True, False]
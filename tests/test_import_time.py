@@ -0,0 +1,24 @@
+"""Cold start: importing the app stays within budget and leaves the heavy packages unloaded."""
+import os
+import statistics
+
+from benchmarks.bench_import_time import LAZY_MODULES, import_profile
+from benchmarks.common import ROOT
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+RUNS = 3
+
+
+def _env():
+    return {**os.environ, "LLM_BACKEND": "fake", "PYTHONPATH": str(ROOT)}
+
+
+def test_import_does_not_load_lazy_modules():
+    _, _, modules = import_profile(_env())
+    loaded = sorted(name for name in modules if name.split(".")[0] in LAZY_MODULES)
+    assert not loaded, f"import server.main loaded {', '.join(loaded)}"
+
+
+def test_import_is_within_budget():
+    median = statistics.median(import_profile(_env())[0] for _ in range(RUNS)) * 1000
+    assert median <= IMPORT_BUDGET_MS, f"import server.main took {median:.0f} ms (budget {IMPORT_BUDGET_MS:g} ms)"
@@ -0,0 +1,71 @@
+"""JobStore leases: jobs left running by a dead process are recovered."""
+import json
+import sqlite3
+import time
+
+from server.backend.jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue, JobStore
+
+
+def _store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def test_an_expired_lease_is_requeued_and_not_counted_as_running(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.submit("run", {}, "alice")
+    assert store.claim(lease=-1)["id"] == job_id  # its process died right away
+    assert store.recover_expired() == 1
+    job = store.get(job_id)
+    assert job["status"] == QUEUED
+    assert store.metrics()["running"] == 0
+
+
+def test_a_job_interrupted_too_often_fails(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.submit("run", {}, "alice")
+    for _ in range(3):
+        store.claim(lease=-1)
+        store.recover_expired(max_attempts=3)
+    job = store.get(job_id)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 3
+
+
+def test_a_live_lease_is_left_alone(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.submit("run", {}, "alice")
+    store.claim(lease=60)
+    assert store.recover_expired() == 0
+    assert store.get(job_id)["status"] == RUNNING
+
+
+def test_a_reclaimed_job_ignores_the_first_finish(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.submit("run", {}, "alice")
+    first = store.claim(lease=-1)
+    store.recover_expired()
+    second = store.claim(lease=60)
+    store.finish(job_id, result="stale", attempt=first["attempts"])
+    assert store.get(job_id)["status"] == RUNNING
+    store.finish(job_id, result="fresh", attempt=second["attempts"])
+    assert store.get(job_id)["result"] == "fresh"
+
+
+def test_the_queue_recovers_jobs_on_start(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    with sqlite3.connect(path) as conn:  # a jobs.db from before leases, left mid-job
+        conn.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, user_id TEXT NOT NULL,"
+            " priority INTEGER NOT NULL DEFAULT 0, payload TEXT NOT NULL, status TEXT NOT NULL, result TEXT,"
+            " error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        conn.execute("INSERT INTO jobs VALUES ('stale', 'echo', 'alice', 0, ?, 'running', NULL, NULL, ?, ?, NULL)",
+                     (json.dumps({"n": 1}), time.time(), time.time()))
+    queue = JobQueue(JobStore(path), {"echo": lambda payload: payload["n"]}, workers=1).start()
+    try:
+        deadline = time.monotonic() + 10
+        while queue.store.get("stale")["status"] != DONE and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        queue.stop()
+    assert queue.store.get("stale")["result"] == 1
@@ -0,0 +1,16 @@
+"""Lint process pool: its processes yield the CPU to the event loop."""
+import os
+
+import pytest
+
+from server.agentic import lint_engine
+
+
+@pytest.mark.skipif(not hasattr(os, "nice"), reason="no process priorities here")
+def test_lint_processes_run_at_lower_priority():
+    lint_engine.warm_lint_process_pool()
+    try:
+        niceness = lint_engine.get_lint_process_pool().submit(os.nice, 0).result()
+    finally:
+        lint_engine.shutdown_lint_process_pool()
+    assert niceness == min(19, os.nice(0) + lint_engine.LINT_NICENESS)
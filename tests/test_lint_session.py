@@ -0,0 +1,77 @@
+"""Incremental lints must report what a full lint of the same source reports."""
+import asyncio
+
+import pytest
+
+from server.agentic.lint_session import LintSession
+from server.agentic.tools import AsyncCodeChecker
+
+HEADER = '"""Module."""\n\n\n'
+
+CALLEES = {
+    "no return": 'def helper():\n    """Print."""\n    print("x")\n',
+    "bare return": 'def helper(flag):\n    """Print."""\n    if flag:\n        return\n    print("x")\n',
+    "returns None": (
+        'def helper(flag):\n    """Print."""\n    if flag:\n        return None\n    print("x")\n    return None\n'
+    ),
+    "value return": 'def helper():\n    """Answer."""\n    print("x")\n    return 42\n',
+    "generator": 'def helper():\n    """Count."""\n    for i in range(3):\n        yield i\n',
+    "raise only": 'def helper():\n    """Fail."""\n    raise ValueError("x")\n',
+    "abstract": 'def helper():\n    """Later."""\n    raise NotImplementedError\n    print("x")\n',
+    "nested return": 'def helper():\n    """Print."""\n    def inner():\n        return 1\n    print(inner())\n',
+}
+
+CALLER = 'def main():\n    """Run."""\n    value = helper({args})\n    print(value{edit})\n'
+
+
+def _key(result):
+    return [(msg["symbol"], msg["line"], msg["column"]) for msg in result["messages"]], result["score"]
+
+
+@pytest.mark.parametrize("callee", list(CALLEES))
+def test_incremental_matches_full(callee):
+    args = "True" if "flag" in CALLEES[callee] else ""
+    before = HEADER + CALLEES[callee] + "\n\n" + CALLER.format(args=args, edit="")
+    after = HEADER + CALLEES[callee] + "\n\n" + CALLER.format(args=args, edit=", 1")
+
+    async def lint():
+        session = LintSession()
+        await session.lint(before)
+        incremental = await session.lint(after)
+        full = (await AsyncCodeChecker.lint_code(after)).to_dict()
+        return incremental, full
+
+    incremental, full = asyncio.run(lint())
+    assert incremental["mode"] == "incremental"
+    assert incremental["relinted"] == ["main"]
+    assert _key(incremental) == _key(full)
+
+
+def test_a_newer_edit_cancels_the_lint_in_flight(monkeypatch):
+    from server.agentic import lint_session
+
+    started, cancelled, lint_code = asyncio.Event(), [], AsyncCodeChecker.lint_code
+
+    async def slow_lint(source, task_id=None):
+        started.set()
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(source)
+            raise
+
+    monkeypatch.setattr(lint_session, "LINT_SESSION_DEBOUNCE_SECONDS", 0.01)
+    monkeypatch.setattr(lint_session.AsyncCodeChecker, "lint_code", slow_lint)
+
+    async def edit_twice():
+        session = LintSession()
+        first = asyncio.ensure_future(session.lint("x = 1\n"))
+        await started.wait()
+        monkeypatch.setattr(lint_session.AsyncCodeChecker, "lint_code", lint_code)
+        second = await session.lint("x = 2\n")
+        return await asyncio.wait_for(first, 1), second
+
+    first, second = asyncio.run(edit_twice())
+    assert first == {"superseded": True}
+    assert cancelled == ["x = 1\n"]
+    assert second["superseded"] is False and second["mode"] == "full"
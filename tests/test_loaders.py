@@ -0,0 +1,52 @@
+"""The eager loaders fetch a whole suite in a fixed four queries."""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from server.database import db_models as models
+from server.database.loaders import load_task_with_cases, load_tasks_with_cases
+
+
+@contextmanager
+def count_statements(db):
+    statements = []
+
+    def before_cursor_execute(_conn, _cursor, statement, _parameters, _context, _executemany):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _walk(task):
+    return [([i.input for i in case.inputs], [o.output for o in case.outputs]) for case in task.input_outputs]
+
+
+def test_one_task_takes_four_queries(db):
+    with count_statements(db) as statements:
+        task = load_task_with_cases(db, 2)
+        suite = _walk(task)
+    assert suite == [(["2", "1"], ["3"]), (["2", "2"], ["4"])]
+    assert len(statements) == 4
+
+
+def test_all_tasks_take_four_queries(db):
+    db.expunge_all()  # nothing already in the identity map
+    with count_statements(db) as statements:
+        tasks = load_tasks_with_cases(db)
+        suites = [_walk(task) for task in tasks]
+    assert [task.id for task in tasks] == [1, 2, 3]
+    assert all(len(suite) == 2 for suite in suites)
+    assert len(statements) == 4
+
+
+def test_a_lazy_walk_grows_with_the_cases(db):
+    db.expunge_all()
+    with count_statements(db) as statements:
+        _walk(db.get(models.Task, 1))
+    # The task, its cases, then the inputs and the outputs of each case
+    assert len(statements) == 1 + 1 + 2 * 2
@@ -0,0 +1,26 @@
+"""Conversation memory token counting."""
+import threading
+
+from server.agentic import memory
+
+
+def test_counting_never_loads_the_tokenizer(monkeypatch):
+    monkeypatch.setattr(memory, "_encoding", None)
+    loads = []
+    monkeypatch.setattr(memory, "load_encoder", lambda: loads.append(1))
+    assert memory.count_tokens("x" * 40) == 10
+    conversation = memory.ConversationMemory(max_tokens=50, keep_turns=2)
+    for turn in range(4):
+        conversation.add_turn(f"question {turn} " * 5, f"answer {turn}")
+    assert not loads
+    assert len(conversation.turns) <= 2
+
+
+def test_add_turn_does_not_wait_for_a_loading_tokenizer(monkeypatch):
+    monkeypatch.setattr(memory, "_encoding", None)
+    with memory._encoding_lock:  # pylint: disable=protected-access  # a download in progress
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (memory.ConversationMemory().add_turn("q", "a"), done.set()))
+        thread.start()
+        assert done.wait(5)
+    thread.join()
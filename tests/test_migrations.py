@@ -0,0 +1,21 @@
+"""ensure_schema: a current database is checked without taking the write lock."""
+from sqlalchemy import create_engine, event
+
+from server.database.migrations import SCHEMA_VERSION, ensure_schema
+
+
+def test_a_current_database_is_checked_on_the_reader(tmp_path):
+    url = f"sqlite:///{tmp_path / 'tasks.db'}"
+    writer, reader = create_engine(url), create_engine(url)
+    writes = []
+    event.listen(writer, "begin", lambda conn: writes.append(conn))
+
+    assert ensure_schema(writer, reader)
+    writes.clear()
+    assert not ensure_schema(writer, reader)
+
+    assert writes == []
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION
+    writer.dispose()
+    reader.dispose()
@@ -0,0 +1,36 @@
+"""LLM rate limit: per client address and per session."""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from server.backend import rate_limit
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_llm_limiter", rate_limit.RateLimiter("llm", 3, window_seconds=3600))
+    app = FastAPI()
+
+    @app.post("/review", dependencies=[Depends(rate_limit.llm_rate_limit)])
+    def review():
+        return {}
+
+    return TestClient(app)
+
+
+def test_fresh_session_ids_do_not_bypass_the_limit(client):
+    codes = [client.post("/review", headers={"X-Session-Id": uuid.uuid4().hex}).status_code for _ in range(5)]
+    assert codes == [200, 200, 200, 429, 429]
+
+
+def test_a_session_is_limited_across_addresses(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_llm_limiter", rate_limit.RateLimiter("llm", 3, window_seconds=3600))
+    for address in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+        rate_limit.llm_rate_limit(SimpleNamespace(client=SimpleNamespace(host=address)), "one")
+    with pytest.raises(HTTPException) as error:
+        rate_limit.llm_rate_limit(SimpleNamespace(client=SimpleNamespace(host="10.0.0.4")), "one")
+    assert error.value.status_code == 429
+    assert int(error.value.headers["Retry-After"]) >= 1
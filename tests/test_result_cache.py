@@ -0,0 +1,48 @@
+"""ResultCache: the SQLite tier shared by workers, and coroutines waiting on it."""
+import asyncio
+import sqlite3
+import threading
+import time
+
+from server.agentic.result_cache import ResultCache
+
+
+def test_disk_tier_outlives_the_memory_tier(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResultCache(db_path=path).put("key", {"report": "ok"})
+
+    cache = ResultCache(db_path=path)
+    assert asyncio.run(cache.aget("key")) == {"report": "ok"}
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("key") == {"report": "ok"}
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_locked_disk_tier_does_not_stall_the_event_loop(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResultCache(db_path=path)
+    other_worker = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    other_worker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.5, other_worker.execute, ("COMMIT",)).start()
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await cache.aput("key", "value")
+        waited = time.perf_counter() - started
+        ticking.cancel()
+        return ticks, waited
+
+    ticks, waited = asyncio.run(main())
+    other_worker.close()
+    assert waited >= 0.4
+    assert ticks >= 20
+    assert ResultCache(db_path=path).get("key") == "value"
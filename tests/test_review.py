@@ -0,0 +1,41 @@
+"""AI review replies: schema check and the wrapper for unusable replies."""
+import json
+
+import pytest
+
+from server.agentic.main import Assistant_agent, _is_review
+from server.agentic.result_cache import get_result_cache
+
+REVIEW = {"answer": "Looks fine.", "hints": ["Name the loop variable."], "score": 80}
+
+
+@pytest.mark.parametrize("missing", ["answer", "hints", "score"])
+def test_final_review_needs_every_key(missing):
+    reply = {name: value for name, value in REVIEW.items() if name != missing}
+    assert not _is_review(reply)
+    assert _is_review(reply, partial=True)
+
+
+def test_review_with_wrong_types_is_rejected():
+    assert _is_review(REVIEW)
+    assert not _is_review({**REVIEW, "score": "80"})
+    assert not _is_review({**REVIEW, "hints": "one hint"})
+
+
+@pytest.mark.parametrize("reply, problem", [
+    ("Here is my review: looks fine.", "non-JSON reply"),
+    (json.dumps({"answer": "Looks fine.", "hints": []}), "did not match the answer/hints/score schema"),
+    (json.dumps(["Looks fine."]), "did not match the answer/hints/score schema"),
+])
+def test_unusable_reply_is_wrapped_and_not_cached(reply, problem):
+    key = f"test-review-{problem}-{reply}"
+    wrapped = json.loads(Assistant_agent()._finish_review("payload", reply, key, {}))
+    assert problem in wrapped["answer"]
+    assert wrapped["hints"] == [reply] and wrapped["score"] == 0
+    assert get_result_cache().get(key) is None
+
+
+def test_valid_reply_is_returned_and_cached():
+    reply = json.dumps(REVIEW)
+    assert Assistant_agent()._finish_review("payload", reply, "test-review-valid", {}) == reply
+    assert get_result_cache().get("test-review-valid") == reply
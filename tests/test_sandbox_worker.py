@@ -0,0 +1,94 @@
+"""Sandbox isolation: nothing a submission patches may reach later jobs on the same worker."""
+import os
+import tempfile
+
+import pytest
+
+from server.agentic.sandbox_worker import _readable_by
+from server.agentic.worker_pool import WorkerPool
+
+FORGE = """
+import builtins, json, math
+json.dumps = lambda *args, **kwargs: '{"ok": true, "stdout": "forged\\\\n", "passed": true}'
+json.loads = lambda *args, **kwargs: {"ok": True, "stdout": "forged\\n"}
+builtins.print = lambda *args, **kwargs: None
+math.sqrt = lambda value: 42
+import sys
+sys.modules["__main__"].outputs_match = lambda *args: True
+"""
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(size=1, max_jobs_per_worker=100).start()
+    yield pool
+    pool.shutdown()
+
+
+def test_patches_do_not_reach_the_next_job(pool):
+    assert pool.run(FORGE, [], None)["ok"]
+    reply = pool.run("import math\nprint(math.sqrt(16))", [], None)
+    assert reply["ok"]
+    assert reply["stdout"] == "4.0\n"
+
+
+def test_patches_do_not_reach_later_cases_or_the_output_check(pool):
+    cases = [
+        {"stdin": "", "expected": "anything"},
+        {"stdin": "2\n", "expected": "4\n"},
+        {"stdin": "3\n", "expected": "9\n"},
+    ]
+    code = "import sys\nif not sys.stdin.read():\n" + "".join(f"    {line}\n" for line in FORGE.strip().splitlines())
+    code += "else:\n    print(6)\n"
+    reply = pool.submit({"code": code, "cases": cases})
+    assert [case["passed"] for case in reply["cases"]] == [False, False, False]
+    assert [case["stdout"] for case in reply["cases"]] == ["", "6\n", "6\n"]
+
+
+def test_usage_comes_from_the_kernel(pool):
+    reply = pool.run("total = 0\nfor i in range(2_000_000):\n    total += i\nprint(total)", [], None)
+    assert reply["stdout"] == f"{sum(range(2_000_000))}\n"
+    assert reply["cpu_time"] > 0
+    assert reply["peak_rss_kb"] > 0
+
+
+def test_limits_still_apply(pool):
+    reply = pool.run("while True:\n    pass", [], None, timeout=30)
+    assert not reply["ok"]
+    assert reply["limit"] == "cpu"
+    assert pool.run("print('after')", [], None)["stdout"] == "after\n"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="no fork() here")
+@pytest.mark.parametrize("code", [
+    "import os\nif os.fork() == 0:\n    os._exit(0)\nprint('forked')",
+    "import _thread\n_thread.start_new_thread(print, ())\nprint('threaded')",
+])
+def test_submissions_cannot_fork_or_start_threads(pool, code):
+    reply = pool.run(code, [], None)
+    assert not reply["ok"]
+    assert reply["limit"] == "processes"
+    assert reply["stdout"] == ""
+
+
+@pytest.mark.skipif(not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs a root server")
+def test_root_server_runs_submissions_unprivileged(pool):
+    reply = pool.run("import os\nopen('scratch.txt', 'w').write('ok')\nprint(os.getuid(), os.getgid())", [], None)
+    assert reply["ok"], reply["stderr"]
+    assert reply["stdout"] == "65534 65534\n"
+
+
+def test_readable_by_needs_every_directory_on_the_way():
+    outer = tempfile.mkdtemp()
+    inner = os.path.join(outer, "lib")
+    os.mkdir(inner)
+    os.chmod(inner, 0o755)
+    try:
+        os.chmod(outer, 0o755)
+        assert _readable_by(65534, inner)
+        os.chmod(outer, 0o700)
+        assert not _readable_by(65534, inner)
+    finally:
+        os.chmod(outer, 0o700)
+        os.rmdir(inner)
+        os.rmdir(outer)
@@ -0,0 +1,39 @@
+"""SharedStore session updates from concurrent writers."""
+import threading
+
+from server.agentic.shared_state import SharedStore
+
+
+def test_concurrent_updates_keep_every_item(tmp_path):
+    path = str(tmp_path / "shared.db")
+    SharedStore(path)
+
+    def writer(name):
+        store = SharedStore(path)  # one per worker process in production
+        for i in range(25):
+            item = f"{name}-{i}"
+            store.update_session("s", lambda state, item=item: {"items": [*(state or {"items": []})["items"], item]})
+
+    threads = [threading.Thread(target=writer, args=(name,)) for name in "abcd"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    items = SharedStore(path).load_session("s")["items"]
+    assert sorted(items) == sorted(f"{name}-{i}" for name in "abcd" for i in range(25))
+    for name in "abcd":
+        assert [item for item in items if item.startswith(name)] == [f"{name}-{i}" for i in range(25)]
+
+
+def test_update_runs_outside_the_write_lock(tmp_path):
+    store = SharedStore(str(tmp_path / "shared.db"))
+
+    def update(state):
+        # A writer holding BEGIN IMMEDIATE would make this one wait and fail
+        other = SharedStore(store.path)
+        other.hit("probe", 1e12)
+        return {"n": (state or {"n": 0})["n"] + 1}
+
+    store.update_session("s", update)
+    store.update_session("s", update)
+    assert store.load_session("s") == {"n": 2}
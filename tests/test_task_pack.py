@@ -0,0 +1,81 @@
+"""Task packs: records, serving through a missing or replaced file, and imports over a stale database."""
+import os
+
+import pytest
+
+from server.database import db_models as models
+from server.database import task_pack
+
+
+@pytest.fixture
+def pack_path(db, tmp_path, monkeypatch):
+    path = str(tmp_path / "tasks.pack")
+    monkeypatch.setattr(task_pack, "TASK_PACK_PATH", path)
+    monkeypatch.setattr(task_pack, "_pack", None)
+    monkeypatch.setattr(task_pack, "_pack_signature", None)
+    monkeypatch.setattr(task_pack, "_pack_failed", None)
+    monkeypatch.setattr(task_pack, "_pack_stale", None)
+    monkeypatch.setattr(task_pack, "database_revision", lambda: task_pack.read_revision(db))
+    return path
+
+
+def test_task_model_carries_the_prompt_prefix(db, pack_path):
+    task_pack.export_pack(db, pack_path)
+    task = task_pack.get_task_pack().task_model(2)
+    assert task.prompt_prefix == "prefix 2"
+    assert len(task_pack.get_task_pack().task(2)["test_cases"]) == 2
+
+
+def test_a_missing_file_keeps_the_last_good_pack(db, pack_path):
+    assert task_pack.get_task_pack() is None  # never opened: the routes use the database
+    task_pack.export_pack(db, pack_path)
+    pack = task_pack.get_task_pack()
+    os.remove(pack_path)
+    assert task_pack.get_task_pack() is pack
+    assert pack.task(1)["name"] == "Task 1"
+
+
+def test_a_corrupt_replacement_keeps_the_last_good_pack(db, pack_path):
+    task_pack.export_pack(db, pack_path)
+    pack = task_pack.get_task_pack()
+    with open(f"{pack_path}.new", "wb") as f:
+        f.write(b"not a pack")
+    os.replace(f"{pack_path}.new", pack_path)
+    assert task_pack.get_task_pack() is pack
+    task_pack.export_pack(db, pack_path)
+    assert task_pack.get_task_pack() is not pack
+
+
+def test_a_reseeded_database_is_served_until_the_pack_is_imported(db, pack_path):
+    task_pack.export_pack(db, pack_path)
+    pack = task_pack.get_task_pack()
+    assert pack is not None
+
+    task_pack.write_revision(db, task_pack.new_revision())  # e.g. fill_db
+    db.commit()
+    assert task_pack.get_task_pack() is None
+
+    task_pack.import_pack(pack, db)
+    assert task_pack.get_task_pack() is pack
+
+
+def test_import_syncs_suites_and_keeps_unchanged_prefixes(db, pack_path):
+    task_pack.export_pack(db, pack_path)
+    pack = task_pack.TaskPack(pack_path)
+    db.get(models.Task, 2).name = "Renamed"
+    db.get(models.Task, 3).topic = "loops"
+    db.add(models.InputOutput(task_id=1, inputs=[models.Input(input="9", input_type="int")],
+                              outputs=[models.Output(output="9", output_type="int")]))
+    db.add(models.Input(input="0", input_type="int", input_output_id=pack.task(2)["test_cases"][0]["id"]))
+    db.commit()
+
+    task_pack.import_pack(pack, db, batch_size=2)
+    db.expire_all()
+
+    assert [(task.id, task.name, task.topic, task.prompt_prefix)
+            for task in db.query(models.Task).order_by(models.Task.id)] == [
+        (1, "Task 1", "basics", "prefix 1"), (2, "Task 2", "basics", None), (3, "Task 3", "basics", "prefix 3"),
+    ]
+    for task_id in (1, 2, 3):
+        assert task_pack.task_records(db, [task_id])[0]["test_cases"] == pack.task(task_id)["test_cases"]
+    assert db.query(models.Input).count() == 12 and db.query(models.Output).count() == 6
@@ -0,0 +1,54 @@
+"""refresh_task_prefixes: rebuild only missing prefixes, all of them when the prompt changes."""
+from sqlalchemy import event
+
+from server.agentic import main as agent_main
+from server.agentic.main import Assistant_agent, refresh_task_prefixes, task_problem
+from server.database import db_models as models
+
+
+def _statements(db, action):
+    seen = []
+    listener = lambda *args: seen.append(args[2].split()[0].upper())  # noqa: E731
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        result = action()
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    return result, seen
+
+
+def _prefixes(db):
+    db.expire_all()
+    return {task.id: task.prompt_prefix for task in db.query(models.Task)}
+
+
+def test_first_run_builds_every_prefix(db):
+    assert refresh_task_prefixes(db) == 3
+    expected = {task.id: Assistant_agent.task_prefix(task_problem(task), task.correct_code)
+                for task in db.query(models.Task)}
+    assert _prefixes(db) == expected
+
+
+def test_nothing_to_do_reads_two_rows_and_writes_nothing(db):
+    refresh_task_prefixes(db)
+    changed, statements = _statements(db, lambda: refresh_task_prefixes(db))
+    assert changed == 0
+    assert statements == ["SELECT", "SELECT"]
+
+
+def test_only_missing_prefixes_are_rebuilt(db):
+    refresh_task_prefixes(db)
+    db.query(models.Task).filter(models.Task.id == 2).update({"prompt_prefix": None})
+    db.query(models.Task).filter(models.Task.id == 3).update({"prompt_prefix": "kept"})
+    db.commit()
+    assert refresh_task_prefixes(db) == 1
+    prefixes = _prefixes(db)
+    assert prefixes[2] is not None and prefixes[3] == "kept"
+
+
+def test_prompt_change_rebuilds_every_prefix(db, monkeypatch):
+    refresh_task_prefixes(db)
+    monkeypatch.setattr(Assistant_agent, "MAIN_PROMPT", "A new prompt.")
+    assert agent_main.review_prompt_hash() != db.get(models.Setting, agent_main.PROMPT_HASH_SETTING).value
+    assert refresh_task_prefixes(db) == 3
+    assert all(prefix.startswith("A new prompt.") for prefix in _prefixes(db).values())
@@ -0,0 +1,43 @@
+"""tools.is_volatile: which runs may be served from the result cache; CodeChecker off the server process."""
+import uuid
+
+import pytest
+
+from server.agentic import lint_engine
+from server.agentic.tools import CodeChecker, is_volatile
+
+
+@pytest.mark.parametrize("code", [
+    "import random\nprint(random.random())",
+    "import math, random\nprint(random.random())",
+    "import os.path as p, time\nprint(time.time())",
+    "from datetime import datetime\nprint(datetime.now())",
+    "def roll():\n    import random\n    return random.randint(1, 6)\nprint(roll())",
+    "print(__import__('random').random())",
+    "module = 'ran' + 'dom'\nprint(__import__(module).random())",
+    "import importlib\nprint(importlib.import_module('uuid').uuid4())",
+    "exec('import random; print(random.random())')",
+])
+def test_volatile_code(code):
+    assert is_volatile(code)
+
+
+@pytest.mark.parametrize("code", [
+    "import math\nprint(math.sqrt(int(input())))",
+    "from collections import Counter\nprint(Counter(input()))",
+    "# import random\nprint('import random')",
+    "randomness = 4\nprint(randomness)",
+    "print(int(input()) +",
+])
+def test_deterministic_code(code):
+    assert not is_volatile(code)
+
+
+def test_sync_lints_run_in_the_lint_process_pool(monkeypatch):
+    monkeypatch.setattr(lint_engine, "_engine", None)
+    try:
+        result = CodeChecker.lint_code(f"VALUE = '{uuid.uuid4()}'\n")  # never cached
+        assert result.error is None and result.report
+        assert lint_engine._engine is None  # no Pylint engine in this process
+    finally:
+        lint_engine.shutdown_lint_process_pool()
@@ -0,0 +1,43 @@
+"""WorkerPool: a worker that cannot be respawned must not cost the pool its slot."""
+import subprocess
+
+import pytest
+
+from server.agentic import worker_pool
+from server.agentic.worker_pool import WorkerCrashed, WorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(size=1, max_jobs_per_worker=1).start()
+    yield pool
+    pool.shutdown()
+
+
+def test_failed_respawn_keeps_the_slot(pool, monkeypatch):
+    real_popen = subprocess.Popen
+
+    def no_processes(*args, **kwargs):
+        raise BlockingIOError(11, "Resource temporarily unavailable")
+
+    # The first job retires its worker (max_jobs_per_worker=1); every respawn fails
+    assert pool.run("print(1)", [], None)["stdout"] == "1\n"
+    monkeypatch.setattr(subprocess, "Popen", no_processes)
+    for _ in range(3):
+        with pytest.raises(WorkerCrashed):
+            pool.run("print(2)", [], None)
+
+    monkeypatch.setattr(subprocess, "Popen", real_popen)
+    assert pool.run("print(3)", [], None)["stdout"] == "3\n"
+    assert pool.stats()["size"] == 1
+
+
+def test_waiting_for_a_worker_times_out(pool, monkeypatch):
+    monkeypatch.setattr(worker_pool, "RUNNER_POOL_WAIT_SECONDS", 0.1)
+    pool.start()
+    worker = pool._idle.get()  # pylint: disable=protected-access
+    try:
+        with pytest.raises(TimeoutError):
+            pool.run("print(1)", [], None)
+    finally:
+        pool._idle.put(worker)  # pylint: disable=protected-access